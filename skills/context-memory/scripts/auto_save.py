@@ -12,19 +12,26 @@ Usage (from hooks.json):
 """
 from __future__ import annotations
 
-import json
+import mmap
 import os
 import subprocess
 import sys
 import time
 from pathlib import Path
+from typing import Optional
 
 try:
     from .db_utils import extract_text_content as _extract_text_content_full
-    from .db_utils import read_hook_input
+    from .db_utils import json_dumps, json_loads, read_hook_input
 except ImportError:
     from db_utils import extract_text_content as _extract_text_content_full
-    from db_utils import read_hook_input
+    from db_utils import json_dumps, json_loads, read_hook_input
+
+# The save itself runs in a db_save.py subprocess, shipped alongside this script
+DB_SAVE_SCRIPT = Path(__file__).resolve().parent / "db_save.py"
+
+# Head + tail sampling: parse_transcript keeps this many messages from the start
+TRANSCRIPT_HEAD_MESSAGES = 5
 
 
 def extract_text_content(content) -> str:
@@ -32,6 +39,32 @@ def extract_text_content(content) -> str:
     return _extract_text_content_full(content, max_length=1000)
 
 
+def _message_from_line(line: bytes) -> Optional[dict]:
+    """Parse one transcript line into a {"role", "content"} dict, or None to skip it."""
+    # Checked rather than strip()ped: stripping would copy every line, and the
+    # JSON parser already skips surrounding whitespace (such as a CRLF's "\r")
+    if not line or line.isspace():
+        return None
+    try:
+        entry = json_loads(line)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict):
+        return None
+
+    entry_type = entry.get("type", "")
+    if entry_type not in ("user", "assistant"):
+        return None
+
+    raw_content = entry.get("message", {}).get("content")
+    if not raw_content:
+        return None
+    text = extract_text_content(raw_content)
+    if not text:
+        return None
+    return {"role": entry_type, "content": text}
+
+
 def parse_transcript(path: str, max_messages: int = 15) -> list[dict]:
     """
     Read a Claude Code JSONL transcript and extract user/assistant messages.
@@ -39,42 +72,51 @@ def parse_transcript(path: str, max_messages: int = 15) -> list[dict]:
     If more than max_messages are found, keeps first 5 + last (max_messages-5)
     to preserve context from the beginning and end of the conversation.
 
+    Only the lines needed are parsed: the file is mapped and scanned forward
+    for the head messages and backward for the tail ones, stopping where the
+    two meet, so the middle of a long transcript is never decoded (or, being
+    memory-mapped, even read from disk).
+
     Returns list of {"role": ..., "content": ...} dicts.
     """
     if not path or not os.path.isfile(path):
         return []
 
-    messages = []
+    head_n = min(TRANSCRIPT_HEAD_MESSAGES, max_messages)
+    tail_n = max_messages - head_n
+    head: list[dict] = []
+    tail: list[dict] = []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                entry_type = entry.get("type", "")
-                if entry_type not in ("user", "assistant"):
-                    continue
-
-                msg = entry.get("message", {})
-                raw_content = msg.get("content", "")
-                text = extract_text_content(raw_content)
-                if text:
-                    messages.append({"role": entry_type, "content": text})
-    except OSError:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []  # mmap cannot map an empty file
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Forward from the start: lines [0, pos) are consumed
+                pos = 0
+                while len(head) < head_n and pos < size:
+                    end = mm.find(b"\n", pos)
+                    if end == -1:
+                        end = size
+                    msg = _message_from_line(mm[pos:end])
+                    pos = end + 1
+                    if msg is not None:
+                        head.append(msg)
+
+                # Backward from the end, down to pos: lines [stop, size) are consumed
+                stop = size
+                while len(tail) < tail_n and stop > pos:
+                    newline = mm.rfind(b"\n", pos, stop)
+                    start = pos if newline == -1 else newline + 1
+                    msg = _message_from_line(mm[start:stop])
+                    stop = start - 1
+                    if msg is not None:
+                        tail.append(msg)
+    except (OSError, ValueError):
         return []
 
-    # Head + tail sampling when over the limit
-    if len(messages) > max_messages:
-        head = 5
-        tail = max_messages - head
-        messages = messages[:head] + messages[-tail:]
-
-    return messages
+    tail.reverse()
+    return head + tail
 
 
 def build_brief(messages: list[dict], project_name: str) -> str:
@@ -92,15 +134,18 @@ def build_brief(messages: list[dict], project_name: str) -> str:
     return f"Auto-saved session: {project_name}"
 
 
-def main() -> None:
-    scripts_dir = Path(__file__).resolve().parent
-    db_save_script = scripts_dir / "db_save.py"
+def main(stdin=None) -> None:
+    """
+    Run the stop hook.
 
-    if not db_save_script.exists():
+    Args:
+        stdin: Stream carrying the hook's JSON payload (default: sys.stdin)
+    """
+    if not DB_SAVE_SCRIPT.exists():
         return
 
     # ── Read hook stdin ──────────────────────────────────────────────
-    hook_input = read_hook_input()
+    hook_input = read_hook_input(stdin)
 
     # Loop-prevention: if Claude Code tells us a hook is already active, bail
     if hook_input and hook_input.get("stop_hook_active"):
@@ -150,12 +195,12 @@ def main() -> None:
         subprocess.run(
             [
                 sys.executable,
-                str(db_save_script),
+                str(DB_SAVE_SCRIPT),
                 "--auto",
                 "--json", "-",
                 "--project-path", project_path,
             ],
-            input=json.dumps(payload),
+            input=json_dumps(payload),
             capture_output=True,
             text=True,
             timeout=30,
@@ -165,7 +210,7 @@ def main() -> None:
         subprocess.run(
             [
                 sys.executable,
-                str(db_save_script),
+                str(DB_SAVE_SCRIPT),
                 "--auto",
                 "--session-id", session_id,
                 "--project-path", project_path,
@@ -10,8 +10,12 @@ Requires: pip install flask flask-cors
 from __future__ import annotations
 
 import argparse
+import base64
+import functools
 import json
 import sys
+import threading
+from collections import Counter, OrderedDict
 from pathlib import Path
 
 # Ensure sibling modules are importable (same pattern as mcp_server.py)
@@ -20,7 +24,7 @@ if _scripts_dir not in sys.path:
     sys.path.insert(0, _scripts_dir)
 
 try:
-    from flask import Flask, jsonify, request, send_from_directory
+    from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
     from flask_cors import CORS
 except ImportError:
     if __name__ == "__main__":
@@ -32,11 +36,23 @@ except ImportError:
         sys.exit(1)
     raise
 
-from db_init import get_stats, init_database  # noqa: E402
-from db_prune import CHILD_TABLES, prune_sessions  # noqa: E402
-from db_save import save_summary, save_topics  # noqa: E402
+# db_init, db_prune and db_save are imported by the handlers that need them:
+# only the stats and write endpoints use them, and importing the module
+# (once per test worker, and on every server start) then skips all three
 from db_search import full_search, search_tier2  # noqa: E402
-from db_utils import DB_PATH, VALID_TABLES, db_exists, get_connection  # noqa: E402
+from db_utils import (  # noqa: E402
+    db_exists,
+    db_file_fingerprint,
+    get_connection,
+    get_db_path,
+    json_dumps,
+    json_loads,
+)
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask < 2.2 has no pluggable JSON provider
+    DefaultJSONProvider = None
 
 STATIC_DIR = Path(__file__).resolve().parent / "static"
 
@@ -45,7 +61,180 @@ def _escape_like(value: str) -> str:
     """Escape LIKE wildcard characters in user input."""
     return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
+
+def _keyset_condition(sort: str, order_dir: str, position) -> tuple[str, list]:
+    """
+    WHERE condition (and its parameters) selecting the rows after ``position``.
+
+    ``position`` is the (sort value, id) of the last row already returned.
+    Rows are ordered by (sort, id) in one direction, so the row-value
+    comparison seeks straight past it instead of scanning and discarding
+    every earlier row the way OFFSET does. Binding the values, rather than
+    looking the row up again, keeps the cursor valid if that session is
+    deleted meanwhile.
+
+    The sort columns are nullable, and SQLite orders NULLs first ascending
+    and last descending. A row-value comparison against NULL is never true,
+    so NULL-valued rows are matched separately.
+    """
+    value, last_id = position
+    if order_dir == "DESC":
+        if value is None:
+            return f"(s.{sort} IS NULL AND s.id < ?)", [last_id]
+        return f"((s.{sort}, s.id) < (?, ?) OR s.{sort} IS NULL)", [value, last_id]
+    if value is None:
+        return f"(s.{sort} IS NOT NULL OR s.id > ?)", [last_id]
+    return f"(s.{sort}, s.id) > (?, ?)", [value, last_id]
+
+
+def _encode_cursor(sort: str, position) -> str:
+    """Opaque ``next_cursor`` token for the rows after ``position``, the (sort value, id) of a page's last row."""
+    raw = json_dumps([sort, *position]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token: str, sort: str):
+    """The (sort value, id) carried by a ``next_cursor`` token, or None if it is malformed or for another sort."""
+    try:
+        cursor_sort, value, last_id = json_loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if cursor_sort != sort or type(last_id) is not int:
+        return None
+    if value is not None and not isinstance(value, (str, int, float)):
+        return None
+    return value, last_id
+
+
+def _include_total(cursor) -> bool:
+    """
+    Whether to COUNT the matching sessions for this request.
+
+    Page-numbered requests need the total to render page links, so they get
+    it unless ``include_total=0``; cursor requests already have it from their
+    first page and skip the count unless ``include_total=1``.
+    """
+    return request.args.get("include_total", 0 if cursor is not None else 1, type=int) != 0
+
+
+# Response caches of the analytics endpoints, cleared by dashboard writes.
+# Writes from other processes (saves, CLI prunes) change the database
+# fingerprint that is part of every key instead.
+_response_caches: list = []
+_response_cache_lock = threading.Lock()
+_response_cache_generation = 0
+
+
+def _invalidate_response_caches() -> None:
+    """Drop every cached analytics response; call after writing to the database."""
+    global _response_cache_generation
+    with _response_cache_lock:
+        _response_cache_generation += 1
+        for cache in _response_caches:
+            cache.clear()
+
+
+def cache_by_db_state(maxsize: int = 128):
+    """
+    Cache a GET view's JSON body per query string and database state.
+
+    The analytics views are full-table GROUP BY aggregations whose result only
+    changes when the database does, so the body is reused until the database
+    file (or its WAL) changes or the dashboard itself writes to it. At most
+    ``maxsize`` bodies are kept per view, least recently used evicted first.
+    """
+    def decorator(view):
+        cache: OrderedDict = OrderedDict()
+        _response_caches.append(cache)
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            fingerprint = db_file_fingerprint()
+            key = (request.full_path, _response_cache_generation, fingerprint)
+            with _response_cache_lock:
+                body = cache.get(key)
+                if body is not None:
+                    cache.move_to_end(key)
+            if body is not None:
+                return app.response_class(body, mimetype="application/json")
+
+            response = view(*args, **kwargs)
+            # Only trust the result if nothing wrote while it was computed
+            # (opening the database can itself create the -wal file)
+            if db_file_fingerprint() == fingerprint:
+                with _response_cache_lock:
+                    if key[1] == _response_cache_generation:
+                        cache[key] = response.get_data()
+                        if len(cache) > maxsize:
+                            cache.popitem(last=False)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# ``?project=`` substring -> JSON array of the project paths it matches, per
+# database state (same invalidation as the analytics caches)
+_project_match_cache: OrderedDict = OrderedDict()
+_response_caches.append(_project_match_cache)
+PROJECT_MATCH_CACHE_SIZE = 128
+
+
+def _project_filter(conn, project: str) -> tuple[str, str]:
+    """
+    WHERE condition on ``s.project_path`` for the ``project`` substring filter, and its parameter.
+
+    A substring match needs LIKE '%...%', which no index can serve. It is run
+    once over the distinct project paths (a scan of the covering
+    idx_sessions_project_path, not of the sessions table) and cached until the
+    database changes; the session queries then look the matching paths up in
+    that index instead of testing LIKE on every row.
+    """
+    key = (project, db_file_fingerprint())
+    with _response_cache_lock:
+        paths_json = _project_match_cache.get(key)
+        if paths_json is not None:
+            _project_match_cache.move_to_end(key)
+    if paths_json is None:
+        paths = [row[0] for row in conn.execute(
+            r"SELECT DISTINCT project_path FROM sessions WHERE project_path LIKE ? ESCAPE '\'",
+            (f"%{_escape_like(project)}%",),
+        )]
+        paths_json = json_dumps(paths)
+        with _response_cache_lock:
+            _project_match_cache[key] = paths_json
+            if len(_project_match_cache) > PROJECT_MATCH_CACHE_SIZE:
+                _project_match_cache.popitem(last=False)
+    # json_each keeps the statement text fixed however many paths match
+    return "s.project_path IN (SELECT value FROM json_each(?))", paths_json
+
+
+if DefaultJSONProvider is not None:
+    class _FastJSONProvider(DefaultJSONProvider):
+        """
+        Compact, unsorted JSON through the db_utils helpers (orjson when installed).
+
+        Export responses carry whole sessions, so serialization is a large part
+        of their cost. Pretty-printed output and values only Flask's encoder
+        understands (dates, dataclasses) still go through the default provider.
+        """
+
+        def dumps(self, obj, **kwargs):
+            if kwargs.get("indent") is None:
+                try:
+                    return json_dumps(obj)
+                except TypeError:
+                    pass
+            return super().dumps(obj, **kwargs)
+
+        def loads(self, s, **kwargs):
+            return json_loads(s) if not kwargs else super().loads(s, **kwargs)
+
+
 app = Flask(__name__, static_folder=str(STATIC_DIR), static_url_path="/static")
+if DefaultJSONProvider is not None:
+    app.json = _FastJSONProvider(app)
 CORS(app)
 
 
@@ -64,30 +253,44 @@ def index():
 
 @app.route("/api/sessions")
 def api_list_sessions():
-    """List sessions with pagination and optional project filter."""
+    """List sessions with pagination and optional project filter.
+
+    Pages are addressed either by ``page`` or, cheaper for deep pages, by
+    ``cursor``: the ``next_cursor`` returned with the previous page (for the
+    same ``sort``). ``total`` is null when the count is skipped (see
+    _include_total()).
+    """
     page = request.args.get("page", 1, type=int)
+    cursor = request.args.get("cursor", None)
     per_page = request.args.get("per_page", 20, type=int)
     project = request.args.get("project", None)
     sort = request.args.get("sort", "created_at")
     order = request.args.get("order", "desc")
 
     if not db_exists():
-        return jsonify({"sessions": [], "total": 0, "page": page, "per_page": per_page})
+        return jsonify({"sessions": [], "total": 0, "page": page, "per_page": per_page, "next_cursor": None})
 
     allowed_sorts = {"created_at", "updated_at", "message_count"}
     if sort not in allowed_sorts:
         sort = "created_at"
     order_dir = "ASC" if order == "asc" else "DESC"
 
-    with get_connection(readonly=True) as conn:
-        # Count total
-        count_sql = "SELECT COUNT(*) FROM sessions"
-        count_params = []
-        if project:
-            count_sql += r" WHERE project_path LIKE ? ESCAPE '\'"
-            count_params.append(f"%{_escape_like(project)}%")
+    position = None
+    if cursor is not None:
+        position = _decode_cursor(cursor, sort)
+        if position is None:
+            return jsonify({"error": "Invalid cursor"}), 400
 
-        total = conn.execute(count_sql, count_params).fetchone()[0]
+    with get_connection(readonly=True) as conn:
+        total = None
+        if _include_total(cursor):
+            count_sql = "SELECT COUNT(*) FROM sessions s"
+            count_params = []
+            if project:
+                condition, param = _project_filter(conn, project)
+                count_sql += f" WHERE {condition}"
+                count_params.append(param)
+            total = conn.execute(count_sql, count_params).fetchone()[0]
 
         # Fetch page
         sql = """
@@ -97,18 +300,31 @@ def api_list_sessions():
             FROM sessions s
             LEFT JOIN summaries sum ON sum.session_id = s.id
         """
+        conditions = []
         params = []
         if project:
-            sql += r" WHERE s.project_path LIKE ? ESCAPE '\'"
-            params.append(f"%{_escape_like(project)}%")
-
-        sql += f" ORDER BY s.{sort} {order_dir} LIMIT ? OFFSET ?"
-        params.extend([per_page, (page - 1) * per_page])
-
-        cursor = conn.execute(sql, params)
+            condition, param = _project_filter(conn, project)
+            conditions.append(condition)
+            params.append(param)
+        if position is not None:
+            condition, condition_params = _keyset_condition(sort, order_dir, position)
+            conditions.append(condition)
+            params.extend(condition_params)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        # One extra row tells whether another page follows
+        sql += f" ORDER BY s.{sort} {order_dir}, s.id {order_dir} LIMIT ?"
+        params.append(per_page + 1)
+        if cursor is None:
+            sql += " OFFSET ?"
+            params.append((page - 1) * per_page)
+
+        rows = conn.execute(sql, params).fetchall()
+        has_more = len(rows) > per_page
         sessions = []
         session_ids = []
-        for row in cursor.fetchall():
+        for row in rows[:per_page]:
             s = dict(row)
             # Parse JSON fields
             for field in ["metadata", "technologies"]:
@@ -133,7 +349,10 @@ def api_list_sessions():
             for s in sessions:
                 s["topics"] = topics_map.get(s["id"], [])
 
-    return jsonify({"sessions": sessions, "total": total, "page": page, "per_page": per_page})
+    next_cursor = _encode_cursor(sort, (sessions[-1][sort], sessions[-1]["id"])) if has_more else None
+    return jsonify({
+        "sessions": sessions, "total": total, "page": page, "per_page": per_page, "next_cursor": next_cursor,
+    })
 
 
 @app.route("/api/sessions/<int:session_db_id>")
@@ -165,6 +384,8 @@ def api_update_session(session_db_id):
         if not row:
             return jsonify({"error": "Session not found"}), 404
 
+    from db_save import save_summary, save_topics
+
     updated = {}
 
     # Update summary fields
@@ -179,12 +400,14 @@ def api_update_session(session_db_id):
         save_topics(session_db_id, data["topics"], replace=True)
         updated["topics"] = data["topics"]
 
+    if updated:
+        _invalidate_response_caches()
     return jsonify({"updated": updated})
 
 
 @app.route("/api/sessions/<int:session_db_id>", methods=["DELETE"])
 def api_delete_session(session_db_id):
-    """Delete a single session (FTS-safe: delete children first)."""
+    """Delete a single session and everything recorded for it."""
     if not db_exists():
         return jsonify({"error": "Database does not exist"}), 404
 
@@ -195,21 +418,22 @@ def api_delete_session(session_db_id):
 
         session_id_text = row["session_id"]
 
-        # Delete child rows explicitly so FTS triggers fire
-        for table in CHILD_TABLES:
-            if table not in VALID_TABLES:
-                continue
-            conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_db_id,))
-
-        # Clean up context_checkpoints (keyed by session_id TEXT, not FK INTEGER)
+        # Checkpoints are keyed by the session_id TEXT (they can predate the
+        # session row), so they have no foreign key to cascade from
         conn.execute(
             "DELETE FROM context_checkpoints WHERE session_id = ?",
             (session_id_text,),
         )
+        conn.execute(
+            "DELETE FROM checkpoint_counters WHERE session_id = ?",
+            (session_id_text,),
+        )
 
+        # Child rows go by ON DELETE CASCADE; their FTS sync triggers fire as usual
         conn.execute("DELETE FROM sessions WHERE id = ?", (session_db_id,))
         conn.commit()
 
+    _invalidate_response_caches()
     return jsonify({"deleted": session_db_id})
 
 
@@ -241,6 +465,8 @@ def api_stats():
     """Get database statistics."""
     if not db_exists():
         return jsonify({"error": "Database does not exist", "exists": False})
+    from db_init import get_stats
+
     stats = get_stats()
     return jsonify(stats)
 
@@ -250,6 +476,7 @@ def api_stats():
 # ---------------------------------------------------------------------------
 
 @app.route("/api/analytics/timeline")
+@cache_by_db_state(maxsize=128)
 def api_analytics_timeline():
     """Sessions per day/week/month."""
     granularity = request.args.get("granularity", "week")
@@ -279,6 +506,7 @@ def api_analytics_timeline():
 
 
 @app.route("/api/analytics/topics")
+@cache_by_db_state(maxsize=128)
 def api_analytics_topics():
     """Topic frequency distribution."""
     limit = request.args.get("limit", 20, type=int)
@@ -300,6 +528,7 @@ def api_analytics_topics():
 
 
 @app.route("/api/analytics/projects")
+@cache_by_db_state(maxsize=128)
 def api_analytics_projects():
     """Sessions per project."""
     if not db_exists():
@@ -320,6 +549,7 @@ def api_analytics_projects():
 
 
 @app.route("/api/analytics/outcomes")
+@cache_by_db_state(maxsize=128)
 def api_analytics_outcomes():
     """Outcome distribution."""
     if not db_exists():
@@ -338,6 +568,7 @@ def api_analytics_outcomes():
 
 
 @app.route("/api/analytics/technologies")
+@cache_by_db_state(maxsize=128)
 def api_analytics_technologies():
     """Technology usage frequency."""
     limit = request.args.get("limit", 15, type=int)
@@ -346,7 +577,7 @@ def api_analytics_technologies():
 
     with get_connection(readonly=True) as conn:
         cursor = conn.execute("SELECT technologies FROM summaries WHERE technologies IS NOT NULL")
-        tech_counts = {}
+        tech_counts = Counter()
         for row in cursor.fetchall():
             try:
                 techs = json.loads(row["technologies"]) if isinstance(row["technologies"], str) else row["technologies"]
@@ -354,11 +585,11 @@ def api_analytics_technologies():
                     for t in techs:
                         t_lower = t.strip().lower()
                         if t_lower:
-                            tech_counts[t_lower] = tech_counts.get(t_lower, 0) + 1
+                            tech_counts[t_lower] += 1
             except (json.JSONDecodeError, ValueError, TypeError):
                 pass
 
-    sorted_techs = sorted(tech_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+    sorted_techs = tech_counts.most_common(limit)
     data = [{"technology": t, "count": c} for t, c in sorted_techs]
     return jsonify({"data": data})
 
@@ -374,11 +605,15 @@ def api_prune():
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
+    from db_prune import prune_sessions
+
     result = prune_sessions(
         max_age_days=data.get("max_age_days"),
         max_sessions=data.get("max_sessions"),
         dry_run=data.get("dry_run", True),
     )
+    if result.get("pruned") and not result.get("dry_run"):
+        _invalidate_response_caches()
     return jsonify(result)
 
 
@@ -387,12 +622,53 @@ def api_init():
     """Initialize or reinitialize the database."""
     data = request.get_json() or {}
     force = data.get("force", False)
+    from db_init import init_database
+
     created = init_database(force=force)
     if created:
+        _invalidate_response_caches()
         return jsonify({"created": True, "message": "Database initialized."})
     return jsonify({"created": False, "message": "Database already exists."})
 
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Sessions loaded per query while streaming an NDJSON export
+EXPORT_STREAM_BATCH = 50
+
+
+def _export_ndjson(position):
+    """Yield every session after ``position`` (newest first) as one JSON line each.
+
+    ``position`` is the (created_at, id) of the last session already exported,
+    or None to start from the newest.
+    """
+    while True:
+        # A fresh keyset query per batch, so no connection stays open between yields
+        with get_connection(readonly=True) as conn:
+            if position is None:
+                cursor = conn.execute(
+                    "SELECT created_at, id FROM sessions s ORDER BY s.created_at DESC, s.id DESC LIMIT ?",
+                    (EXPORT_STREAM_BATCH,),
+                )
+            else:
+                condition, params = _keyset_condition("created_at", "DESC", position)
+                cursor = conn.execute(
+                    f"SELECT created_at, id FROM sessions s WHERE {condition} "
+                    "ORDER BY s.created_at DESC, s.id DESC LIMIT ?",
+                    (*params, EXPORT_STREAM_BATCH),
+                )
+            rows = [tuple(row) for row in cursor.fetchall()]
+        if not rows:
+            return
+        for session in search_tier2([row[1] for row in rows], include_messages=True, include_snippets=True):
+            yield json_dumps(session) + "\n"
+        if len(rows) < EXPORT_STREAM_BATCH:
+            return
+        # Resume from the last row's values, which stay valid even if it is deleted
+        position = rows[-1]
+
+
 @app.route("/api/export")
 def api_export():
     """Export sessions as JSON with pagination.
@@ -400,26 +676,57 @@ def api_export():
     Query params:
         page: Page number (default 1)
         per_page: Sessions per page (default 100, max 500)
+        cursor: Resume after the previous page (its ``next_cursor``) instead
+                of skipping to ``page``; preferred for full exports
+        include_total: 0/1 to skip or force the session count (reported as
+                  ``total``); by default only page-numbered requests count
+
+    With ``Accept: application/x-ndjson`` every session (after ``cursor``,
+    if given) is streamed instead, one JSON object per line, so the export
+    never holds more than a batch of sessions in memory.
     """
     if not db_exists():
         return jsonify({"error": "Database does not exist"}), 404
 
     page = request.args.get("page", 1, type=int)
     per_page = min(request.args.get("per_page", 100, type=int), 500)
+    cursor = request.args.get("cursor", None)
+    stream = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
 
-    with get_connection(readonly=True) as conn:
-        total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
-        cursor = conn.execute(
-            "SELECT id FROM sessions ORDER BY created_at DESC LIMIT ? OFFSET ?",
-            (per_page, (page - 1) * per_page),
-        )
-        session_ids = [row["id"] for row in cursor.fetchall()]
+    position = None
+    if cursor is not None:
+        position = _decode_cursor(cursor, "created_at")
+        if position is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    if stream:
+        return Response(stream_with_context(_export_ndjson(position)), mimetype=NDJSON_MIMETYPE)
 
+    with get_connection(readonly=True) as conn:
+        total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] if _include_total(cursor) else None
+        # One extra row tells whether another page follows
+        if position is None:
+            rows = conn.execute(
+                "SELECT created_at, id FROM sessions s ORDER BY s.created_at DESC, s.id DESC LIMIT ? OFFSET ?",
+                (per_page + 1, (page - 1) * per_page),
+            ).fetchall()
+        else:
+            condition, params = _keyset_condition("created_at", "DESC", position)
+            rows = conn.execute(
+                f"SELECT created_at, id FROM sessions s WHERE {condition} "
+                "ORDER BY s.created_at DESC, s.id DESC LIMIT ?",
+                (*params, per_page + 1),
+            ).fetchall()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    session_ids = [row["id"] for row in rows]
     if not session_ids:
-        return jsonify({"sessions": [], "count": 0, "total": total, "page": page, "per_page": per_page, "has_more": False})
+        return jsonify({
+            "sessions": [], "count": 0, "total": total, "page": page, "per_page": per_page,
+            "has_more": False, "next_cursor": None,
+        })
 
     sessions = search_tier2(session_ids, include_messages=True, include_snippets=True)
-    has_more = (page * per_page) < total
     return jsonify({
         "sessions": sessions,
         "count": len(sessions),
@@ -427,7 +734,8 @@ def api_export():
         "page": page,
         "per_page": per_page,
         "has_more": has_more,
-        "db_path": str(DB_PATH),
+        "next_cursor": _encode_cursor("created_at", tuple(rows[-1])) if has_more else None,
+        "db_path": str(get_db_path()),
     })
 
 
@@ -468,15 +776,16 @@ def api_hints():
     with get_connection(readonly=True) as conn:
         # Topics scoped to project
         if project:
-            cursor = conn.execute(r"""
+            project_condition, project_param = _project_filter(conn, project)
+            cursor = conn.execute(f"""
                 SELECT t.topic, COUNT(*) as count
                 FROM topics t
                 JOIN sessions s ON s.id = t.session_id
-                WHERE t.topic != 'auto-save' AND s.project_path LIKE ? ESCAPE '\'
+                WHERE t.topic != 'auto-save' AND {project_condition}
                 GROUP BY t.topic
                 ORDER BY count DESC
                 LIMIT 15
-            """, (f"%{_escape_like(project)}%",))
+            """, (project_param,))
         else:
             cursor = conn.execute("""
                 SELECT topic, COUNT(*) as count
@@ -490,18 +799,18 @@ def api_hints():
 
         # Technologies scoped to project
         if project:
-            cursor = conn.execute(r"""
+            cursor = conn.execute(f"""
                 SELECT sum.technologies
                 FROM summaries sum
                 JOIN sessions s ON s.id = sum.session_id
-                WHERE sum.technologies IS NOT NULL AND s.project_path LIKE ? ESCAPE '\'
-            """, (f"%{_escape_like(project)}%",))
+                WHERE sum.technologies IS NOT NULL AND {project_condition}
+            """, (project_param,))
         else:
             cursor = conn.execute(
                 "SELECT technologies FROM summaries WHERE technologies IS NOT NULL"
             )
 
-        tech_counts = {}
+        tech_counts = Counter()
         for row in cursor.fetchall():
             try:
                 techs = json.loads(row["technologies"]) if isinstance(row["technologies"], str) else row["technologies"]
@@ -509,11 +818,11 @@ def api_hints():
                     for t in techs:
                         t_lower = t.strip().lower()
                         if t_lower:
-                            tech_counts[t_lower] = tech_counts.get(t_lower, 0) + 1
+                            tech_counts[t_lower] += 1
             except (json.JSONDecodeError, ValueError, TypeError):
                 pass
 
-        sorted_techs = sorted(tech_counts.items(), key=lambda x: x[1], reverse=True)[:15]
+        sorted_techs = tech_counts.most_common(15)
         technologies = [{"technology": t, "count": c} for t, c in sorted_techs]
 
     return jsonify({"topics": topics, "technologies": technologies})
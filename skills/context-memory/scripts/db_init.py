@@ -6,14 +6,35 @@ Creates tables, FTS5 virtual tables, indexes, and triggers.
 
 import os
 import sys
+from contextlib import contextmanager
 
 try:
-    from .db_utils import DB_PATH, STATS_TABLES, VALID_TABLES, db_exists, ensure_db_dir, get_connection
+    from .db_utils import (
+        STATS_TABLES,
+        VALID_TABLES,
+        close_pooled_connections,
+        db_exists,
+        db_file_fingerprint,
+        ensure_db_dir,
+        get_connection,
+        get_db_path,
+        reset_connection_state,
+    )
 except ImportError:
-    from db_utils import DB_PATH, STATS_TABLES, VALID_TABLES, db_exists, ensure_db_dir, get_connection
+    from db_utils import (
+        STATS_TABLES,
+        VALID_TABLES,
+        close_pooled_connections,
+        db_exists,
+        db_file_fingerprint,
+        ensure_db_dir,
+        get_connection,
+        get_db_path,
+        reset_connection_state,
+    )
 
 # Schema versioning
-CURRENT_SCHEMA_VERSION = 4
+CURRENT_SCHEMA_VERSION = 14
 
 SCHEMA_SQL = """
 -- Core Tables
@@ -52,6 +73,7 @@ CREATE TABLE IF NOT EXISTS summaries (
     technologies TEXT,  -- JSON array of technologies
     outcome TEXT,  -- success, partial, abandoned
     user_note TEXT,  -- User-provided annotation from /remember
+    topics_json TEXT,  -- JSON array of topics, maintained by triggers on topics
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
 );
@@ -122,8 +144,11 @@ CREATE VIRTUAL TABLE IF NOT EXISTS code_snippets_fts USING fts5(
 CREATE INDEX IF NOT EXISTS idx_sessions_project_hash ON sessions(project_hash);
 CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at DESC);
+-- Covers the dashboard's per-project GROUP BY and project_path LIKE filter
+CREATE INDEX IF NOT EXISTS idx_sessions_project_path ON sessions(project_path);
 CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id);
-CREATE INDEX IF NOT EXISTS idx_topics_session_id ON topics(session_id);
+-- Covering, in insertion order: a session's topic list (and topics_json) is read from the index alone
+CREATE INDEX IF NOT EXISTS idx_topics_session_id ON topics(session_id, id, topic);
 CREATE INDEX IF NOT EXISTS idx_topics_topic ON topics(topic);
 CREATE INDEX IF NOT EXISTS idx_code_snippets_session_id ON code_snippets(session_id);
 CREATE INDEX IF NOT EXISTS idx_code_snippets_language ON code_snippets(language);
@@ -141,7 +166,9 @@ CREATE TRIGGER IF NOT EXISTS summaries_ad AFTER DELETE ON summaries BEGIN
     VALUES ('delete', OLD.id, OLD.brief, OLD.detailed, OLD.key_decisions, OLD.problems_solved, OLD.technologies, OLD.user_note);
 END;
 
-CREATE TRIGGER IF NOT EXISTS summaries_au AFTER UPDATE ON summaries BEGIN
+CREATE TRIGGER IF NOT EXISTS summaries_au
+AFTER UPDATE OF brief, detailed, key_decisions, problems_solved, technologies, user_note ON summaries
+BEGIN
     INSERT INTO summaries_fts(summaries_fts, rowid, brief, detailed, key_decisions, problems_solved, technologies, user_note)
     VALUES ('delete', OLD.id, OLD.brief, OLD.detailed, OLD.key_decisions, OLD.problems_solved, OLD.technologies, OLD.user_note);
     INSERT INTO summaries_fts(rowid, brief, detailed, key_decisions, problems_solved, technologies, user_note)
@@ -176,6 +203,31 @@ CREATE TRIGGER IF NOT EXISTS topics_au AFTER UPDATE ON topics BEGIN
     INSERT INTO topics_fts(rowid, topic) VALUES (NEW.id, NEW.topic);
 END;
 
+-- Denormalized summaries.topics_json triggers (lets search skip a topics round-trip)
+CREATE TRIGGER IF NOT EXISTS summaries_topics_ai AFTER INSERT ON summaries BEGIN
+    UPDATE summaries SET topics_json = (
+        SELECT json_group_array(topic) FROM topics WHERE topics.session_id = NEW.session_id
+    ) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS topics_json_ai AFTER INSERT ON topics BEGIN
+    UPDATE summaries SET topics_json = (
+        SELECT json_group_array(topic) FROM topics WHERE topics.session_id = NEW.session_id
+    ) WHERE session_id = NEW.session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS topics_json_ad AFTER DELETE ON topics BEGIN
+    UPDATE summaries SET topics_json = (
+        SELECT json_group_array(topic) FROM topics WHERE topics.session_id = OLD.session_id
+    ) WHERE session_id = OLD.session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS topics_json_au AFTER UPDATE ON topics BEGIN
+    UPDATE summaries SET topics_json = (
+        SELECT json_group_array(topic) FROM topics WHERE topics.session_id = summaries.session_id
+    ) WHERE session_id IN (OLD.session_id, NEW.session_id);
+END;
+
 -- Code Snippets FTS triggers
 CREATE TRIGGER IF NOT EXISTS code_snippets_ai AFTER INSERT ON code_snippets BEGIN
     INSERT INTO code_snippets_fts(rowid, code, description, file_path)
@@ -211,12 +263,24 @@ CREATE TABLE IF NOT EXISTS context_checkpoints (
     trigger_type TEXT NOT NULL DEFAULT 'auto',
     messages TEXT NOT NULL,
     message_count INTEGER NOT NULL DEFAULT 0,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    content_hash TEXT,  -- BLAKE2b of the messages JSON; identical re-saves are skipped
+    messages_codec INTEGER NOT NULL DEFAULT 0  -- 0 = plain JSON, 1 = zstd, 2 = zlib (see db_utils)
 );
 
-CREATE INDEX IF NOT EXISTS idx_checkpoints_session_id ON context_checkpoints(session_id);
-CREATE INDEX IF NOT EXISTS idx_checkpoints_project_hash ON context_checkpoints(project_hash);
-CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at ON context_checkpoints(created_at DESC);
+-- Composite indexes: filter + "latest checkpoint" ordering served without a sort
+CREATE INDEX IF NOT EXISTS idx_checkpoints_session_id
+    ON context_checkpoints(session_id, created_at DESC, checkpoint_number DESC);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_project_hash
+    ON context_checkpoints(project_hash, created_at DESC, checkpoint_number DESC);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at
+    ON context_checkpoints(created_at DESC, checkpoint_number DESC);
+
+-- Per-session checkpoint numbering: one point upsert instead of MAX() over the session's checkpoints
+CREATE TABLE IF NOT EXISTS checkpoint_counters (
+    session_id TEXT PRIMARY KEY,
+    last_checkpoint_number INTEGER NOT NULL
+);
 
 -- Schema versioning
 CREATE TABLE IF NOT EXISTS schema_version (
@@ -286,11 +350,185 @@ def _migrate_v3_to_v4(conn) -> None:
     conn.execute("INSERT INTO schema_version (version) VALUES (4)")
 
 
+def _migrate_v4_to_v5(conn) -> None:
+    """Migrate from v4 to v5: denormalize topics into summaries.topics_json via triggers."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(summaries)")}
+    if "topics_json" not in columns:
+        conn.execute("ALTER TABLE summaries ADD COLUMN topics_json TEXT")
+
+    # Restrict the FTS update trigger to indexed columns so topics_json writes
+    # don't rewrite the summaries_fts row.
+    conn.execute("DROP TRIGGER IF EXISTS summaries_au")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS summaries_au
+        AFTER UPDATE OF brief, detailed, key_decisions, problems_solved, technologies, user_note ON summaries
+        BEGIN
+            INSERT INTO summaries_fts(summaries_fts, rowid, brief, detailed, key_decisions, problems_solved,
+                                      technologies, user_note)
+            VALUES ('delete', OLD.id, OLD.brief, OLD.detailed, OLD.key_decisions, OLD.problems_solved,
+                    OLD.technologies, OLD.user_note);
+            INSERT INTO summaries_fts(rowid, brief, detailed, key_decisions, problems_solved, technologies, user_note)
+            VALUES (NEW.id, NEW.brief, NEW.detailed, NEW.key_decisions, NEW.problems_solved, NEW.technologies,
+                    NEW.user_note);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS summaries_topics_ai AFTER INSERT ON summaries BEGIN
+            UPDATE summaries SET topics_json = (
+                SELECT json_group_array(topic) FROM topics WHERE topics.session_id = NEW.session_id
+            ) WHERE id = NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS topics_json_ai AFTER INSERT ON topics BEGIN
+            UPDATE summaries SET topics_json = (
+                SELECT json_group_array(topic) FROM topics WHERE topics.session_id = NEW.session_id
+            ) WHERE session_id = NEW.session_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS topics_json_ad AFTER DELETE ON topics BEGIN
+            UPDATE summaries SET topics_json = (
+                SELECT json_group_array(topic) FROM topics WHERE topics.session_id = OLD.session_id
+            ) WHERE session_id = OLD.session_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS topics_json_au AFTER UPDATE ON topics BEGIN
+            UPDATE summaries SET topics_json = (
+                SELECT json_group_array(topic) FROM topics WHERE topics.session_id = summaries.session_id
+            ) WHERE session_id IN (OLD.session_id, NEW.session_id);
+        END
+    """)
+
+    # Backfill existing rows
+    conn.execute("""
+        UPDATE summaries SET topics_json = (
+            SELECT json_group_array(topic) FROM topics WHERE topics.session_id = summaries.session_id
+        )
+    """)
+    conn.execute("INSERT INTO schema_version (version) VALUES (5)")
+
+
+def _migrate_v5_to_v6(conn) -> None:
+    """Migrate from v5 to v6: extend checkpoint indexes to cover latest-checkpoint ordering."""
+    conn.execute("DROP INDEX IF EXISTS idx_checkpoints_session_id")
+    conn.execute("DROP INDEX IF EXISTS idx_checkpoints_project_hash")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkpoints_session_id
+        ON context_checkpoints(session_id, created_at DESC, checkpoint_number DESC)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkpoints_project_hash
+        ON context_checkpoints(project_hash, created_at DESC, checkpoint_number DESC)
+    """)
+    conn.execute("INSERT INTO schema_version (version) VALUES (6)")
+
+
+def _migrate_v6_to_v7(conn) -> None:
+    """Migrate from v6 to v7: add checkpoint_counters, seeded from existing checkpoints."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS checkpoint_counters (
+            session_id TEXT PRIMARY KEY,
+            last_checkpoint_number INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO checkpoint_counters (session_id, last_checkpoint_number)
+        SELECT session_id, MAX(checkpoint_number) FROM context_checkpoints GROUP BY session_id
+    """)
+    conn.execute("INSERT INTO schema_version (version) VALUES (7)")
+
+
+def _migrate_v7_to_v8(conn) -> None:
+    """Migrate from v7 to v8: let the unfiltered latest-checkpoint lookup skip its sort."""
+    conn.execute("DROP INDEX IF EXISTS idx_checkpoints_created_at")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at
+        ON context_checkpoints(created_at DESC, checkpoint_number DESC)
+    """)
+    conn.execute("INSERT INTO schema_version (version) VALUES (8)")
+
+
+def _migrate_v8_to_v9(conn) -> None:
+    """Migrate from v8 to v9: add per-message checkpoint rows for partial reloads.
+
+    Existing checkpoints are not backfilled; loaders fall back to their JSON blob.
+    (The table is dropped again in v14.)
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_checkpoint_messages (
+            checkpoint_id INTEGER NOT NULL,
+            idx INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (checkpoint_id, idx),
+            FOREIGN KEY (checkpoint_id) REFERENCES context_checkpoints(id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("INSERT INTO schema_version (version) VALUES (9)")
+
+
+def _migrate_v9_to_v10(conn) -> None:
+    """Migrate from v9 to v10: add context_checkpoints.content_hash.
+
+    Existing checkpoints keep a NULL hash, so the next save always writes.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(context_checkpoints)")}
+    if "content_hash" not in columns:
+        conn.execute("ALTER TABLE context_checkpoints ADD COLUMN content_hash TEXT")
+    conn.execute("INSERT INTO schema_version (version) VALUES (10)")
+
+
+def _migrate_v10_to_v11(conn) -> None:
+    """Migrate from v10 to v11: add context_checkpoints.messages_codec for compressed blobs.
+
+    Existing rows default to 0 (plain JSON) and are read as before.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(context_checkpoints)")}
+    if "messages_codec" not in columns:
+        conn.execute("ALTER TABLE context_checkpoints ADD COLUMN messages_codec INTEGER NOT NULL DEFAULT 0")
+    conn.execute("INSERT INTO schema_version (version) VALUES (11)")
+
+
+def _migrate_v11_to_v12(conn) -> None:
+    """Migrate from v11 to v12: index sessions.project_path for the dashboard's project queries."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_project_path ON sessions(project_path)")
+    conn.execute("INSERT INTO schema_version (version) VALUES (12)")
+
+
+def _migrate_v12_to_v13(conn) -> None:
+    """Migrate from v12 to v13: make idx_topics_session_id cover per-session topic lists."""
+    conn.execute("DROP INDEX IF EXISTS idx_topics_session_id")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_topics_session_id ON topics(session_id, id, topic)")
+    conn.execute("INSERT INTO schema_version (version) VALUES (13)")
+
+
+def _migrate_v13_to_v14(conn) -> None:
+    """Migrate from v13 to v14: drop context_checkpoint_messages.
+
+    Its rows were an uncompressed second copy of every checkpoint's messages
+    blob; partial reloads now slice the blob instead.
+    """
+    conn.execute("DROP TABLE IF EXISTS context_checkpoint_messages")
+    conn.execute("INSERT INTO schema_version (version) VALUES (14)")
+
+
 # Migration registry: version -> migration function
 MIGRATIONS = {
     2: _migrate_v1_to_v2,
     3: _migrate_v2_to_v3,
     4: _migrate_v3_to_v4,
+    5: _migrate_v4_to_v5,
+    6: _migrate_v5_to_v6,
+    7: _migrate_v6_to_v7,
+    8: _migrate_v7_to_v8,
+    9: _migrate_v8_to_v9,
+    10: _migrate_v9_to_v10,
+    11: _migrate_v10_to_v11,
+    12: _migrate_v11_to_v12,
+    13: _migrate_v12_to_v13,
+    14: _migrate_v13_to_v14,
 }
 
 
@@ -332,18 +570,29 @@ def init_database(force: bool = False) -> bool:
         True if database was created/initialized, False if already exists
     """
     ensure_db_dir()
+    db_path = get_db_path()
 
     if db_exists() and not force:
-        print(f"Database already exists at {DB_PATH}")
+        print(f"Database already exists at {db_path}")
         return False
 
     if force and db_exists():
+        # Open handles would keep the old file alive (or, on Windows, block removal)
+        close_pooled_connections()
         try:
-            os.remove(DB_PATH)
+            os.remove(db_path)
+            # A connection still open in another process keeps the old WAL
+            # and shared-memory files; a new database must not pick them up
+            for suffix in ("-wal", "-shm"):
+                try:
+                    os.remove(f"{db_path}{suffix}")
+                except FileNotFoundError:
+                    pass
         except OSError as e:
-            print(f"Error removing database at {DB_PATH}: {e}")
+            print(f"Error removing database at {db_path}: {e}")
             return False
-        print(f"Removed existing database at {DB_PATH}")
+        reset_connection_state()
+        print(f"Removed existing database at {db_path}")
 
     with get_connection() as conn:
         conn.executescript(SCHEMA_SQL)
@@ -354,16 +603,107 @@ def init_database(force: bool = False) -> bool:
         )
         conn.commit()
 
-    print(f"Database initialized at {DB_PATH}")
+    print(f"Database initialized at {db_path}")
     return True
 
 
+# External-content FTS5 indexes, keyed by the content table they mirror.
+# Each is kept in sync by <table>_ai/_ad/_au triggers.
+FTS_TABLES = {
+    'summaries': 'summaries_fts',
+    'messages': 'messages_fts',
+    'topics': 'topics_fts',
+    'code_snippets': 'code_snippets_fts',
+}
+
+
+def disable_fts_triggers(conn, tables=None) -> list:
+    """
+    Drop the FTS sync triggers for ``tables`` (default: all FTS_TABLES).
+
+    Returns the dropped (name, sql) pairs for enable_fts_triggers(). The FTS
+    index is stale until rebuild_fts_index() runs.
+    """
+    tables = list(FTS_TABLES) if tables is None else list(tables)
+    names = [f"{table}_{suffix}" for table in tables for suffix in ("ai", "ad", "au")]
+    placeholders = ",".join("?" * len(names))
+    dropped = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+        names,
+    ).fetchall()
+    for name, _sql in dropped:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    return [(name, sql) for name, sql in dropped]
+
+
+def enable_fts_triggers(conn, triggers: list) -> None:
+    """Recreate triggers previously returned by disable_fts_triggers()."""
+    for _name, sql in triggers:
+        conn.execute(sql)
+
+
+def rebuild_fts_index(conn, tables=None, optimize: bool = False) -> None:
+    """
+    Rebuild FTS indexes from their content tables in one pass.
+
+    With ``optimize``, also merge each index's b-trees into one, which is
+    worthwhile after loading many rows.
+    """
+    for table in (FTS_TABLES if tables is None else tables):
+        if table not in FTS_TABLES:
+            raise ValueError(f"No FTS index for table: {table}")
+        fts = FTS_TABLES[table]
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        if optimize:
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+
+
+def clear_fts_index(conn, tables) -> None:
+    """Empty the FTS indexes of ``tables`` (FTS5 'delete-all'), for content tables being emptied."""
+    for table in tables:
+        if table not in FTS_TABLES:
+            raise ValueError(f"No FTS index for table: {table}")
+        fts = FTS_TABLES[table]
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('delete-all')")
+
+
+@contextmanager
+def bulk_fts_suspended(tables=None, optimize: bool = False):
+    """
+    Suspend FTS sync triggers while bulk-loading rows.
+
+    Yields a connection holding a write transaction; the block must write
+    through it. Inside the block inserts skip per-row FTS tokenization; on
+    exit the indexes are rebuilt once, the triggers restored, and everything
+    committed together. On error the whole transaction, including the
+    dropped triggers, is rolled back.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        triggers = disable_fts_triggers(conn, tables)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        rebuild_fts_index(conn, tables, optimize=optimize)
+        enable_fts_triggers(conn, triggers)
+        conn.commit()
+
+
+# (file fingerprint, table names, FTS trigger names) from the last verify_schema() scan
+_verify_cache = None
+
+# Triggers that keep each FTS index in sync; without them search silently goes stale
+FTS_TRIGGERS = [f"{table}_{suffix}" for table in FTS_TABLES for suffix in ("ai", "ad", "au")]
+
+
 def verify_schema() -> dict:
-    """Verify that all expected tables exist."""
+    """Verify that all expected tables and FTS sync triggers exist."""
     expected_tables = [
         'sessions', 'messages', 'summaries', 'topics', 'code_snippets',
         'summaries_fts', 'messages_fts', 'topics_fts', 'code_snippets_fts',
-        'schema_version', 'context_checkpoints',
+        'schema_version', 'context_checkpoints', 'checkpoint_counters',
     ]
 
     if not db_exists():
@@ -371,19 +711,37 @@ def verify_schema() -> dict:
             'valid': False,
             'existing': [],
             'missing': expected_tables[:],
+            'missing_triggers': FTS_TRIGGERS[:],
             'error': 'database not found',
         }
 
-    with get_connection(readonly=True) as conn:
-        cursor = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' OR type='virtual table'"
-        )
-        existing_tables = {row[0] for row in cursor.fetchall()}
-
+    global _verify_cache
+    fingerprint = db_file_fingerprint()
+    if _verify_cache is not None and _verify_cache[0] == fingerprint:
+        existing_tables, existing_triggers = _verify_cache[1], _verify_cache[2]
+    else:
+        placeholders = ",".join("?" * len(FTS_TRIGGERS))
+        with get_connection(readonly=True) as conn:
+            # (virtual tables are type 'table' in sqlite_master too)
+            rows = conn.execute(
+                f"SELECT type, name FROM sqlite_master "
+                f"WHERE type = 'table' OR (type = 'trigger' AND name IN ({placeholders}))",
+                FTS_TRIGGERS,
+            ).fetchall()
+        existing_tables = frozenset(name for kind, name in rows if kind == 'table')
+        existing_triggers = frozenset(name for kind, name in rows if kind == 'trigger')
+        # Only trust the scan if nothing touched the files while it ran
+        # (opening the database can itself create the -wal file)
+        if db_file_fingerprint() == fingerprint:
+            _verify_cache = (fingerprint, existing_tables, existing_triggers)
+
+    missing = [t for t in expected_tables if t not in existing_tables]
+    missing_triggers = [t for t in FTS_TRIGGERS if t not in existing_triggers]
     result = {
-        'valid': all(t in existing_tables for t in expected_tables),
+        'valid': not missing and not missing_triggers,
         'existing': list(existing_tables),
-        'missing': [t for t in expected_tables if t not in existing_tables]
+        'missing': missing,
+        'missing_triggers': missing_triggers,
     }
 
     return result
@@ -404,7 +762,8 @@ def get_stats() -> dict:
             stats[table] = cursor.fetchone()[0]
 
         # Get database file size
-        stats['db_size_bytes'] = DB_PATH.stat().st_size if DB_PATH.exists() else 0
+        db_path = get_db_path()
+        stats['db_size_bytes'] = db_path.stat().st_size if db_path.exists() else 0
 
     return stats
 
@@ -429,7 +788,10 @@ if __name__ == "__main__":
             print(f"Tables: {', '.join(result['existing'])}")
         else:
             print("Schema is invalid!")
-            print(f"Missing tables: {', '.join(result['missing'])}")
+            if result['missing']:
+                print(f"Missing tables: {', '.join(result['missing'])}")
+            if result['missing_triggers']:
+                print(f"Missing FTS triggers: {', '.join(result['missing_triggers'])}")
         sys.exit(0 if result['valid'] else 1)
 
     if args.stats:
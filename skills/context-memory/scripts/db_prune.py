@@ -7,19 +7,24 @@ from __future__ import annotations
 
 import argparse
 import json
+import sqlite3
 import sys
 from typing import Optional
 
 try:
+    from .db_init import FTS_TABLES, clear_fts_index, disable_fts_triggers, enable_fts_triggers
     from .db_utils import VALID_TABLES, db_exists, get_connection
 except ImportError:
+    from db_init import FTS_TABLES, clear_fts_index, disable_fts_triggers, enable_fts_triggers
     from db_utils import VALID_TABLES, db_exists, get_connection
 
-# Child tables that must be deleted before sessions (FTS triggers need row-level DELETE)
+# Child tables removed with their session by ON DELETE CASCADE (their FTS sync
+# triggers fire for cascaded deletes too)
 CHILD_TABLES = ['messages', 'summaries', 'topics', 'code_snippets']
 
 # Tables linked by session_id TEXT (not FK), cleaned up separately
 CHECKPOINT_TABLE = 'context_checkpoints'
+CHECKPOINT_COUNTER_TABLE = 'checkpoint_counters'
 
 
 def prune_sessions(
@@ -31,8 +36,9 @@ def prune_sessions(
     Prune sessions by age and/or count.
 
     Uses OR logic: sessions matching either condition are pruned.
-    Child rows are deleted explicitly before sessions to ensure
-    FTS5 sync triggers fire correctly (CASCADE doesn't trigger them).
+    Child rows go with their session through ON DELETE CASCADE, and the
+    FTS5 sync triggers fire for the cascaded deletes too. Pruning every
+    session instead empties the child tables and their FTS indexes in bulk.
 
     Args:
         max_age_days: Delete sessions older than this many days
@@ -49,6 +55,11 @@ def prune_sessions(
         return {"pruned": 0, "reason": "database does not exist"}
 
     with get_connection() as conn:
+        if not dry_run:
+            # Select and delete under one write lock, so the candidates (and
+            # the session total checked below) can't change in between
+            conn.execute("BEGIN IMMEDIATE")
+
         ids_to_prune = set()
 
         # Collect IDs by age
@@ -94,16 +105,20 @@ def prune_sessions(
         )
         session_id_texts = [row[0] for row in cursor.fetchall()]
 
-        # Delete child rows explicitly to fire FTS sync triggers
-        for table in CHILD_TABLES:
-            if table not in VALID_TABLES:
-                continue
-            conn.execute(
-                f"DELETE FROM {table} WHERE session_id IN ({placeholders})",
-                ids_list
-            )
-
-        # Delete sessions
+        total_sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if len(session_id_texts) == total_sessions:
+            # Pruning everything: empty the child tables and their FTS indexes
+            # wholesale rather than firing one FTS delete trigger per row
+            fts_child_tables = [t for t in CHILD_TABLES if t in FTS_TABLES]
+            triggers = disable_fts_triggers(conn, fts_child_tables)
+            for table in CHILD_TABLES:
+                if table not in VALID_TABLES:
+                    continue
+                conn.execute(f"DELETE FROM {table}")
+            clear_fts_index(conn, fts_child_tables)
+            enable_fts_triggers(conn, triggers)
+
+        # Delete sessions (any remaining child rows cascade)
         conn.execute(
             f"DELETE FROM sessions WHERE id IN ({placeholders})",
             ids_list
@@ -112,16 +127,29 @@ def prune_sessions(
         # Clean up context_checkpoints by session_id TEXT
         if CHECKPOINT_TABLE in VALID_TABLES and session_id_texts:
             cp_placeholders = ','.join('?' for _ in session_id_texts)
-            conn.execute(
-                f"DELETE FROM {CHECKPOINT_TABLE} WHERE session_id IN ({cp_placeholders})",
-                session_id_texts,
-            )
+            for table in (CHECKPOINT_TABLE, CHECKPOINT_COUNTER_TABLE):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE session_id IN ({cp_placeholders})",
+                    session_id_texts,
+                )
 
         conn.commit()
 
         return {"pruned": len(ids_list), "dry_run": False}
 
 
+# Checkpoints past the newest N (bound parameter) of their session
+_CHECKPOINTS_BEYOND_LIMIT_SQL = """
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY session_id ORDER BY created_at DESC, checkpoint_number DESC
+        ) AS rank
+        FROM context_checkpoints
+    )
+    WHERE rank > ?
+"""
+
+
 def prune_checkpoints(
     max_per_session: int = 3,
     max_age_days: Optional[int] = None,
@@ -151,19 +179,27 @@ def prune_checkpoints(
         ids_to_prune = set()
 
         # Prune by count: keep only max_per_session newest per session_id
-        cursor = conn.execute(
-            "SELECT DISTINCT session_id FROM context_checkpoints"
-        )
-        session_ids = [row[0] for row in cursor.fetchall()]
-
-        for sid in session_ids:
+        if sqlite3.sqlite_version_info >= (3, 25, 0):
+            # One pass over the (session_id, created_at, checkpoint_number)
+            # index instead of a query per session
+            cursor = conn.execute(_CHECKPOINTS_BEYOND_LIMIT_SQL, (max_per_session,))
+            ids_to_prune.update(row[0] for row in cursor.fetchall())
+        else:
+            # Window functions need SQLite 3.25+
             cursor = conn.execute(
-                "SELECT id FROM context_checkpoints WHERE session_id = ? ORDER BY created_at DESC, checkpoint_number DESC",
-                (sid,),
+                "SELECT DISTINCT session_id FROM context_checkpoints"
             )
-            all_cp_ids = [row[0] for row in cursor.fetchall()]
-            if len(all_cp_ids) > max_per_session:
-                ids_to_prune.update(all_cp_ids[max_per_session:])
+            session_ids = [row[0] for row in cursor.fetchall()]
+
+            for sid in session_ids:
+                cursor = conn.execute(
+                    "SELECT id FROM context_checkpoints WHERE session_id = ? "
+                    "ORDER BY created_at DESC, checkpoint_number DESC",
+                    (sid,),
+                )
+                all_cp_ids = [row[0] for row in cursor.fetchall()]
+                if len(all_cp_ids) > max_per_session:
+                    ids_to_prune.update(all_cp_ids[max_per_session:])
 
         # Prune by age
         if max_age_days is not None:
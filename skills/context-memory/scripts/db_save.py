@@ -13,10 +13,10 @@ from typing import Optional
 
 try:
     from .db_init import ensure_schema_current, init_database
-    from .db_utils import db_exists, get_connection, hash_project_path, normalize_project_path
+    from .db_utils import db_exists, get_connection, hash_project_path, json_loads, normalize_project_path
 except ImportError:
     from db_init import ensure_schema_current, init_database
-    from db_utils import db_exists, get_connection, hash_project_path, normalize_project_path
+    from db_utils import db_exists, get_connection, hash_project_path, json_loads, normalize_project_path
 
 logger = logging.getLogger(__name__)
 
@@ -37,36 +37,46 @@ def save_session(
     Returns:
         Database ID of the session
     """
+    _prepare_database()
+
+    with get_connection() as conn:
+        session_db_id = _upsert_session(conn, session_id, project_path, metadata)
+        conn.commit()
+
+    return session_db_id
+
+
+def _prepare_database() -> None:
+    """Create the database, or bring an existing one up to the current schema."""
     if not db_exists():
         init_database()
     else:
         ensure_schema_current()
 
+
+def _upsert_session(conn, session_id: str, project_path: Optional[str], metadata: Optional[dict]) -> int:
+    """Insert or update a session row on ``conn`` without committing; returns its id."""
     if project_path:
         project_path = normalize_project_path(project_path)
 
     project_hash = hash_project_path(project_path) if project_path else None
     metadata_json = json.dumps(metadata) if metadata else None
 
-    with get_connection() as conn:
-        conn.execute("""
-            INSERT INTO sessions (session_id, project_path, project_hash, metadata)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(session_id) DO UPDATE SET
-                project_path = COALESCE(excluded.project_path, project_path),
-                project_hash = COALESCE(excluded.project_hash, project_hash),
-                metadata = COALESCE(excluded.metadata, metadata),
-                updated_at = CURRENT_TIMESTAMP
-        """, (session_id, project_path, project_hash, metadata_json))
-        conn.commit()
-
-        # Fetch the id (works for both insert and update)
-        row = conn.execute(
-            "SELECT id FROM sessions WHERE session_id = ?", (session_id,)
-        ).fetchone()
-        session_db_id = row['id']
+    conn.execute("""
+        INSERT INTO sessions (session_id, project_path, project_hash, metadata)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(session_id) DO UPDATE SET
+            project_path = COALESCE(excluded.project_path, project_path),
+            project_hash = COALESCE(excluded.project_hash, project_hash),
+            metadata = COALESCE(excluded.metadata, metadata),
+            updated_at = CURRENT_TIMESTAMP
+    """, (session_id, project_path, project_hash, metadata_json))
 
-    return session_db_id
+    # Fetch the id (works for both insert and update)
+    row = conn.execute(
+        "SELECT id FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    return row['id']
 
 
 def save_messages(
@@ -86,30 +96,42 @@ def save_messages(
         Number of messages saved
     """
     with get_connection() as conn:
-        if replace:
-            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_db_id,))
-            offset = 0
-        else:
-            cursor = conn.execute(
-                "SELECT COALESCE(MAX(sequence), -1) FROM messages WHERE session_id = ?",
-                (session_db_id,),
-            )
-            offset = cursor.fetchone()[0] + 1
+        count = _insert_messages(conn, session_db_id, messages, replace)
+        conn.commit()
+
+    return count
 
-        for i, msg in enumerate(messages):
-            conn.execute("""
-                INSERT INTO messages (session_id, role, content, sequence)
-                VALUES (?, ?, ?, ?)
-            """, (session_db_id, msg.get('role', 'user'), msg.get('content', ''), offset + i))
 
-        # Update message count from actual rows (correct even on append)
+def _insert_messages(conn, session_db_id: int, messages: list[dict], replace: bool) -> int:
+    """Write messages on ``conn`` without committing; see save_messages()."""
+    if replace:
+        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_db_id,))
+        offset = 0
+    else:
+        cursor = conn.execute(
+            "SELECT COALESCE(MAX(sequence), -1) FROM messages WHERE session_id = ?",
+            (session_db_id,),
+        )
+        offset = cursor.fetchone()[0] + 1
+
+    conn.executemany("""
+        INSERT INTO messages (session_id, role, content, sequence)
+        VALUES (?, ?, ?, ?)
+    """, [
+        (session_db_id, msg.get('role', 'user'), msg.get('content', ''), offset + i)
+        for i, msg in enumerate(messages)
+    ])
+
+    # Update message count: after a replace the new list is every row, so
+    # only an append has to count what was already stored
+    if replace:
+        total = len(messages)
+    else:
         cursor = conn.execute(
             "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_db_id,)
         )
         total = cursor.fetchone()[0]
-        conn.execute("UPDATE sessions SET message_count = ? WHERE id = ?", (total, session_db_id))
-
-        conn.commit()
+    conn.execute("UPDATE sessions SET message_count = ? WHERE id = ?", (total, session_db_id))
 
     return len(messages)
 
@@ -141,47 +163,64 @@ def save_summary(
         Database ID of the summary
     """
     with get_connection() as conn:
-        # Check if summary exists
-        cursor = conn.execute(
-            "SELECT id FROM summaries WHERE session_id = ?",
-            (session_db_id,)
+        summary_id = _upsert_summary(
+            conn, session_db_id, brief, detailed, key_decisions,
+            problems_solved, technologies, outcome, user_note,
         )
-        existing = cursor.fetchone()
-
-        decisions_json = json.dumps(key_decisions) if key_decisions else None
-        problems_json = json.dumps(problems_solved) if problems_solved else None
-        tech_json = json.dumps(technologies) if technologies else None
-
-        if existing:
-            conn.execute("""
-                UPDATE summaries
-                SET brief = COALESCE(?, brief),
-                    detailed = COALESCE(?, detailed),
-                    key_decisions = COALESCE(?, key_decisions),
-                    problems_solved = COALESCE(?, problems_solved),
-                    technologies = COALESCE(?, technologies),
-                    outcome = COALESCE(?, outcome),
-                    user_note = COALESCE(?, user_note)
-                WHERE session_id = ?
-            """, (brief, detailed, decisions_json, problems_json, tech_json,
-                  outcome, user_note, session_db_id))
-            summary_id = existing['id']
-        else:
-            if brief is None:
-                raise ValueError("brief is required when creating a new summary")
-            cursor = conn.execute("""
-                INSERT INTO summaries
-                (session_id, brief, detailed, key_decisions, problems_solved, technologies, outcome, user_note)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (session_db_id, brief, detailed, decisions_json, problems_json,
-                  tech_json, outcome, user_note))
-            summary_id = cursor.lastrowid
-
         conn.commit()
 
     return summary_id
 
 
+def _upsert_summary(
+    conn,
+    session_db_id: int,
+    brief: Optional[str] = None,
+    detailed: Optional[str] = None,
+    key_decisions: Optional[list[str]] = None,
+    problems_solved: Optional[list[str]] = None,
+    technologies: Optional[list[str]] = None,
+    outcome: Optional[str] = None,
+    user_note: Optional[str] = None
+) -> int:
+    """Write a summary on ``conn`` without committing; see save_summary()."""
+    # Check if summary exists
+    cursor = conn.execute(
+        "SELECT id FROM summaries WHERE session_id = ?",
+        (session_db_id,)
+    )
+    existing = cursor.fetchone()
+
+    decisions_json = json.dumps(key_decisions) if key_decisions else None
+    problems_json = json.dumps(problems_solved) if problems_solved else None
+    tech_json = json.dumps(technologies) if technologies else None
+
+    if existing:
+        conn.execute("""
+            UPDATE summaries
+            SET brief = COALESCE(?, brief),
+                detailed = COALESCE(?, detailed),
+                key_decisions = COALESCE(?, key_decisions),
+                problems_solved = COALESCE(?, problems_solved),
+                technologies = COALESCE(?, technologies),
+                outcome = COALESCE(?, outcome),
+                user_note = COALESCE(?, user_note)
+            WHERE session_id = ?
+        """, (brief, detailed, decisions_json, problems_json, tech_json,
+              outcome, user_note, session_db_id))
+        return existing['id']
+
+    if brief is None:
+        raise ValueError("brief is required when creating a new summary")
+    cursor = conn.execute("""
+        INSERT INTO summaries
+        (session_id, brief, detailed, key_decisions, problems_solved, technologies, outcome, user_note)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (session_db_id, brief, detailed, decisions_json, problems_json,
+          tech_json, outcome, user_note))
+    return cursor.lastrowid
+
+
 def save_topics(session_db_id: int, topics: list[str], replace: bool = True) -> int:
     """
     Save topics for a session.
@@ -195,23 +234,22 @@ def save_topics(session_db_id: int, topics: list[str], replace: bool = True) ->
         Number of topics saved
     """
     with get_connection() as conn:
-        if replace:
-            conn.execute("DELETE FROM topics WHERE session_id = ?", (session_db_id,))
-
-        count = 0
-        for topic in topics:
-            topic_lower = topic.lower().strip()
-            if topic_lower:
-                conn.execute("""
-                    INSERT INTO topics (session_id, topic) VALUES (?, ?)
-                """, (session_db_id, topic_lower))
-                count += 1
-
+        count = _insert_topics(conn, session_db_id, topics, replace)
         conn.commit()
 
     return count
 
 
+def _insert_topics(conn, session_db_id: int, topics: list[str], replace: bool) -> int:
+    """Write topics on ``conn`` without committing; see save_topics()."""
+    if replace:
+        conn.execute("DELETE FROM topics WHERE session_id = ?", (session_db_id,))
+
+    rows = [(session_db_id, t) for t in (topic.lower().strip() for topic in topics) if t]
+    conn.executemany("INSERT INTO topics (session_id, topic) VALUES (?, ?)", rows)
+    return len(rows)
+
+
 def save_code_snippet(
     session_db_id: int,
     code: str,
@@ -233,15 +271,59 @@ def save_code_snippet(
         Database ID of the snippet
     """
     with get_connection() as conn:
-        cursor = conn.execute("""
-            INSERT INTO code_snippets (session_id, language, code, description, file_path)
-            VALUES (?, ?, ?, ?, ?)
-        """, (session_db_id, language, code, description, file_path))
+        snippet_id = _insert_code_snippet(conn, session_db_id, code, language, description, file_path)
         conn.commit()
 
+    return snippet_id
+
+
+def _insert_code_snippet(
+    conn,
+    session_db_id: int,
+    code: str,
+    language: Optional[str] = None,
+    description: Optional[str] = None,
+    file_path: Optional[str] = None
+) -> int:
+    """Write a code snippet on ``conn`` without committing; see save_code_snippet()."""
+    cursor = conn.execute("""
+        INSERT INTO code_snippets (session_id, language, code, description, file_path)
+        VALUES (?, ?, ?, ?, ?)
+    """, (session_db_id, language, code, description, file_path))
     return cursor.lastrowid
 
 
+def _code_snippet_row(
+    session_db_id: int,
+    code: str,
+    language: Optional[str] = None,
+    description: Optional[str] = None,
+    file_path: Optional[str] = None
+) -> tuple:
+    """Parameters for one code_snippets INSERT (rejects unknown snippet keys like a call would)."""
+    return (session_db_id, language, code, description, file_path)
+
+
+def _insert_code_snippets(conn, session_db_id: int, snippets: list[dict]) -> list[int]:
+    """
+    Write several code snippets on ``conn`` in one executemany(); returns their IDs in order.
+
+    Must run inside a write transaction: the IDs are read back as the
+    session's newest snippets, which only holds while nothing else can insert.
+    """
+    rows = [_code_snippet_row(session_db_id, **snippet) for snippet in snippets]
+    conn.executemany("""
+        INSERT INTO code_snippets (session_id, language, code, description, file_path)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    # AUTOINCREMENT ids only grow, so the inserted rows are the newest ones
+    cursor = conn.execute(
+        "SELECT id FROM code_snippets WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+        (session_db_id, len(rows)),
+    )
+    return [row[0] for row in reversed(cursor.fetchall())]
+
+
 def should_skip_auto_save(project_path: str, window_minutes: int = 5) -> bool:
     """
     Check if an auto-save should be skipped because a rich session
@@ -260,17 +342,18 @@ def should_skip_auto_save(project_path: str, window_minutes: int = 5) -> bool:
     project_hash = hash_project_path(project_path)
 
     with get_connection(readonly=True) as conn:
+        # EXISTS stops at the first qualifying row instead of counting them all
         cursor = conn.execute("""
-            SELECT COUNT(*) FROM sessions s
-            JOIN summaries sum ON sum.session_id = s.id
-            WHERE s.project_hash = ?
-              AND sum.brief != 'Auto-saved session'
-              AND NOT sum.brief LIKE 'Auto-saved session:%'
-              AND s.updated_at >= datetime('now', ?)
+            SELECT EXISTS (
+                SELECT 1 FROM sessions s
+                JOIN summaries sum ON sum.session_id = s.id
+                WHERE s.project_hash = ?
+                  AND sum.brief != 'Auto-saved session'
+                  AND NOT sum.brief LIKE 'Auto-saved session:%'
+                  AND s.updated_at >= datetime('now', ?)
+            )
         """, (project_hash, f'-{window_minutes} minutes'))
-        count = cursor.fetchone()[0]
-
-    return count > 0
+        return bool(cursor.fetchone()[0])
 
 
 def save_full_session(
@@ -284,7 +367,7 @@ def save_full_session(
     metadata: Optional[dict] = None
 ) -> dict:
     """
-    Save a complete session with all related data.
+    Save a complete session with all related data in a single transaction.
 
     Args:
         session_id: Unique session identifier
@@ -299,35 +382,78 @@ def save_full_session(
     Returns:
         Dict with saved IDs
     """
-    # Save session
-    session_db_id = save_session(session_id, project_path, metadata=metadata)
+    _prepare_database()
+
+    # One transaction for the whole session: a single commit (and WAL sync)
+    # instead of one per table, and a failure part-way leaves nothing behind.
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        result = _save_full_session(
+            conn, session_id, project_path, messages, summary, topics, code_snippets, user_note, metadata
+        )
+        conn.commit()
+
+    return result
+
+
+def save_full_sessions(sessions: list[dict]) -> list[dict]:
+    """
+    Save several complete sessions in a single transaction.
+
+    Args:
+        sessions: save_full_session() keyword arguments, one mapping per session
+
+    Returns:
+        save_full_session() result dicts, in input order
+    """
+    _prepare_database()
+
+    # One commit for the whole batch; a failure part-way saves none of it
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        results = [_save_full_session(conn, **kwargs) for kwargs in sessions]
+        conn.commit()
+
+    return results
+
+
+def _save_full_session(
+    conn,
+    session_id: str,
+    project_path: Optional[str] = None,
+    messages: Optional[list[dict]] = None,
+    summary: Optional[dict] = None,
+    topics: Optional[list[str]] = None,
+    code_snippets: Optional[list[dict]] = None,
+    user_note: Optional[str] = None,
+    metadata: Optional[dict] = None
+) -> dict:
+    """Write a complete session on ``conn`` without committing; see save_full_session()."""
+    session_db_id = _upsert_session(conn, session_id, project_path, metadata)
 
     result = {'session_id': session_db_id}
 
     # Save messages if provided
     if messages:
-        result['messages_count'] = save_messages(session_db_id, messages, replace=True)
+        result['messages_count'] = _insert_messages(conn, session_db_id, messages, replace=True)
 
     # Save summary if provided
     if summary:
         summary_data = {**summary}
         if user_note:
             summary_data['user_note'] = user_note
-        result['summary_id'] = save_summary(session_db_id, **summary_data)
+        result['summary_id'] = _upsert_summary(conn, session_db_id, **summary_data)
     elif user_note:
         # Save just the user note as a brief summary
-        result['summary_id'] = save_summary(session_db_id, brief=user_note, user_note=user_note)
+        result['summary_id'] = _upsert_summary(conn, session_db_id, brief=user_note, user_note=user_note)
 
     # Save topics if provided
     if topics:
-        result['topics_count'] = save_topics(session_db_id, topics)
+        result['topics_count'] = _insert_topics(conn, session_db_id, topics, replace=True)
 
     # Save code snippets if provided
     if code_snippets:
-        result['snippets'] = []
-        for snippet in code_snippets:
-            snippet_id = save_code_snippet(session_db_id, **snippet)
-            result['snippets'].append(snippet_id)
+        result['snippets'] = _insert_code_snippets(conn, session_db_id, code_snippets)
 
     return result
 
@@ -361,14 +487,14 @@ if __name__ == "__main__":
         # Load from JSON file or stdin
         try:
             if args.json == '-':
-                data = json.load(sys.stdin)
+                data = json_loads(sys.stdin.read())
             else:
-                with open(args.json, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(args.json, 'rb') as f:
+                    data = json_loads(f.read())
         except FileNotFoundError:
             print(f"Error: File not found: {args.json}")
             sys.exit(1)
-        except json.JSONDecodeError as e:
+        except ValueError as e:  # malformed JSON (either parser) or invalid UTF-8
             source = "stdin" if args.json == '-' else args.json
             print(f"Error: Invalid JSON in {source}: {e}")
             sys.exit(1)
@@ -30,6 +30,121 @@ MAX_SNIPPET_LENGTH = 500
 BOOST_PER_SOURCE = 0.3          # fixed boost per additional source (topic/snippet)
 PER_SOURCE_MULTIPLIER = 10      # fetch up to limit * K per source
 
+# Markdown templates for format_results_markdown. Chunks are joined with "\n",
+# so a trailing "\n" inside a template renders as a blank separator line.
+_RESULTS_HEADER_TMPL = '# Context Memory Results\n**Query**: "{query}"\n**Results**: {count} sessions\n'
+_SESSION_HEADER_TMPL = "## {i}. {created} | {project} (Match #{i}{sources})\n**Summary**: {brief}"
+_SESSION_FOOTER = "\n---"
+_DETAILS_OPEN = "\n<details><summary>Full Context</summary>\n"
+_DETAILED_SUMMARY_TMPL = "### Detailed Summary\n{text}\n"
+_MESSAGE_TMPL = "**{role}**: {content}\n"
+_SNIPPET_TMPL = "**{desc}**\n```{lang}\n{code}\n```\n"
+
+# Tier-1 result columns, in SELECT order; the per-source match flags and
+# topics_json follow them
+_TIER1_RESULT_KEYS = (
+    "id", "session_id", "project_path", "created_at", "message_count",
+    "brief", "outcome", "technologies", "relevance",
+)
+_TIER1_SOURCE_NAMES = ("summary", "topic", "snippet")
+_TIER1_FLAGS_START = len(_TIER1_RESULT_KEYS)
+
+# Each source CTE yields matching session IDs (capped at per_source_limit);
+# hits/merged dedup them with per-source flags, and the final SELECT applies
+# the boost and orders both buckets: summary matches by boosted BM25, then
+# topic/snippet-only matches by source count and recency.
+#
+# sessions is only joined inside the source CTEs when filtering by project;
+# the final SELECT's join already drops any session-less hit. topic_hits and
+# snippet_hits keep DISTINCT rather than GROUP BY: both need a temp B-tree,
+# but DISTINCT streams rows and stops at the LIMIT, while GROUP BY must
+# consume every FTS match first.
+_TIER1_SQL_TEMPLATE = """
+    WITH
+    summary_hits AS (
+        SELECT src.session_id AS id, bm25(summaries_fts) AS bm25
+        FROM summaries_fts
+        JOIN summaries src ON src.id = summaries_fts.rowid{project_join}
+        WHERE summaries_fts MATCH ?{project_filter}
+        ORDER BY bm25 LIMIT ?
+    ),
+    topic_hits AS (
+        SELECT DISTINCT src.session_id AS id
+        FROM topics_fts
+        JOIN topics src ON src.id = topics_fts.rowid{project_join}
+        WHERE topics_fts MATCH ?{project_filter}
+        LIMIT ?
+    ),
+    snippet_hits AS (
+        SELECT DISTINCT src.session_id AS id
+        FROM code_snippets_fts
+        JOIN code_snippets src ON src.id = code_snippets_fts.rowid{project_join}
+        WHERE code_snippets_fts MATCH ?{project_filter}
+        LIMIT ?
+    ),
+    hits AS (
+        SELECT id, bm25, 1 AS in_summary, 0 AS in_topic, 0 AS in_snippet FROM summary_hits
+        UNION ALL SELECT id, NULL, 0, 1, 0 FROM topic_hits
+        UNION ALL SELECT id, NULL, 0, 0, 1 FROM snippet_hits
+    ),
+    merged AS (
+        SELECT id, MIN(bm25) AS bm25, MAX(in_summary) AS in_summary,
+               MAX(in_topic) AS in_topic, MAX(in_snippet) AS in_snippet
+        FROM hits
+        GROUP BY id
+    )
+    SELECT
+        s.id,
+        s.session_id,
+        s.project_path,
+        s.created_at,
+        s.message_count,
+        sum.brief,
+        sum.outcome,
+        sum.technologies,
+        m.bm25 - ? * (m.in_topic + m.in_snippet) AS relevance,
+        m.in_summary,
+        m.in_topic,
+        m.in_snippet,
+        COALESCE(sum.topics_json, (
+            SELECT json_group_array(topic) FROM topics WHERE topics.session_id = s.id
+        )) AS topics_json
+    FROM merged m
+    JOIN sessions s ON s.id = m.id
+    LEFT JOIN summaries sum ON sum.session_id = s.id
+    ORDER BY m.in_summary DESC, relevance ASC,
+             m.in_topic + m.in_snippet DESC, s.created_at DESC, s.id
+    LIMIT ?
+"""
+
+# Filtered/unfiltered variants are built once at import, so repeat searches
+# reuse identical SQL text instead of re-concatenating it per call
+_TIER1_SQL = _TIER1_SQL_TEMPLATE.format(project_join="", project_filter="")
+_TIER1_SQL_WITH_PROJECT = _TIER1_SQL_TEMPLATE.format(
+    project_join="\n        JOIN sessions s ON s.id = src.session_id",
+    project_filter=" AND s.project_hash = ?",
+)
+
+# search_messages variants, same scheme
+_MESSAGES_SQL_TEMPLATE = """
+    SELECT
+        s.id as session_db_id,
+        s.session_id,
+        s.project_path,
+        s.created_at,
+        m.role,
+        m.content,
+        m.sequence,
+        bm25(messages_fts) as relevance
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN sessions s ON s.id = m.session_id
+    WHERE messages_fts MATCH ?{project_filter}
+    ORDER BY relevance LIMIT ?
+"""
+_MESSAGES_SQL = _MESSAGES_SQL_TEMPLATE.format(project_filter="")
+_MESSAGES_SQL_WITH_PROJECT = _MESSAGES_SQL_TEMPLATE.format(project_filter=" AND s.project_hash = ?")
+
 
 def search_tier1(
     query: str,
@@ -57,149 +172,33 @@ def search_tier1(
     project_hash = hash_project_path(project_path) if project_path else None
     per_source_limit = max(limit * PER_SOURCE_MULTIPLIER, limit)
 
-    with get_connection(readonly=True) as conn:
-        # Step 1: Search summaries with BM25 ranking (primary signal)
-        sql = """
-            SELECT
-                s.id,
-                s.session_id,
-                s.project_path,
-                s.created_at,
-                s.message_count,
-                sum.brief,
-                sum.outcome,
-                sum.technologies,
-                bm25(summaries_fts) as relevance
-            FROM summaries_fts
-            JOIN summaries sum ON sum.id = summaries_fts.rowid
-            JOIN sessions s ON s.id = sum.session_id
-            WHERE summaries_fts MATCH ?
-        """
-        params: list = [fts_query]
-
-        if project_hash:
-            sql += " AND s.project_hash = ?"
-            params.append(project_hash)
-
-        sql += " ORDER BY relevance LIMIT ?"
-        params.append(per_source_limit)
-
-        cursor = conn.execute(sql, params)
-        summary_results = [dict(row) for row in cursor.fetchall()]
-
-        # Step 2: Query topics — collect matching session IDs only
-        sql = """
-            SELECT DISTINCT s.id
-            FROM topics_fts
-            JOIN topics t ON t.id = topics_fts.rowid
-            JOIN sessions s ON s.id = t.session_id
-            WHERE topics_fts MATCH ?
-        """
-        params = [fts_query]
-
-        if project_hash:
-            sql += " AND s.project_hash = ?"
-            params.append(project_hash)
-
-        sql += " LIMIT ?"
-        params.append(per_source_limit)
-
-        cursor = conn.execute(sql, params)
-        topic_match_ids = {row["id"] for row in cursor.fetchall()}
-
-        # Step 3: Query snippets — collect matching session IDs only
-        sql = """
-            SELECT DISTINCT s.id
-            FROM code_snippets_fts
-            JOIN code_snippets cs ON cs.id = code_snippets_fts.rowid
-            JOIN sessions s ON s.id = cs.session_id
-            WHERE code_snippets_fts MATCH ?
-        """
-        params = [fts_query]
-
-        if project_hash:
-            sql += " AND s.project_hash = ?"
-            params.append(project_hash)
-
-        sql += " LIMIT ?"
-        params.append(per_source_limit)
+    sql = _TIER1_SQL_WITH_PROJECT if project_hash else _TIER1_SQL
+    source_params: list = [fts_query, project_hash] if project_hash else [fts_query]
+    source_params.append(per_source_limit)
 
-        cursor = conn.execute(sql, params)
-        snippet_match_ids = {row["id"] for row in cursor.fetchall()}
-
-        # Step 4: Merge into two buckets
-        # Summary bucket: sessions that matched in summaries (boosted by extra sources)
-        by_id = {r["id"]: r for r in summary_results}
-        summary_ids = set(by_id.keys())
-
-        for sid, r in by_id.items():
-            sources = ["summary"]
-            extra = 0
-            if sid in topic_match_ids:
-                sources.append("topic")
-                extra += 1
-            if sid in snippet_match_ids:
-                sources.append("snippet")
-                extra += 1
-            r["match_sources"] = sources
-            r["relevance"] = float(r.get("relevance", 0.0)) - (BOOST_PER_SOURCE * extra)
-
-        summary_bucket = list(by_id.values())
-
-        # Non-summary bucket: sessions matching topic/snippet but NOT summaries
-        non_summary_ids = (topic_match_ids | snippet_match_ids) - summary_ids
-        non_summary_bucket = []
-        if non_summary_ids:
-            placeholders = ",".join("?" * len(non_summary_ids))
-            sql = f"""
-                SELECT s.id, s.session_id, s.project_path, s.created_at, s.message_count,
-                       sum.brief, sum.outcome, sum.technologies
-                FROM sessions s
-                LEFT JOIN summaries sum ON sum.session_id = s.id
-                WHERE s.id IN ({placeholders})
-            """
-            cursor = conn.execute(sql, list(non_summary_ids))
-            for row in cursor.fetchall():
-                d = dict(row)
-                sources = []
-                if d["id"] in topic_match_ids:
-                    sources.append("topic")
-                if d["id"] in snippet_match_ids:
-                    sources.append("snippet")
-                d["match_sources"] = sources
-                d["relevance"] = None
-                non_summary_bucket.append(d)
-
-        # Step 5: Batch-fetch topics, sort, and return
-        merged = summary_bucket + non_summary_bucket
-        merged_ids = [r["id"] for r in merged]
-        if merged_ids:
-            placeholders = ",".join("?" * len(merged_ids))
-            cursor = conn.execute(
-                f"SELECT session_id, topic FROM topics WHERE session_id IN ({placeholders})",
-                merged_ids,
-            )
-            topics_map = {}
-            for row in cursor.fetchall():
-                topics_map.setdefault(row["session_id"], []).append(row["topic"])
-            for result in merged:
-                result["topics"] = topics_map.get(result["id"], [])
-
-        # Summary bucket: by boosted BM25 ascending (more negative = better match)
-        summary_bucket.sort(key=lambda x: x.get("relevance", 0.0))
+    params = source_params * 3 + [BOOST_PER_SOURCE, limit]
 
-        # Non-summary bucket: most sources first, then most recent first
-        non_summary_bucket.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        non_summary_bucket.sort(key=lambda x: -len(x.get("match_sources", [])))
+    with get_connection(readonly=True) as conn:
+        # Keep sqlite3.Row objects until the return boundary; only the
+        # leading result columns are copied into the output dicts.
+        rows = conn.execute(sql, params).fetchall()
 
-        final = summary_bucket + non_summary_bucket
-        return final[:limit]
+    results = []
+    for row in rows:
+        result = dict(zip(_TIER1_RESULT_KEYS, row))
+        result["match_sources"] = [
+            name for name, flag in zip(_TIER1_SOURCE_NAMES, row[_TIER1_FLAGS_START:]) if flag
+        ]
+        result["topics"] = json.loads(row["topics_json"])
+        results.append(result)
+    return results
 
 
 def search_tier2(
     session_ids: list[int],
     include_messages: bool = True,
-    include_snippets: bool = True
+    include_snippets: bool = True,
+    max_messages: Optional[int] = None
 ) -> list[dict]:
     """
     Tier 2: Deep content fetch.
@@ -210,6 +209,8 @@ def search_tier2(
         session_ids: List of session database IDs to fetch
         include_messages: Include message content
         include_snippets: Include code snippets
+        max_messages: If set, fetch only the first N messages per session
+                      (windowed in SQL, so long sessions aren't fully read)
 
     Returns:
         List of sessions with full content
@@ -223,7 +224,10 @@ def search_tier2(
         # Batch-fetch sessions + summaries
         cursor = conn.execute(f"""
             SELECT s.*, sum.brief, sum.detailed, sum.key_decisions,
-                   sum.problems_solved, sum.technologies, sum.outcome, sum.user_note
+                   sum.problems_solved, sum.technologies, sum.outcome, sum.user_note,
+                   COALESCE(sum.topics_json, (
+                       SELECT json_group_array(topic) FROM topics WHERE topics.session_id = s.id
+                   )) AS topics_json
             FROM sessions s
             LEFT JOIN summaries sum ON sum.session_id = s.id
             WHERE s.id IN ({placeholders})
@@ -237,7 +241,7 @@ def search_tier2(
                         session[field] = json.loads(session[field])
                     except (json.JSONDecodeError, ValueError):
                         logger.warning("Failed to parse JSON in field '%s' for session %d", field, session['id'])
-            session['topics'] = []
+            session['topics'] = json.loads(session.pop('topics_json'))
             if include_messages:
                 session['messages'] = []
             if include_snippets:
@@ -247,23 +251,27 @@ def search_tier2(
         if not sessions_map:
             return []
 
-        # Batch-fetch topics
-        cursor = conn.execute(
-            f"SELECT session_id, topic FROM topics WHERE session_id IN ({placeholders})",
-            session_ids,
-        )
-        for row in cursor.fetchall():
-            if row['session_id'] in sessions_map:
-                sessions_map[row['session_id']]['topics'].append(row['topic'])
-
         # Batch-fetch messages if requested
         if include_messages:
-            cursor = conn.execute(f"""
-                SELECT session_id, role, content, sequence
-                FROM messages
-                WHERE session_id IN ({placeholders})
-                ORDER BY session_id, sequence
-            """, session_ids)
+            if max_messages is not None:
+                cursor = conn.execute(f"""
+                    SELECT session_id, role, content, sequence
+                    FROM (
+                        SELECT session_id, role, content, sequence,
+                               ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY sequence) AS rn
+                        FROM messages
+                        WHERE session_id IN ({placeholders})
+                    )
+                    WHERE rn <= ?
+                    ORDER BY session_id, sequence
+                """, [*session_ids, max_messages])
+            else:
+                cursor = conn.execute(f"""
+                    SELECT session_id, role, content, sequence
+                    FROM messages
+                    WHERE session_id IN ({placeholders})
+                    ORDER BY session_id, sequence
+                """, session_ids)
             for row in cursor.fetchall():
                 if row['session_id'] in sessions_map:
                     sessions_map[row['session_id']]['messages'].append(dict(row))
@@ -306,31 +314,12 @@ def search_messages(
     fts_query = format_fts_query(query)
     project_hash = hash_project_path(project_path) if project_path else None
 
-    with get_connection(readonly=True) as conn:
-        sql = """
-            SELECT
-                s.id as session_db_id,
-                s.session_id,
-                s.project_path,
-                s.created_at,
-                m.role,
-                m.content,
-                m.sequence,
-                bm25(messages_fts) as relevance
-            FROM messages_fts
-            JOIN messages m ON m.id = messages_fts.rowid
-            JOIN sessions s ON s.id = m.session_id
-            WHERE messages_fts MATCH ?
-        """
-        params = [fts_query]
-
-        if project_hash:
-            sql += " AND s.project_hash = ?"
-            params.append(project_hash)
-
-        sql += " ORDER BY relevance LIMIT ?"
-        params.append(limit)
+    if project_hash:
+        sql, params = _MESSAGES_SQL_WITH_PROJECT, [fts_query, project_hash, limit]
+    else:
+        sql, params = _MESSAGES_SQL, [fts_query, limit]
 
+    with get_connection(readonly=True) as conn:
         cursor = conn.execute(sql, params)
         return [dict(row) for row in cursor.fetchall()]
 
@@ -339,7 +328,8 @@ def full_search(
     query: str,
     project_path: Optional[str] = None,
     detailed: bool = False,
-    limit: int = 10
+    limit: int = 10,
+    max_messages: Optional[int] = None
 ) -> dict:
     """
     Perform a full two-tier search.
@@ -349,6 +339,7 @@ def full_search(
         project_path: Optional project filter
         detailed: If True, include tier 2 content
         limit: Maximum results
+        max_messages: Cap on messages fetched per session in tier 2 (None = all)
 
     Returns:
         Search results dict
@@ -366,7 +357,7 @@ def full_search(
     # Tier 2: Deep content if requested
     if detailed and tier1_results:
         session_ids = [r['id'] for r in tier1_results]
-        tier2_results = search_tier2(session_ids)
+        tier2_results = search_tier2(session_ids, max_messages=max_messages)
 
         # Merge tier 2 content into tier 1 results
         tier2_map = {r['id']: r for r in tier2_results}
@@ -381,6 +372,9 @@ def format_results_markdown(results: dict, detailed: bool = False) -> str:
     """
     Format search results as markdown for Claude.
 
+    Each session is rendered as a handful of pre-formatted blocks (see the
+    ``_*_TMPL`` constants) rather than one list entry per output line.
+
     Args:
         results: Search results from full_search
         detailed: Include expandable full content
@@ -388,21 +382,16 @@ def format_results_markdown(results: dict, detailed: bool = False) -> str:
     Returns:
         Markdown formatted string
     """
-    lines = [
-        "# Context Memory Results",
-        f"**Query**: \"{results['query']}\"",
-        f"**Results**: {results['result_count']} sessions",
-        ""
-    ]
+    chunks = [_RESULTS_HEADER_TMPL.format(query=results['query'], count=results['result_count'])]
 
     if not results['sessions']:
         if not db_exists():
-            lines.append("No sessions stored yet. Use /remember to save your first session.")
+            chunks.append("No sessions stored yet. Use /remember to save your first session.")
         else:
-            lines.append("No matching sessions found. Try broader search terms or remove the --project filter.")
-        return '\n'.join(lines)
+            chunks.append("No matching sessions found. Try broader search terms or remove the --project filter.")
+        return '\n'.join(chunks)
 
-    lines.append("---")
+    chunks.append("---")
 
     for i, session in enumerate(results['sessions'], 1):
         # Format date
@@ -416,22 +405,21 @@ def format_results_markdown(results: dict, detailed: bool = False) -> str:
             project = project.replace('\\', '/').split('/')[-1]
 
         # Rank-based display (BM25 scores are already sorted)
-        relevance_display = f"Match #{i}"
         match_sources = session.get('match_sources')
-        source_display = ""
-        if match_sources:
-            source_display = f" | matched in: {', '.join(match_sources)}"
-
-        lines.append(f"## {i}. {created} | {project} ({relevance_display}{source_display})")
+        source_display = f" | matched in: {', '.join(match_sources)}" if match_sources else ""
 
-        # Brief summary
-        brief = session.get('brief', 'No summary available')
-        lines.append(f"**Summary**: {brief}")
+        chunks.append(_SESSION_HEADER_TMPL.format(
+            i=i,
+            created=created,
+            project=project,
+            sources=source_display,
+            brief=session.get('brief', 'No summary available'),
+        ))
 
         # Topics
         topics = session.get('topics', [])
         if topics:
-            lines.append(f"**Topics**: {', '.join(topics)}")
+            chunks.append(f"**Topics**: {', '.join(topics)}")
 
         # Technologies
         techs = session.get('technologies')
@@ -443,7 +431,7 @@ def format_results_markdown(results: dict, detailed: bool = False) -> str:
                     logger.warning("Failed to parse technologies JSON for session %s", session.get('id'))
                     techs = [techs]
             if techs:
-                lines.append(f"**Technologies**: {', '.join(techs)}")
+                chunks.append(f"**Technologies**: {', '.join(techs)}")
 
         # Key decisions (if available)
         decisions = session.get('key_decisions')
@@ -455,9 +443,8 @@ def format_results_markdown(results: dict, detailed: bool = False) -> str:
                     logger.warning("Failed to parse decisions JSON for session %s", session.get('id'))
                     decisions = [decisions]
             if decisions:
-                lines.append("**Decisions**:")
-                for d in decisions[:MAX_DECISIONS_DISPLAY]:
-                    lines.append(f"- {d}")
+                chunks.append("**Decisions**:")
+                chunks.append('\n'.join(f"- {d}" for d in decisions[:MAX_DECISIONS_DISPLAY]))
 
         # Detailed content in expandable section
         if detailed:
@@ -466,41 +453,37 @@ def format_results_markdown(results: dict, detailed: bool = False) -> str:
             snippets = session.get('code_snippets', [])
 
             if detailed_text or messages or snippets:
-                lines.append("")
-                lines.append("<details><summary>Full Context</summary>")
-                lines.append("")
+                chunks.append(_DETAILS_OPEN)
 
                 if detailed_text:
-                    lines.append("### Detailed Summary")
-                    lines.append(detailed_text)
-                    lines.append("")
+                    chunks.append(_DETAILED_SUMMARY_TMPL.format(text=detailed_text))
 
                 if messages:
-                    lines.append("### Key Messages")
-                    for msg in messages[:MAX_MESSAGES_DISPLAY]:
-                        role = msg.get('role', 'user').capitalize()
-                        content = truncate_text(msg.get('content', ''), MAX_MESSAGE_LENGTH)
-                        lines.append(f"**{role}**: {content}")
-                        lines.append("")
+                    chunks.append("### Key Messages")
+                    chunks.extend(
+                        _MESSAGE_TMPL.format(
+                            role=msg.get('role', 'user').capitalize(),
+                            content=truncate_text(msg.get('content', ''), MAX_MESSAGE_LENGTH),
+                        )
+                        for msg in messages[:MAX_MESSAGES_DISPLAY]
+                    )
 
                 if snippets:
-                    lines.append("### Code Snippets")
-                    for snip in snippets[:MAX_SNIPPETS_DISPLAY]:
-                        lang = snip.get('language', '')
-                        desc = snip.get('description', 'Code snippet')
-                        code = truncate_text(snip.get('code', ''), MAX_SNIPPET_LENGTH)
-                        lines.append(f"**{desc}**")
-                        lines.append(f"```{lang}")
-                        lines.append(code)
-                        lines.append("```")
-                        lines.append("")
+                    chunks.append("### Code Snippets")
+                    chunks.extend(
+                        _SNIPPET_TMPL.format(
+                            desc=snip.get('description', 'Code snippet'),
+                            lang=snip.get('language', ''),
+                            code=truncate_text(snip.get('code', ''), MAX_SNIPPET_LENGTH),
+                        )
+                        for snip in snippets[:MAX_SNIPPETS_DISPLAY]
+                    )
 
-                lines.append("</details>")
+                chunks.append("</details>")
 
-        lines.append("")
-        lines.append("---")
+        chunks.append(_SESSION_FOOTER)
 
-    return '\n'.join(lines)
+    return '\n'.join(chunks)
 
 
 if __name__ == "__main__":
@@ -523,7 +506,9 @@ if __name__ == "__main__":
         query=args.query,
         project_path=args.project,
         detailed=args.detailed,
-        limit=args.limit
+        limit=args.limit,
+        # Markdown only renders the first MAX_MESSAGES_DISPLAY messages per session
+        max_messages=MAX_MESSAGES_DISPLAY if args.format == 'markdown' else None,
     )
 
     if args.format == 'json':
@@ -4,13 +4,28 @@ Provides connection management and helper functions.
 """
 from __future__ import annotations
 
-import hashlib
+import atexit
+import functools
+import json
 import os
 import platform
-import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    import sqlite3
+
+try:
+    import orjson  # optional: faster JSON for large transcript/checkpoint payloads
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard  # optional: zstd for checkpoint blobs (zlib is used otherwise)
+except ImportError:
+    zstandard = None
 
 # Database location — override with CONTEXT_MEMORY_DB_PATH env var
 _db_path_override = os.environ.get("CONTEXT_MEMORY_DB_PATH")
@@ -32,53 +47,168 @@ def get_db_path() -> Path:
     return DB_PATH
 
 
+# Per-connection settings, applied in one executescript() call
+_CONNECTION_PRAGMAS = """
+    PRAGMA foreign_keys=ON;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-64000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA busy_timeout=5000;
+"""
+
+# Prepared-statement cache per connection (sqlite3's default is 128). Pooled
+# connections live for the whole process, so keep room for every distinct
+# query text a save, search and prune issue between them.
+STATEMENT_CACHE_SIZE = 256
+
+# Database paths already switched to WAL by this process
+_wal_enabled: set[Path] = set()
+
+# Idle connections kept open for reuse, per thread, keyed by (path, readonly).
+# Opening one costs a file open, a schema parse and the pragma batch above,
+# and a single save or search opens several in a row. Each entry records the
+# pool generation it was opened under and the (device, inode) of the file it
+# opened: reset_connection_state() bumps the generation after this process
+# removes the database, and the file identity catches another process (or a
+# manual rm) deleting or replacing it, so neither is ever written through a
+# stale handle.
+_pool = threading.local()
+_pool_generation = 0
+
+
+def _idle_connections() -> dict:
+    idle = getattr(_pool, "idle", None)
+    if idle is None:
+        idle = _pool.idle = {}
+    return idle
+
+
+def close_pooled_connections() -> None:
+    """Close this thread's idle pooled connections."""
+    idle = _idle_connections()
+    for conn, _generation, _identity in idle.values():
+        conn.close()
+    idle.clear()
+
+
+def _db_file_identity() -> Optional[tuple]:
+    """(device, inode) of the database file, or None if it does not exist."""
+    try:
+        st = os.stat(DB_PATH)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+atexit.register(close_pooled_connections)
+
+
 @contextmanager
 def get_connection(readonly: bool = False) -> Iterator[sqlite3.Connection]:
     """
     Context manager for database connections.
-    Uses WAL mode for better concurrent access.
+    Uses WAL mode for better concurrent access; writers wait up to 5s for locks.
+
+    Connections are reused: on exit any uncommitted work is rolled back (as
+    closing would) and the connection is parked for the next call from the
+    same thread, unless the database file has since been deleted or replaced.
+    A nested call gets its own connection.
 
     Args:
         readonly: If True, open in read-only mode
     """
+    key = (str(DB_PATH), readonly)
+    idle = _idle_connections()
+    pooled = idle.pop(key, None)
+    identity = _db_file_identity()
+    if pooled is not None and pooled[1:] == (_pool_generation, identity):
+        conn = pooled[0]
+    else:
+        if pooled is not None:
+            pooled[0].close()
+            # A file recreated behind our back starts out in rollback-journal mode
+            _wal_enabled.discard(DB_PATH)
+        conn = _open_connection(readonly)
+        identity = _db_file_identity()
+    generation = _pool_generation
+
+    try:
+        yield conn
+    except BaseException:
+        conn.close()
+        raise
+    if conn.in_transaction:
+        conn.rollback()
+    if key in idle or generation != _pool_generation:
+        conn.close()
+    else:
+        idle[key] = (conn, generation, identity)
+
+
+def readonly_uri(path) -> str:
+    """SQLite URI that opens the database at ``path`` read-only.
+
+    Built with Path.as_uri() so characters such as '?', '#' and '%' in the
+    path are percent-encoded instead of being read as URI syntax.
+    """
+    return f"{Path(path).absolute().as_uri()}?mode=ro"
+
+
+def _open_connection(readonly: bool) -> sqlite3.Connection:
+    """Open and configure a new connection to DB_PATH."""
+    # Imported here so hook processes that exit before touching the database
+    # (e.g. pre_compact_save with nothing to save) skip loading sqlite3
+    import sqlite3
+
     ensure_db_dir()
 
     if readonly:
-        uri = f"file:{DB_PATH}?mode=ro"
-        conn = sqlite3.connect(uri, uri=True)
+        conn = sqlite3.connect(readonly_uri(DB_PATH), uri=True, cached_statements=STATEMENT_CACHE_SIZE)
     else:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE)
 
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.execute("PRAGMA synchronous=NORMAL")
-    conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
-    conn.execute("PRAGMA temp_store=MEMORY")
-
-    try:
-        yield conn
-    finally:
-        conn.close()
+    # journal_mode=WAL is persistent in the database file, so it only needs
+    # issuing once per database per process; the rest are per-connection.
+    # (A read-only connection can't switch modes, so only record confirmed WAL.)
+    if DB_PATH not in _wal_enabled:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode == "wal":
+            _wal_enabled.add(DB_PATH)
+    conn.executescript(_CONNECTION_PRAGMAS)
+    return conn
 
 
 def hash_project_path(project_path: str) -> str:
     """
     Create a consistent hash for a project path.
     Useful for quick project-scoped queries.
+
+    Results are memoized; the working directory and platform are part of the
+    cache key because relative paths and Windows normalization depend on them.
     """
+    return _hash_project_path_cached(project_path, os.getcwd(), platform.system())
+
+
+@functools.lru_cache(maxsize=128)
+def _hash_project_path_cached(project_path: str, cwd: str, system: str) -> str:
+    """Uncached body of hash_project_path (cwd only participates in the cache key)."""
     normalized = os.path.normpath(os.path.abspath(os.path.expanduser(project_path)))
 
     # Fix MSYS2/Git Bash paths: /c/Users/... becomes C:\c\Users\... after abspath
-    if platform.system() == 'Windows' and len(normalized) > 3:
+    if system == 'Windows' and len(normalized) > 3:
         parts = normalized.split(os.sep)
         if len(parts) >= 3 and len(parts[1]) == 1 and parts[1].isalpha():
             normalized = parts[1].upper() + ':\\' + os.sep.join(parts[2:])
 
     # Case-insensitive on Windows
-    if platform.system() == 'Windows':
+    if system == 'Windows':
         normalized = normalized.lower()
 
+    import hashlib
+
+    # SHA-256 is kept (rather than a faster hash) because existing databases
+    # store these values in sessions.project_hash and context_checkpoints.
     return hashlib.sha256(normalized.encode()).hexdigest()[:16]
 
 
@@ -120,10 +250,56 @@ def db_exists() -> bool:
     return DB_PATH.exists()
 
 
-VALID_TABLES = {'sessions', 'messages', 'summaries', 'topics', 'code_snippets', 'schema_version', 'context_checkpoints'}
+def reset_connection_state() -> None:
+    """Retire pooled connections and forget which files are in WAL mode; call after removing the database."""
+    global _pool_generation
+    _wal_enabled.clear()
+    _pool_generation += 1
+    close_pooled_connections()
+
+
+# Bytes of the WAL-index header at the start of the -shm file: its change
+# counter, frame count (mxFrame) and salts move on every commit, including
+# one that rewrites a restarted WAL to the same size
+_WAL_INDEX_HEADER_SIZE = 48
+
+
+def db_file_fingerprint() -> tuple:
+    """
+    Path plus (inode, mtime_ns, size) of the database file and its WAL, and
+    the WAL-index header from the -shm file.
+
+    Any write, schema changes included, touches one of the two files (in WAL
+    mode DDL lands in the -wal file until a checkpoint). File times alone can
+    miss two commits in the same mtime tick once a checkpoint has restarted
+    the WAL at the same size, so the WAL-index header, which records the
+    committed frame count and the WAL's salts, is compared too. An unchanged
+    fingerprint therefore means the database contents are unchanged.
+    """
+    db_path = str(DB_PATH)
+    parts = [db_path]
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            st = os.stat(path)
+        except OSError:
+            parts.append(None)
+        else:
+            parts.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    try:
+        with open(f"{db_path}-shm", "rb") as f:
+            parts.append(f.read(_WAL_INDEX_HEADER_SIZE))
+    except OSError:
+        parts.append(None)
+    return tuple(parts)
+
+
+VALID_TABLES = {
+    'sessions', 'messages', 'summaries', 'topics', 'code_snippets', 'schema_version',
+    'context_checkpoints', 'checkpoint_counters',
+}
 
 # Tables to include in stats output (skip internal tables)
-STATS_TABLES = VALID_TABLES - {'schema_version'}
+STATS_TABLES = VALID_TABLES - {'schema_version', 'checkpoint_counters'}
 
 
 def get_table_count(table_name: str) -> int:
@@ -147,20 +323,93 @@ def truncate_text(text: str, max_length: int = 500) -> str:
     """Truncate text to a maximum length, adding ellipsis if needed."""
     if len(text) <= max_length:
         return text
-    return text[:max_length - 3] + "..."
+    if max_length <= 3:
+        # No room for an ellipsis; never return more than max_length chars
+        return text[:max(max_length, 0)]
+    return f"{text[:max_length - 3]}..."
+
+
+def json_loads(data):
+    """
+    Parse JSON from str or bytes, using orjson when installed.
 
+    Raises ValueError on malformed input (both json.JSONDecodeError and
+    orjson.JSONDecodeError subclass it).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> str:
+    """Serialize to a compact JSON string, using orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # e.g. lone surrogates, which stdlib json escapes instead of rejecting
+    return json.dumps(obj, separators=(",", ":"))
+
+
+# context_checkpoints.messages_codec values
+CODEC_NONE = 0  # plain JSON text (checkpoints saved before schema v11)
+CODEC_ZSTD = 1
+CODEC_ZLIB = 2
+
+
+def compress_blob(data: bytes) -> tuple[bytes, int]:
+    """
+    Compress a checkpoint blob, returning (blob, codec).
 
-def read_hook_input():
+    Uses zstd (level 3) when the optional zstandard package is installed,
+    otherwise stdlib zlib (level 1); both shrink transcript JSON several-fold.
+    """
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data), CODEC_ZSTD
+    import zlib
+    return zlib.compress(data, 1), CODEC_ZLIB
+
+
+def decompress_blob(blob, codec: int):
+    """
+    Reverse compress_blob(). CODEC_NONE blobs are returned unchanged.
+
+    Raises ValueError if the blob cannot be decoded, including a zstd blob
+    read by a process without zstandard installed.
+    """
+    if codec == CODEC_NONE:
+        return blob
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstandard is required to read this checkpoint")
+        try:
+            return zstandard.ZstdDecompressor().decompress(blob)
+        except zstandard.ZstdError as e:
+            raise ValueError(str(e)) from e
+    if codec == CODEC_ZLIB:
+        import zlib
+        try:
+            return zlib.decompress(blob)
+        except zlib.error as e:
+            raise ValueError(str(e)) from e
+    raise ValueError(f"Unknown checkpoint codec: {codec}")
+
+
+def read_hook_input(stream=None):
     """Read the JSON payload from stdin. Return dict or None on failure.
 
     Shared by auto_save.py and pre_compact_save.py hook handlers.
+
+    Args:
+        stream: Text stream to read instead of sys.stdin
     """
-    import json
     import sys
+    if stream is None:
+        stream = sys.stdin
     try:
-        if sys.stdin is None or sys.stdin.closed:
+        if stream is None or stream.closed:
             return None
-        raw = sys.stdin.read()
+        raw = stream.read()
         if not raw or not raw.strip():
             return None
         return json.loads(raw)
@@ -186,11 +435,20 @@ def extract_text_content(content, max_length=None):
         result = content
     elif isinstance(content, list):
         parts = []
+        # With max_length, stop once the joined text is long enough; blocks
+        # past that point (often large tool output) can't reach the result.
+        budget = max_length
         for block in content:
             if isinstance(block, dict) and block.get("type") == "text":
                 text = block.get("text", "")
                 if text:
-                    parts.append(text)
+                    if budget is None:
+                        parts.append(text)
+                        continue
+                    parts.append(text[:max_length])
+                    budget -= len(text) + 1  # + the joining newline
+                    if budget < 0:
+                        break
         result = "\n".join(parts)
     else:
         result = ""
@@ -9,12 +9,18 @@ Requires the optional `mcp` package: pip install mcp
 """
 from __future__ import annotations
 
+import atexit
 import contextlib
+import importlib.util
 import io
-import json
+import os
 import socket
+import sqlite3
+import subprocess
 import sys
 import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 # Ensure sibling modules (db_init, db_save, db_search) are importable regardless
@@ -41,7 +47,7 @@ except ImportError:
 from db_init import get_stats, init_database  # noqa: E402
 from db_save import save_full_session  # noqa: E402
 from db_search import full_search  # noqa: E402
-from db_utils import db_exists, get_connection, hash_project_path  # noqa: E402
+from db_utils import db_exists, decompress_blob, get_db_path, hash_project_path, json_loads, readonly_uri  # noqa: E402
 
 mcp = FastMCP(
     "context-memory",
@@ -59,6 +65,87 @@ def _capture_stdout(fn, *args, **kwargs):
         return fn(*args, **kwargs)
 
 
+# Read-result caches for context_search / context_stats. Writes made through
+# this server invalidate them; the TTLs bound staleness from writes made
+# elsewhere (hooks, CLI, dashboard).
+SEARCH_CACHE_SIZE = 128
+SEARCH_CACHE_TTL = 30.0   # seconds
+STATS_CACHE_TTL = 5.0     # seconds
+
+_search_cache: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+_stats_cache: tuple[float, str, dict] | None = None
+_cache_lock = threading.Lock()
+
+
+def _cache_invalidate() -> None:
+    """Drop all cached search and stats results (call after any write)."""
+    global _stats_cache
+    with _cache_lock:
+        _search_cache.clear()
+        _stats_cache = None
+
+
+# Process-lived read-only connection for checkpoint loads, so SQLite's page
+# cache survives across tool calls. FastMCP may dispatch tools from several
+# threads, so every use happens under _ro_lock. Keyed by path and file
+# identity because the database location can change (tests) and the file can
+# be replaced under the same path (init_database(force=True) in any process).
+READ_CACHE_SIZE_KIB = 65536
+READ_STATEMENT_CACHE_SIZE = 256
+
+_ro_conn: sqlite3.Connection | None = None
+_ro_conn_key: tuple | None = None
+_ro_lock = threading.Lock()
+
+
+def _db_file_key(db_path: str) -> tuple:
+    """Path plus (device, inode) of the database file, or None for a missing file."""
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return (db_path, None)
+    return (db_path, (st.st_dev, st.st_ino))
+
+
+def _ro_connection() -> sqlite3.Connection:
+    """Return the shared read-only connection, (re)opening it if needed. Caller holds _ro_lock."""
+    global _ro_conn, _ro_conn_key
+    db_path = str(get_db_path())
+    key = _db_file_key(db_path)
+    if _ro_conn is None or _ro_conn_key != key:
+        _close_ro_connection()
+        conn = sqlite3.connect(
+            readonly_uri(db_path), uri=True, check_same_thread=False, cached_statements=READ_STATEMENT_CACHE_SIZE
+        )
+        # Plain tuples (no sqlite3.Row): callers unpack the known column order
+        conn.executescript(
+            f"""
+            PRAGMA query_only=1;
+            PRAGMA cache_size=-{READ_CACHE_SIZE_KIB};
+            PRAGMA busy_timeout=5000;
+            """
+        )
+        _ro_conn, _ro_conn_key = conn, key
+    return _ro_conn
+
+
+def _close_ro_connection() -> None:
+    """Close the shared read-only connection, if open."""
+    global _ro_conn, _ro_conn_key
+    if _ro_conn is not None:
+        _ro_conn.close()
+    _ro_conn, _ro_conn_key = None, None
+
+
+def _release_ro_connection() -> None:
+    """Close the shared read-only connection under its lock."""
+    with _ro_lock:
+        _close_ro_connection()
+
+
+atexit.register(_release_ro_connection)
+
+
 @mcp.tool()
 def context_search(
     query: str,
@@ -81,13 +168,28 @@ def context_search(
     Returns:
         Dict with keys: query, project_path, result_count, sessions.
     """
-    return full_search(
+    key = (str(get_db_path()), query, project_path, detailed, limit)
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _search_cache.get(key)
+        if hit is not None and now - hit[0] < SEARCH_CACHE_TTL:
+            _search_cache.move_to_end(key)
+            return hit[1]
+
+    result = full_search(
         query=query,
         project_path=project_path,
         detailed=detailed,
         limit=limit,
     )
 
+    with _cache_lock:
+        _search_cache[key] = (now, result)
+        _search_cache.move_to_end(key)
+        if len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    return result
+
 
 @mcp.tool()
 def context_save(
@@ -120,17 +222,20 @@ def context_save(
     Returns:
         Dict with saved database IDs (session_id, summary_id, etc.).
     """
-    return _capture_stdout(
-        save_full_session,
-        session_id=session_id,
-        project_path=project_path,
-        messages=messages,
-        summary=summary,
-        topics=topics,
-        code_snippets=code_snippets,
-        user_note=user_note,
-        metadata=metadata,
-    )
+    try:
+        return _capture_stdout(
+            save_full_session,
+            session_id=session_id,
+            project_path=project_path,
+            messages=messages,
+            summary=summary,
+            topics=topics,
+            code_snippets=code_snippets,
+            user_note=user_note,
+            metadata=metadata,
+        )
+    finally:
+        _cache_invalidate()
 
 
 @mcp.tool()
@@ -143,7 +248,17 @@ def context_stats() -> dict:
         Dict mapping table names to row counts, plus db_size_bytes.
         Empty dict if the database does not exist.
     """
-    return _capture_stdout(get_stats)
+    global _stats_cache
+    db_path = str(get_db_path())
+    now = time.monotonic()
+    with _cache_lock:
+        if _stats_cache is not None and _stats_cache[1] == db_path and now - _stats_cache[0] < STATS_CACHE_TTL:
+            return _stats_cache[2]
+
+    stats = _capture_stdout(get_stats)
+    with _cache_lock:
+        _stats_cache = (now, db_path, stats)
+    return stats
 
 
 @mcp.tool()
@@ -160,12 +275,42 @@ def context_init(force: bool = False) -> dict:
     Returns:
         Dict with 'created' (bool) and 'message' (str).
     """
+    if force:
+        # The database file is about to be replaced; drop the handle to the old one
+        _release_ro_connection()
     created = _capture_stdout(init_database, force=force)
+    _cache_invalidate()
     if created:
         return {"created": True, "message": "Database initialized."}
     return {"created": False, "message": "Database already exists."}
 
 
+# Checkpoint lookups, built once. Each *_SQL pair is indexed by whether the
+# messages blob is selected: (metadata columns, full columns).
+# Order matters: context_load_checkpoint unpacks rows positionally
+_CHECKPOINT_COLUMNS = "id, session_id, project_path, checkpoint_number, trigger_type, message_count, created_at"
+
+_CHECKPOINT_SQL_TEMPLATE = """
+    SELECT {columns}
+    FROM context_checkpoints
+    {where}
+    ORDER BY created_at DESC, checkpoint_number DESC
+    LIMIT 1
+"""
+
+
+def _checkpoint_sql(where: str) -> tuple[str, str]:
+    return (
+        _CHECKPOINT_SQL_TEMPLATE.format(columns=_CHECKPOINT_COLUMNS, where=where),
+        _CHECKPOINT_SQL_TEMPLATE.format(columns=_CHECKPOINT_COLUMNS + ", messages, messages_codec", where=where),
+    )
+
+
+_CHECKPOINT_BY_SESSION_SQL = _checkpoint_sql("WHERE session_id = ?")
+_CHECKPOINT_BY_PROJECT_SQL = _checkpoint_sql("WHERE project_hash = ?")
+_CHECKPOINT_LATEST_SQL = _checkpoint_sql("")
+
+
 @mcp.tool()
 def context_load_checkpoint(
     session_id: str | None = None,
@@ -195,64 +340,44 @@ def context_load_checkpoint(
     if not db_exists():
         return {"error": "Database does not exist.", "messages": []}
 
-    # Select columns based on metadata_only flag
-    if metadata_only:
-        columns = "id, session_id, project_path, checkpoint_number, trigger_type, message_count, created_at"
-    else:
-        columns = "id, session_id, project_path, checkpoint_number, trigger_type, messages, message_count, created_at"
+    # The messages blob is only selected when messages are returned
+    with_blob = not metadata_only
 
-    with get_connection(readonly=True) as conn:
+    with _ro_lock:
+        conn = _ro_connection()
         if session_id:
-            cursor = conn.execute(
-                f"""
-                SELECT {columns}
-                FROM context_checkpoints
-                WHERE session_id = ?
-                ORDER BY created_at DESC, checkpoint_number DESC
-                LIMIT 1
-                """,
-                (session_id,),
-            )
+            cursor = conn.execute(_CHECKPOINT_BY_SESSION_SQL[with_blob], (session_id,))
         elif project_path:
-            proj_hash = hash_project_path(project_path)
-            cursor = conn.execute(
-                f"""
-                SELECT {columns}
-                FROM context_checkpoints
-                WHERE project_hash = ?
-                ORDER BY created_at DESC, checkpoint_number DESC
-                LIMIT 1
-                """,
-                (proj_hash,),
-            )
+            cursor = conn.execute(_CHECKPOINT_BY_PROJECT_SQL[with_blob], (hash_project_path(project_path),))
         else:
             # No filter: return most recent checkpoint overall
-            cursor = conn.execute(
-                f"""
-                SELECT {columns}
-                FROM context_checkpoints
-                ORDER BY created_at DESC, checkpoint_number DESC
-                LIMIT 1
-                """
-            )
+            cursor = conn.execute(_CHECKPOINT_LATEST_SQL[with_blob])
 
         row = cursor.fetchone()
         if not row:
             return {"error": "No checkpoints found.", "messages": []}
 
-        result = dict(row)
+        checkpoint_id, sid, ppath, number, trigger, count, created_at = row[:7]
+        result = {
+            "id": checkpoint_id,
+            "session_id": sid,
+            "project_path": ppath,
+            "checkpoint_number": number,
+            "trigger_type": trigger,
+            "message_count": count,
+            "created_at": created_at,
+        }
 
         if metadata_only:
             result["metadata_only"] = True
             return result
 
-        # Parse the messages JSON blob
+        blob, codec = row[7:]
         try:
-            messages = json.loads(result["messages"])
-        except (json.JSONDecodeError, TypeError):
-            messages = []
-
-        # Apply last_n_messages filter
+            messages = json_loads(decompress_blob(blob, codec))
+        except (ValueError, TypeError) as e:
+            # e.g. a zstd blob read without zstandard installed
+            return {**result, "error": f"Checkpoint messages could not be read: {e}", "messages": []}
         if last_n_messages is not None and last_n_messages > 0:
             messages = messages[-last_n_messages:]
 
@@ -262,13 +387,28 @@ def context_load_checkpoint(
     return result
 
 
-_dashboard_thread = None
+_dashboard_proc: subprocess.Popen | None = None
 _dashboard_port = None
 
 
 def _port_in_use(port: int) -> bool:
-    """Check if a port is already in use."""
+    """Check if a port is already in use.
+
+    Probes with bind() first, so a free port is confirmed without a TCP
+    handshake. A failed bind is then confirmed with connect(): a port only
+    held by a closed socket in TIME_WAIT (e.g. right after stopping the
+    dashboard) refuses connections and counts as free. SO_REUSEADDR is not
+    used because on Windows it lets the bind succeed over a live listener.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("127.0.0.1", port))
+        except OSError:
+            pass
+        else:
+            return False
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(1.0)
         return s.connect_ex(("127.0.0.1", port)) == 0
 
 
@@ -276,8 +416,9 @@ def _port_in_use(port: int) -> bool:
 def context_dashboard(port: int = 5111) -> dict:
     """Launch the context memory web dashboard in the background.
 
-    Starts a local Flask web server serving the dashboard UI.
-    If already running, returns the existing URL.
+    Starts a local Flask web server serving the dashboard UI in a
+    separate process, so dashboard requests never compete with MCP
+    tool calls. If already running, returns the existing URL.
 
     Requires: pip install flask flask-cors
 
@@ -287,27 +428,58 @@ def context_dashboard(port: int = 5111) -> dict:
     Returns:
         Dict with 'url' and 'status'.
     """
-    global _dashboard_thread, _dashboard_port
+    global _dashboard_proc, _dashboard_port
 
-    if _dashboard_thread is not None and _dashboard_thread.is_alive():
+    if _dashboard_proc is not None and _dashboard_proc.poll() is None:
         return {"url": f"http://127.0.0.1:{_dashboard_port}", "status": "already_running"}
 
     if _port_in_use(port):
         return {"url": f"http://127.0.0.1:{port}", "status": "port_in_use"}
 
-    try:
-        from dashboard import app as flask_app  # noqa: E402
-    except ImportError as e:
-        return {"error": str(e), "status": "import_error"}
-
-    def _run():
-        flask_app.run(host="127.0.0.1", port=port, debug=False, use_reloader=False)
+    # Check the optional dependencies here: the child's import errors go nowhere
+    missing = [name for name in ("flask", "flask_cors") if importlib.util.find_spec(name) is None]
+    if missing:
+        return {"error": f"No module named {missing[0]!r}", "status": "import_error"}
 
+    # Detach from the server's session/process group; stdio is the MCP transport,
+    # so the child must not inherit it.
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+    _dashboard_proc = subprocess.Popen(
+        [sys.executable, str(Path(_scripts_dir) / "dashboard.py"), "--port", str(port)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **detach,
+    )
     _dashboard_port = port
-    _dashboard_thread = threading.Thread(target=_run, daemon=True)
-    _dashboard_thread.start()
 
-    return {"url": f"http://127.0.0.1:{port}", "status": "started"}
+    return {"url": f"http://127.0.0.1:{port}", "status": "started", "pid": _dashboard_proc.pid}
+
+
+@mcp.tool()
+def context_dashboard_stop() -> dict:
+    """Stop the web dashboard started by context_dashboard.
+
+    Returns:
+        Dict with 'status' ('stopped' or 'not_running').
+    """
+    global _dashboard_proc
+
+    if _dashboard_proc is None or _dashboard_proc.poll() is not None:
+        _dashboard_proc = None
+        return {"status": "not_running"}
+
+    _dashboard_proc.terminate()
+    try:
+        _dashboard_proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        _dashboard_proc.kill()
+        _dashboard_proc.wait()
+    _dashboard_proc = None
+    return {"status": "stopped"}
 
 
 if __name__ == "__main__":
@@ -22,15 +22,20 @@ Hook input (JSON via stdin):
 from __future__ import annotations
 
 import json
+import mmap
 import os
 import sys
 from pathlib import Path
 from typing import Optional
 
 try:
-    from .db_utils import extract_text_content, read_hook_input
+    from .db_utils import extract_text_content, json_dumps, json_loads, read_hook_input
 except ImportError:
-    from db_utils import extract_text_content, read_hook_input
+    from db_utils import extract_text_content, json_dumps, json_loads, read_hook_input
+
+
+# Transcript entry types that carry conversation messages
+_TRANSCRIPT_ROLES = frozenset(("user", "assistant"))
 
 
 def parse_transcript_full(path: str) -> list[dict]:
@@ -47,31 +52,95 @@ def parse_transcript_full(path: str) -> list[dict]:
 
     messages = []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                entry_type = entry.get("type", "")
-                if entry_type not in ("user", "assistant"):
-                    continue
-
-                msg = entry.get("message", {})
-                raw_content = msg.get("content", "")
-                text = extract_text_content(raw_content)
-                if text:
-                    messages.append({"role": entry_type, "content": text})
-    except OSError:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []  # mmap cannot map an empty file
+            # Map the file and split on b"\n" with mmap.find (C-level), handing
+            # each byte slice straight to the parser without a decode step
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Bind hot-loop lookups to locals (LOAD_FAST instead of LOAD_GLOBAL/attribute)
+                find = mm.find
+                loads = json_loads
+                extract = extract_text_content
+                roles = _TRANSCRIPT_ROLES
+                append = messages.append
+                pos = 0
+                while pos < size:
+                    end = find(b"\n", pos)
+                    if end == -1:
+                        end = size
+                    # Skip lines that cannot be a user/assistant entry before
+                    # parsing them: mm.find is a C-level substring search, and
+                    # most non-message entries (progress, system, snapshots)
+                    # never contain either quoted role name.
+                    if find(b'"user"', pos, end) == -1 and find(b'"assistant"', pos, end) == -1:
+                        pos = end + 1
+                        continue
+                    line = mm[pos:end]
+                    pos = end + 1
+                    try:
+                        entry = loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(entry, dict):
+                        continue
+
+                    entry_type = entry.get("type")
+                    # (the str check keeps an unhashable "type" from raising in the set lookup)
+                    if not isinstance(entry_type, str) or entry_type not in roles:
+                        continue
+
+                    raw_content = entry.get("message", {}).get("content")
+                    if not raw_content:
+                        continue  # e.g. tool-use envelopes; extract would return "" anyway
+                    text = extract(raw_content)
+                    if text:
+                        append({"role": entry_type, "content": text})
+    except (OSError, ValueError):
         return []
 
     return messages
 
 
+_COUNTER_UPSERT_SQL = """
+    INSERT INTO checkpoint_counters (session_id, last_checkpoint_number) VALUES (?, 1)
+    ON CONFLICT(session_id) DO UPDATE SET last_checkpoint_number = last_checkpoint_number + 1
+"""
+_COUNTER_UPSERT_RETURNING_SQL = _COUNTER_UPSERT_SQL + " RETURNING last_checkpoint_number"
+_COUNTER_SELECT_SQL = "SELECT last_checkpoint_number FROM checkpoint_counters WHERE session_id = ?"
+
+_LATEST_CHECKPOINT_HASH_SQL = """
+    SELECT id, content_hash FROM context_checkpoints
+    WHERE session_id = ?
+    ORDER BY created_at DESC, checkpoint_number DESC
+    LIMIT 1
+"""
+
+_INSERT_CHECKPOINT_SQL = """
+    INSERT INTO context_checkpoints
+        (session_id, project_path, project_hash, checkpoint_number, trigger_type,
+         messages, message_count, content_hash, messages_codec)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Page cache for the checkpoint write burst (KiB, negative per SQLite convention)
+CHECKPOINT_CACHE_SIZE_KIB = 131072
+
+# Database paths this process has already confirmed at CURRENT_SCHEMA_VERSION
+_schema_ready: set[str] = set()
+
+
+def _next_checkpoint_number(conn, session_id: str) -> int:
+    """Atomically increment and return the checkpoint counter for *session_id*."""
+    import sqlite3
+
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        return conn.execute(_COUNTER_UPSERT_RETURNING_SQL, (session_id,)).fetchone()[0]
+    # RETURNING needs SQLite 3.35+; fall back to a point lookup in the same transaction
+    conn.execute(_COUNTER_UPSERT_SQL, (session_id,))
+    return conn.execute(_COUNTER_SELECT_SQL, (session_id,)).fetchone()[0]
+
 
 def save_checkpoint(
     session_id: str,
@@ -82,8 +151,11 @@ def save_checkpoint(
     """
     Save a context checkpoint to the database.
 
-    Stores the full message list as a single JSON blob for speed.
-    Auto-increments checkpoint_number per session_id.
+    Stores the full message list as a single compressed JSON blob (zstd if
+    installed, else zlib); partial (tail) reloads slice the decompressed blob.
+    Auto-increments checkpoint_number per session_id. If the messages are
+    identical to the session's latest checkpoint (e.g. a double hook fire),
+    nothing is written and that checkpoint's ID is returned.
 
     Returns the checkpoint row ID, or None on failure.
     """
@@ -92,41 +164,65 @@ def save_checkpoint(
     if scripts_dir not in sys.path:
         sys.path.insert(0, scripts_dir)
 
+    # Deferred so the no-op hook paths (no input, empty transcript) skip them
     import contextlib
+    import hashlib
     import io
 
-    from db_init import ensure_schema_current, init_database
-    from db_utils import db_exists, get_connection, hash_project_path, normalize_project_path
+    from db_init import CURRENT_SCHEMA_VERSION, apply_migrations, get_schema_version, init_database
+    from db_utils import (
+        compress_blob,
+        db_exists,
+        get_connection,
+        get_db_path,
+        hash_project_path,
+        normalize_project_path,
+    )
 
-    # Capture stdout to suppress "Database initialized at ..." print from init_database
-    with contextlib.redirect_stdout(io.StringIO()):
-        if not db_exists():
+    db_path = str(get_db_path())
+    if not db_exists():
+        # Capture stdout to suppress "Database initialized at ..." print from init_database
+        with contextlib.redirect_stdout(io.StringIO()):
             init_database()
-        else:
-            ensure_schema_current()
+        _schema_ready.add(db_path)
 
     norm_path = normalize_project_path(project_path) if project_path else None
     proj_hash = hash_project_path(project_path) if project_path else None
-    messages_json = json.dumps(messages)
+    messages_raw = json_dumps(messages).encode("utf-8")
+    content_hash = hashlib.blake2b(messages_raw, digest_size=16).hexdigest()
+    # Compressed before the transaction so the write lock isn't held for it
+    messages_blob, codec = compress_blob(messages_raw)
 
     with get_connection() as conn:
-        # Get next checkpoint number for this session
-        cursor = conn.execute(
-            "SELECT COALESCE(MAX(checkpoint_number), 0) FROM context_checkpoints WHERE session_id = ?",
-            (session_id,),
-        )
-        next_num = cursor.fetchone()[0] + 1
-
-        cursor = conn.execute(
-            """
-            INSERT INTO context_checkpoints
-                (session_id, project_path, project_hash, checkpoint_number, trigger_type, messages, message_count)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (session_id, norm_path, proj_hash, next_num, trigger, messages_json, len(messages)),
-        )
-        checkpoint_id = cursor.lastrowid
-        conn.commit()
+        # Check the schema on this connection rather than opening another one
+        if db_path not in _schema_ready:
+            if get_schema_version(conn) < CURRENT_SCHEMA_VERSION:
+                apply_migrations(conn)
+            _schema_ready.add(db_path)
+        # Absorb the blob's overflow pages in page cache before the single commit.
+        # The connection goes back to the pool afterwards, so the larger cache
+        # must not outlive this write.
+        default_cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+        conn.execute(f"PRAGMA cache_size=-{CHECKPOINT_CACHE_SIZE_KIB}")
+        try:
+            # Take the write lock up front so numbering and the INSERT commit together
+            conn.execute("BEGIN IMMEDIATE")
+            latest = conn.execute(_LATEST_CHECKPOINT_HASH_SQL, (session_id,)).fetchone()
+            if latest is not None and latest["content_hash"] == content_hash:
+                conn.rollback()
+                return latest["id"]
+
+            # Claim the next checkpoint number for this session (single-row upsert)
+            next_num = _next_checkpoint_number(conn, session_id)
+
+            cursor = conn.execute(
+                _INSERT_CHECKPOINT_SQL,
+                (session_id, norm_path, proj_hash, next_num, trigger, messages_blob, len(messages), content_hash, codec),
+            )
+            checkpoint_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            conn.execute(f"PRAGMA cache_size={default_cache_size}")
 
     return checkpoint_id
 
@@ -1,7 +1,13 @@
 """Shared test fixtures for context-memory tests."""
 
+import contextlib
+import io
 import os
+import shutil
+import sqlite3
 import sys
+import tempfile
+from pathlib import Path
 
 import pytest
 
@@ -13,40 +19,251 @@ SCRIPTS_DIR = os.path.join(
 sys.path.insert(0, SCRIPTS_DIR)
 
 
+# RAM-backed filesystem for per-test databases where available (Linux tmpfs):
+# SQLite's file, WAL and shm I/O then never reach the disk, while tests and
+# subprocesses still see an ordinary file path. (SQLite's own in-memory
+# databases don't fit: WAL, the file checks in db_utils and the hook
+# subprocesses all need a real path.) Point CONTEXT_MEMORY_TEST_RAM_DIR at
+# a RAM disk to get the same on other platforms.
+RAM_DIR = os.environ.get("CONTEXT_MEMORY_TEST_RAM_DIR", "/dev/shm")
+RAM_PREFIX = "context-memory-test-"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # e.g. EPERM: exists, owned by someone else
+    return True
+
+
+def _sweep_stale_ram_dirs() -> None:
+    """Remove session dirs left behind by test runs that were killed."""
+    for entry in os.scandir(RAM_DIR):
+        if not entry.name.startswith(RAM_PREFIX):
+            continue
+        pid = entry.name[len(RAM_PREFIX):].split("-", 1)[0]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def ram_root():
+    """One RAM-backed directory per test process (None where unavailable).
+
+    Named after the owning pid, so a later run can sweep it up if this one
+    is killed before its teardown runs; live parallel workers are left alone.
+    """
+    if not (os.path.isdir(RAM_DIR) and os.access(RAM_DIR, os.W_OK)):
+        yield None
+        return
+    _sweep_stale_ram_dirs()
+    path = tempfile.mkdtemp(prefix=f"{RAM_PREFIX}{os.getpid()}-", dir=RAM_DIR)
+    yield Path(path)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def db_dir(tmp_path, ram_root):
+    """Directory holding the per-test database (RAM-backed when possible)."""
+    if ram_root is None:
+        yield tmp_path
+        return
+    path = Path(tempfile.mkdtemp(dir=ram_root))
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def template_dir(tmp_path_factory, ram_root):
+    """``template_dir(name)`` makes a directory for a session-lived template database."""
+    def make(name):
+        if ram_root is None:
+            return tmp_path_factory.mktemp(name)
+        return Path(tempfile.mkdtemp(prefix=f"{name}-", dir=ram_root))
+    return make
+
+
 @pytest.fixture(autouse=True)
-def isolated_db(tmp_path, monkeypatch):
+def isolated_db(db_dir, ram_root, request, monkeypatch):
     """Use a temporary database for every test."""
-    import db_init
-    import db_save
     import db_utils
-    db_path = tmp_path / "context.db"
-    monkeypatch.setattr(db_utils, "DB_DIR", tmp_path)
+    db_path = db_dir / "context.db"
+    # Patch the module globals rather than a ContextVar: the scripts read
+    # DB_PATH at call time, xdist workers are separate processes, and a
+    # context variable would not follow the code under test into new threads
+    monkeypatch.setattr(db_utils, "DB_DIR", db_dir)
     monkeypatch.setattr(db_utils, "DB_PATH", db_path)
-    # Modules that import DB_PATH at module level need patching too
-    monkeypatch.setattr(db_init, "DB_PATH", db_path)
-    monkeypatch.setattr(db_save, "DB_PATH", db_path, raising=False)
-    # Patch db_prune if it has been imported
-    try:
-        import db_prune
-        monkeypatch.setattr(db_prune, "DB_PATH", db_path, raising=False)
-    except ImportError:
-        pass
-    # Patch pre_compact_save if it has been imported
-    try:
-        import pre_compact_save
-        monkeypatch.setattr(pre_compact_save, "DB_PATH", db_path, raising=False)
-    except ImportError:
-        pass
-    # Patch mcp_server if it has been imported (requires optional mcp package)
-    try:
-        import mcp_server  # noqa: F811
-        monkeypatch.setattr(mcp_server, "DB_PATH", db_path, raising=False)
-    except (ImportError, SystemExit):
-        pass
-    # Patch dashboard if it has been imported (requires optional flask package)
-    try:
-        import dashboard  # noqa: F811
-        monkeypatch.setattr(dashboard, "DB_PATH", db_path, raising=False)
-    except (ImportError, SystemExit):
-        pass
+    # Test databases are thrown away, so where they live on a real disk skip
+    # the fsyncs SQLite still does at WAL checkpoints (tmpfs makes them free)
+    if ram_root is None and request.node.get_closest_marker("durable_sync") is None:
+        monkeypatch.setattr(
+            db_utils, "_CONNECTION_PRAGMAS",
+            db_utils._CONNECTION_PRAGMAS.replace("synchronous=NORMAL", "synchronous=OFF"),
+        )
     yield db_path
+    db_utils.close_pooled_connections()
+
+
+@contextlib.contextmanager
+def _database_at(path):
+    """Point the scripts at the template database file ``path`` for the duration of the block."""
+    import db_utils
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(db_utils, "DB_DIR", path.parent)
+        mp.setattr(db_utils, "DB_PATH", path)
+        # Templates are rebuilt every session, so building and seeding them
+        # never needs an fsync (the clones tests run against are unaffected)
+        mp.setattr(
+            db_utils, "_CONNECTION_PRAGMAS",
+            db_utils._CONNECTION_PRAGMAS.replace("synchronous=NORMAL", "synchronous=OFF"),
+        )
+        try:
+            yield
+        finally:
+            db_utils.close_pooled_connections()
+
+
+# In-memory copies of the template databases, keyed by path. Templates never
+# change once built, so every clone after the first copies pages from RAM
+# instead of reopening and re-reading the template file.
+_template_snapshots: dict = {}
+
+
+def _template_snapshot(src) -> sqlite3.Connection:
+    """Return an in-memory copy of the template database ``src``, loading it on first use."""
+    key = str(src)
+    snapshot = _template_snapshots.get(key)
+    if snapshot is None:
+        snapshot = sqlite3.connect(":memory:")
+        source = sqlite3.connect(key)
+        try:
+            source.backup(snapshot)
+        finally:
+            source.close()
+        _template_snapshots[key] = snapshot
+    return snapshot
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _close_template_snapshots():
+    """Close the in-memory template copies when the test session ends."""
+    yield
+    for snapshot in _template_snapshots.values():
+        snapshot.close()
+    _template_snapshots.clear()
+
+
+def clone_database(src, dst) -> None:
+    """Copy the template database ``src`` over ``dst`` with the SQLite backup API."""
+    from db_utils import reset_connection_state
+    target = sqlite3.connect(str(dst))
+    try:
+        _template_snapshot(src).backup(target)
+    finally:
+        target.close()
+    reset_connection_state()
+
+
+@pytest.fixture(scope="session")
+def schema_template(template_dir):
+    """A fully initialized database built once per session.
+
+    Running the schema DDL (tables, FTS5 virtual tables, triggers) for every
+    test dominates the cost of DB-backed tests; cloning a finished file is
+    much cheaper.
+    """
+    import db_init
+    template = template_dir("template") / "context.db"
+    with _database_at(template), contextlib.redirect_stdout(io.StringIO()):
+        db_init.init_database()
+    return template
+
+
+@pytest.fixture(scope="session")
+def seeded_template(schema_template, template_dir):
+    """Factory for read-only fixture data: ``seeded_template(seed)`` returns the
+    path of a copy of the schema template populated by calling ``seed()``.
+
+    Call it from a module-scoped fixture so the seeding runs once per module,
+    then clone the result into each test's database with clone_database().
+    """
+    def build(seed):
+        path = template_dir("seeded") / "context.db"
+        clone_database(schema_template, path)
+        with _database_at(path):
+            seed()
+        return path
+    return build
+
+
+@pytest.fixture(scope="session")
+def legacy_template(template_dir):
+    """A pre-versioning database built once per session: every table, but no
+    schema_version table, so it reads as schema version 1.
+    """
+    import db_init
+    from db_utils import get_connection
+    template = template_dir("legacy") / "context.db"
+    with _database_at(template), get_connection() as conn:
+        conn.executescript(db_init.SCHEMA_SQL.split("-- Schema versioning")[0])
+        conn.commit()
+    return template
+
+
+@pytest.fixture
+def legacy_db(isolated_db, legacy_template):
+    """The per-test database as a copy of the legacy (version 1) template."""
+    clone_database(legacy_template, isolated_db)
+    return isolated_db
+
+
+@pytest.fixture
+def initialized_db(isolated_db, schema_template):
+    """The per-test database, pre-populated with the current schema.
+
+    Equivalent to calling ``db_init.init_database()`` at the start of a test,
+    but copies the session template with the SQLite backup API instead of
+    re-running the DDL.
+    """
+    clone_database(schema_template, isolated_db)
+    return isolated_db
+
+
+@pytest.fixture
+def ro_conn(initialized_db):
+    """A read-only connection to the initialized test database, held for the whole test.
+
+    For assertions: each query runs in its own read transaction, so it sees
+    everything committed by the code under test up to that point.
+    """
+    from db_utils import get_connection
+
+    with get_connection(readonly=True) as conn:
+        yield conn
+
+
+@pytest.fixture
+def load_template(isolated_db):
+    """``load_template(path)`` makes this test's database a copy of the database at ``path``."""
+    def load(path):
+        clone_database(path, isolated_db)
+        return isolated_db
+    return load
+
+
+@pytest.fixture
+def make_jsonl(tmp_path):
+    """``make_jsonl(lines)`` writes ``lines`` as a JSONL file under ``tmp_path`` and returns its path."""
+    from db_utils import json_dumps
+
+    def make(lines, name="transcript.jsonl", sep="\n", trailing_newline=False):
+        path = tmp_path / name
+        data = sep.join(json_dumps(line) for line in lines)
+        if trailing_newline:
+            data += sep
+        path.write_bytes(data.encode("utf-8"))
+        return path
+    return make
@@ -0,0 +1,39 @@
+"""Plain helper functions shared by the test modules."""
+
+import os
+import subprocess
+import sys
+
+import db_utils
+from db_utils import get_connection
+
+
+def backdate_sessions(session_ids, offset):
+    """Move saved sessions' created_at/updated_at to ``datetime('now', offset)``.
+
+    Lets tests build old sessions through db_save and then age them, instead
+    of hand-writing backdated INSERTs. ``offset`` is an SQLite date modifier
+    such as ``'-30 days'``; setting updated_at explicitly skips the
+    sessions_updated trigger.
+    """
+    placeholders = ",".join("?" * len(session_ids))
+    with get_connection() as conn:
+        conn.execute(
+            f"UPDATE sessions SET created_at = datetime('now', ?), updated_at = datetime('now', ?) "
+            f"WHERE session_id IN ({placeholders})",
+            (offset, offset, *session_ids),
+        )
+        conn.commit()
+
+
+def force_init_in_subprocess(db_path):
+    """Recreate the database at ``db_path`` with ``init_database(force=True)`` in a separate process.
+
+    Unlike calling it in-process, this leaves this process's open and pooled
+    connections alone, the way another hook or a CLI run would.
+    """
+    env = os.environ.copy()
+    env["CONTEXT_MEMORY_DB_PATH"] = str(db_path)
+    scripts_dir = os.path.dirname(db_utils.__file__)
+    code = f"import sys; sys.path.insert(0, {scripts_dir!r}); import db_init; db_init.init_database(force=True)"
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, env=env, timeout=30)
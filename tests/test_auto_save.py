@@ -1,5 +1,6 @@
 """Tests for the cross-platform auto_save.py wrapper."""
 
+import io
 import json
 import os
 import sqlite3
@@ -12,6 +13,7 @@ SCRIPTS_DIR = os.path.join(
 )
 AUTO_SAVE_SCRIPT = os.path.join(SCRIPTS_DIR, "auto_save.py")
 
+import auto_save  # noqa: E402
 from auto_save import build_brief, extract_text_content, parse_transcript, read_hook_input  # noqa: E402
 
 
@@ -40,6 +42,19 @@ class TestExtractTextContent:
         result = extract_text_content(blocks)
         assert len(result) == 1000
 
+    def test_list_stops_at_length_budget(self):
+        """Blocks past the 1000-char budget are never read; the joined result is unchanged."""
+        class Untouchable(dict):
+            def get(self, *args):
+                raise AssertionError("block read after budget was spent")
+
+        blocks = [{"type": "text", "text": "a" * 600}, {"type": "text", "text": "b" * 600}, Untouchable()]
+        assert extract_text_content(blocks) == ("a" * 600 + "\n" + "b" * 600)[:1000]
+
+    def test_list_budget_counts_separators(self):
+        blocks = [{"type": "text", "text": "a" * 999}, {"type": "text", "text": "b"}]
+        assert extract_text_content(blocks) == "a" * 999 + "\n"
+
     def test_empty_input(self):
         assert extract_text_content("") == ""
         assert extract_text_content(None) == ""
@@ -95,18 +110,22 @@ class TestReadHookInput:
         monkeypatch.setattr("sys.stdin", None)
         assert read_hook_input() is None
 
+    def test_explicit_stream(self, monkeypatch):
+        """A stream passed in is read instead of sys.stdin."""
+        monkeypatch.setattr("sys.stdin", None)
+        assert read_hook_input(io.StringIO('{"session_id": "s1"}')) == {"session_id": "s1"}
+
 
 # ---------------------------------------------------------------------------
 # Unit tests — parse_transcript
 # ---------------------------------------------------------------------------
 class TestParseTranscript:
-    def test_valid_jsonl(self, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_valid_jsonl(self, make_jsonl):
         lines = [
             {"type": "user", "message": {"content": "hello"}},
             {"type": "assistant", "message": {"content": "hi there"}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
         msgs = parse_transcript(str(transcript))
         assert len(msgs) == 2
         assert msgs[0] == {"role": "user", "content": "hello"}
@@ -118,13 +137,12 @@ class TestParseTranscript:
     def test_none_path(self):
         assert parse_transcript(None) == []
 
-    def test_message_limit_head_tail(self, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_message_limit_head_tail(self, make_jsonl):
         lines = []
         for i in range(25):
             role = "user" if i % 2 == 0 else "assistant"
             lines.append({"type": role, "message": {"content": f"msg-{i}"}})
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
 
         msgs = parse_transcript(str(transcript), max_messages=15)
         assert len(msgs) == 15
@@ -135,15 +153,34 @@ class TestParseTranscript:
         assert msgs[-1]["content"] == "msg-24"
         assert msgs[5]["content"] == "msg-15"
 
-    def test_non_message_types_skipped(self, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_head_tail_skips_parsing_the_middle(self, make_jsonl, monkeypatch):
+        """Only the lines that end up in the head/tail sample are decoded."""
+        lines = [{"type": "user", "message": {"content": f"msg-{i}"}} for i in range(1000)]
+        transcript = make_jsonl(lines, trailing_newline=True)
+
+        calls = []
+        real_loads = auto_save.json_loads
+        monkeypatch.setattr(auto_save, "json_loads", lambda data: calls.append(1) or real_loads(data))
+        msgs = parse_transcript(str(transcript), max_messages=15)
+        assert [m["content"] for m in msgs] == [f"msg-{i}" for i in (*range(5), *range(990, 1000))]
+        assert len(calls) == 15
+
+    def test_head_and_tail_do_not_overlap(self, make_jsonl):
+        """When the sample covers the whole transcript, each message appears once, in order."""
+        lines = [{"type": "user", "message": {"content": f"msg-{i}"}} for i in range(15)]
+        lines.insert(7, {"type": "system", "message": {"content": "noise"}})
+        transcript = make_jsonl(lines, sep="\r\n")
+        msgs = parse_transcript(str(transcript), max_messages=15)
+        assert [m["content"] for m in msgs] == [f"msg-{i}" for i in range(15)]
+
+    def test_non_message_types_skipped(self, make_jsonl):
         lines = [
             {"type": "system", "message": {"content": "system prompt"}},
             {"type": "user", "message": {"content": "hello"}},
             {"type": "tool_result", "message": {"content": "result"}},
             {"type": "assistant", "message": {"content": "response"}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
         msgs = parse_transcript(str(transcript))
         assert len(msgs) == 2
         assert msgs[0]["role"] == "user"
@@ -164,6 +201,24 @@ class TestParseTranscript:
         assert msgs[0]["content"] == "first"
         assert msgs[1]["content"] == "second"
 
+    def test_invalid_utf8_line_skipped(self, tmp_path):
+        transcript = tmp_path / "transcript.jsonl"
+        transcript.write_bytes(
+            json.dumps({"type": "user", "message": {"content": "first"}}).encode() + b"\n"
+            + b'{"type": "user", "message": {"content": "\xff\xfe"}}\n'
+            + json.dumps({"type": "assistant", "message": {"content": "caf\u00e9"}}, ensure_ascii=False).encode()
+        )
+        msgs = parse_transcript(str(transcript))
+        assert [m["content"] for m in msgs] == ["first", "caf\u00e9"]
+
+    def test_non_object_lines_skipped(self, tmp_path):
+        transcript = tmp_path / "transcript.jsonl"
+        transcript.write_text(
+            '[1, 2]\n"text"\n' + json.dumps({"type": "user", "message": {"content": "hello"}}) + "\n",
+            encoding="utf-8",
+        )
+        assert parse_transcript(str(transcript)) == [{"role": "user", "content": "hello"}]
+
     def test_empty_lines_skipped(self, tmp_path):
         """Blank lines interspersed in transcript should be skipped."""
         transcript = tmp_path / "transcript.jsonl"
@@ -179,8 +234,7 @@ class TestParseTranscript:
         msgs = parse_transcript(str(transcript))
         assert len(msgs) == 2
 
-    def test_list_content_blocks(self, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_list_content_blocks(self, make_jsonl):
         lines = [
             {
                 "type": "assistant",
@@ -192,7 +246,7 @@ class TestParseTranscript:
                 },
             },
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
         msgs = parse_transcript(str(transcript))
         assert len(msgs) == 1
         assert msgs[0]["content"] == "here is the answer"
@@ -236,51 +290,28 @@ class TestBuildBrief:
 # Integration tests — subprocess
 # ---------------------------------------------------------------------------
 class TestAutoSaveScript:
-    def test_runs_successfully(self, isolated_db):
-        """auto_save.py should exit 0 when db_save.py exists."""
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input="",
-        )
-        assert result.returncode == 0
-
-    def test_exits_zero_when_db_save_missing(self, tmp_path):
-        """auto_save.py should exit 0 even when db_save.py doesn't exist."""
-        import shutil
-        isolated_script = tmp_path / "auto_save.py"
-        shutil.copy2(AUTO_SAVE_SCRIPT, str(isolated_script))
-        # auto_save.py imports from db_utils at module level
-        shutil.copy2(os.path.join(SCRIPTS_DIR, "db_utils.py"), str(tmp_path / "db_utils.py"))
-
-        result = subprocess.run(
-            [sys.executable, str(isolated_script)],
-            capture_output=True,
-            text=True,
-            timeout=30,
-            input="",
-        )
-        assert result.returncode == 0
-        assert result.stderr == ""
-
-    def test_captures_git_branch(self, isolated_db):
+    """Hook behaviour, run in-process; db_save.py still runs as the hook's own subprocess."""
+
+    def _run(self, monkeypatch, isolated_db, hook_input=""):
+        monkeypatch.setenv("CONTEXT_MEMORY_DB_PATH", str(isolated_db))
+        auto_save.main(stdin=io.StringIO(hook_input))
+
+    def test_runs_successfully(self, isolated_db, monkeypatch):
+        """main() should complete without raising when db_save.py exists."""
+        self._run(monkeypatch, isolated_db)
+
+    def test_exits_zero_when_db_save_missing(self, isolated_db, tmp_path, monkeypatch, capsys):
+        """main() should return quietly, saving nothing, when db_save.py doesn't exist."""
+        monkeypatch.setattr(auto_save, "DB_SAVE_SCRIPT", tmp_path / "missing.py")
+        self._run(monkeypatch, isolated_db)
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == ""
+        assert not isolated_db.exists()
+
+    def test_captures_git_branch(self, isolated_db, monkeypatch):
         """auto_save.py should detect the git branch when run inside a git repo."""
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input="",
-        )
-        assert result.returncode == 0
+        self._run(monkeypatch, isolated_db)
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -289,36 +320,17 @@ class TestAutoSaveScript:
         if row is not None:
             assert row["session_id"].startswith("auto-")
 
-    def test_no_output_on_success(self, isolated_db):
+    def test_no_output_on_success(self, isolated_db, monkeypatch, capsys):
         """auto_save.py should produce no stdout/stderr output (silent hook)."""
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input="",
-        )
-        assert result.returncode == 0
-        assert result.stdout == ""
-        assert result.stderr == ""
+        self._run(monkeypatch, isolated_db)
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == ""
 
-    def test_uses_real_session_id_from_stdin(self, isolated_db):
+    def test_uses_real_session_id_from_stdin(self, isolated_db, monkeypatch):
         """When stdin provides session_id, it should be used instead of auto-{ts}."""
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
         hook_input = json.dumps({"session_id": "real-session-abc123", "cwd": os.getcwd()})
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input=hook_input,
-        )
-        assert result.returncode == 0
+        self._run(monkeypatch, isolated_db, hook_input)
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -329,20 +341,10 @@ class TestAutoSaveScript:
         conn.close()
         assert row is not None
 
-    def test_stop_hook_active_prevents_save(self, isolated_db):
+    def test_stop_hook_active_prevents_save(self, isolated_db, monkeypatch):
         """When stop_hook_active is true, no session should be saved."""
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
         hook_input = json.dumps({"stop_hook_active": True, "session_id": "should-not-save"})
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input=hook_input,
-        )
-        assert result.returncode == 0
+        self._run(monkeypatch, isolated_db, hook_input)
 
         # DB may not even be created when hook bails early
         if not isolated_db.exists():
@@ -357,31 +359,20 @@ class TestAutoSaveScript:
         finally:
             conn.close()
 
-    def test_transcript_saves_messages(self, isolated_db, tmp_path):
+    def test_transcript_saves_messages(self, isolated_db, make_jsonl, monkeypatch):
         """When a transcript file is provided, messages should be extracted and saved."""
-        transcript = tmp_path / "transcript.jsonl"
         lines = [
             {"type": "user", "message": {"content": "What is 2+2?"}},
             {"type": "assistant", "message": {"content": "4"}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
 
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
         hook_input = json.dumps({
             "session_id": "transcript-test",
             "transcript_path": str(transcript),
             "cwd": os.getcwd(),
         })
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input=hook_input,
-        )
-        assert result.returncode == 0
+        self._run(monkeypatch, isolated_db, hook_input)
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -391,31 +382,20 @@ class TestAutoSaveScript:
         conn.close()
         assert msg_count == 2
 
-    def test_brief_from_first_user_message(self, isolated_db, tmp_path):
+    def test_brief_from_first_user_message(self, isolated_db, make_jsonl, monkeypatch):
         """The brief should contain text from the first user message."""
-        transcript = tmp_path / "transcript.jsonl"
         lines = [
             {"type": "user", "message": {"content": "Fix the login bug in auth.py"}},
             {"type": "assistant", "message": {"content": "Looking at it now."}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
 
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
         hook_input = json.dumps({
             "session_id": "brief-test",
             "transcript_path": str(transcript),
             "cwd": os.getcwd(),
         })
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input=hook_input,
-        )
-        assert result.returncode == 0
+        self._run(monkeypatch, isolated_db, hook_input)
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -425,24 +405,14 @@ class TestAutoSaveScript:
         assert "Fix the login bug" in row["brief"]
         assert row["brief"].startswith("Auto-saved session:")
 
-    def test_fallback_when_transcript_missing(self, isolated_db):
-        """Bogus transcript path should still exit 0 and fall back to minimal save."""
-        env = os.environ.copy()
-        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
+    def test_fallback_when_transcript_missing(self, isolated_db, monkeypatch):
+        """Bogus transcript path should still fall back to a minimal save."""
         hook_input = json.dumps({
             "session_id": "fallback-test",
             "transcript_path": "/nonexistent/transcript.jsonl",
             "cwd": os.getcwd(),
         })
-        result = subprocess.run(
-            [sys.executable, AUTO_SAVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=30,
-            input=hook_input,
-        )
-        assert result.returncode == 0
+        self._run(monkeypatch, isolated_db, hook_input)
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -453,23 +423,37 @@ class TestAutoSaveScript:
         conn.close()
         assert row is not None
 
-    def test_empty_stdin_backward_compat(self, isolated_db):
+    def test_empty_stdin_backward_compat(self, isolated_db, monkeypatch):
         """With empty stdin, should behave like old code (synthetic ID, generic brief)."""
+        self._run(monkeypatch, isolated_db)
+
+        conn = sqlite3.connect(str(isolated_db))
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT session_id FROM sessions LIMIT 1").fetchone()
+        conn.close()
+        if row is not None:
+            assert row["session_id"].startswith("auto-")
+
+    def test_script_entry_point(self, isolated_db):
+        """Run as the hook does: a fresh interpreter reading the payload from stdin."""
         env = os.environ.copy()
         env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
+        hook_input = json.dumps({"session_id": "entry-point-test", "cwd": os.getcwd()})
         result = subprocess.run(
             [sys.executable, AUTO_SAVE_SCRIPT],
             capture_output=True,
             text=True,
             env=env,
             timeout=30,
-            input="",
+            input=hook_input,
         )
         assert result.returncode == 0
+        assert result.stdout == ""
+        assert result.stderr == ""
 
         conn = sqlite3.connect(str(isolated_db))
-        conn.row_factory = sqlite3.Row
-        row = conn.execute("SELECT session_id FROM sessions LIMIT 1").fetchone()
+        row = conn.execute(
+            "SELECT COUNT(*) FROM sessions WHERE session_id = ?", ("entry-point-test",)
+        ).fetchone()
         conn.close()
-        if row is not None:
-            assert row["session_id"].startswith("auto-")
+        assert row[0] == 1
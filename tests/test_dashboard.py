@@ -2,80 +2,128 @@
 # isort: skip_file
 from __future__ import annotations
 
+import sqlite3
+from types import MappingProxyType
+
 import pytest
 
 flask = pytest.importorskip("flask", reason="flask package not installed")
 pytest.importorskip("flask_cors", reason="flask-cors package not installed")
 
 import dashboard  # noqa: E402
-from db_init import init_database  # noqa: E402
-from db_save import save_full_session  # noqa: E402
-from db_utils import get_connection  # noqa: E402
+from db_save import save_full_session, save_full_sessions  # noqa: E402
+from db_utils import get_connection, json_dumps, json_loads  # noqa: E402
 
 
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
-@pytest.fixture()
+@pytest.fixture(scope="module")
 def client():
-    """Flask test client."""
+    """Flask test client, shared by the module (the app keeps no per-client state)."""
     dashboard.app.config["TESTING"] = True
     with dashboard.app.test_client() as c:
+        # Throwaway request so the app's one-time setup (first-request state,
+        # lazy imports along the request path) isn't charged to the first test.
+        # "/" serves the static index and never opens a database.
+        c.get("/")
         yield c
 
 
-def _seed_db():
-    """Seed the database with rich test data (2 sessions, different projects)."""
-    init_database()
+@pytest.fixture(autouse=True)
+def _fresh_response_caches():
+    """Start every test with empty analytics caches (test databases can reuse a path)."""
+    dashboard._invalidate_response_caches()
+
 
+_frozen = MappingProxyType
+
+# save_full_session() keyword arguments for the seeded sessions. Read-only
+# (tuples and mapping proxies) so a save that mutated its input would raise
+# instead of silently changing the fixture data.
+_SEED_SESSIONS = (
     # Session 1 — auth project
-    save_full_session(
-        session_id="sess-aaa",
-        project_path="/tmp/project-alpha",
-        messages=[
-            {"role": "user", "content": "How do I fix the auth bug?"},
-            {"role": "assistant", "content": "Here is the authentication fix."},
-        ],
-        summary={
+    _frozen({
+        "session_id": "sess-aaa",
+        "project_path": "/tmp/project-alpha",
+        "messages": (
+            _frozen({"role": "user", "content": "How do I fix the auth bug?"}),
+            _frozen({"role": "assistant", "content": "Here is the authentication fix."}),
+        ),
+        "summary": _frozen({
             "brief": "Fixed auth bug in login flow",
             "detailed": "Resolved a session-expiry issue in the JWT middleware.",
             "outcome": "success",
-            "technologies": ["python", "flask", "jwt"],
-        },
-        topics=["authentication", "bugfix"],
-        code_snippets=[
-            {
+            "technologies": ("python", "flask", "jwt"),
+        }),
+        "topics": ("authentication", "bugfix"),
+        "code_snippets": (
+            _frozen({
                 "code": "def verify_token(t): ...",
                 "language": "python",
                 "description": "JWT verify helper",
                 "file_path": "auth.py",
-            }
-        ],
-    )
-
+            }),
+        ),
+    }),
     # Session 2 — different project
-    save_full_session(
-        session_id="sess-bbb",
-        project_path="/tmp/project-beta",
-        messages=[
-            {"role": "user", "content": "Add pagination to the API"},
-            {"role": "assistant", "content": "Here is the pagination implementation."},
-        ],
-        summary={
+    _frozen({
+        "session_id": "sess-bbb",
+        "project_path": "/tmp/project-beta",
+        "messages": (
+            _frozen({"role": "user", "content": "Add pagination to the API"}),
+            _frozen({"role": "assistant", "content": "Here is the pagination implementation."}),
+        ),
+        "summary": _frozen({
             "brief": "Added pagination to list endpoint",
             "outcome": "partial",
-            "technologies": ["python", "sqlite"],
-        },
-        topics=["api", "pagination"],
-    )
+            "technologies": ("python", "sqlite"),
+        }),
+        "topics": ("api", "pagination"),
+    }),
+)
+
+
+def _seed_db():
+    """Seed the database with rich test data (2 sessions, different projects)."""
+    save_full_sessions(_SEED_SESSIONS)
+
+
+@pytest.fixture(scope="module")
+def _dashboard_template(seeded_template):
+    return seeded_template(_seed_db)
+
+
+@pytest.fixture()
+def seeded_db(load_template, _dashboard_template):
+    """This test's database, holding the _seed_db() sessions (built once per module).
+
+    Each test gets its own copy, so tests that delete or edit sessions don't
+    leak changes into the next one.
+    """
+    return load_template(_dashboard_template)
+
+
+@pytest.fixture(scope="module")
+def _dashboard_template_sessions(_dashboard_template):
+    conn = sqlite3.connect(str(_dashboard_template))
+    try:
+        return [tuple(row) for row in conn.execute("SELECT id, session_id FROM sessions ORDER BY id")]
+    finally:
+        conn.close()
 
 
 @pytest.fixture()
-def seeded_db(isolated_db):
-    """Seed the temporary database with test data."""
-    _seed_db()
-    return isolated_db
+def seeded_sessions(seeded_db, _dashboard_template_sessions):
+    """(database id, session_id) of each seeded session, read once per module from the template."""
+    return list(_dashboard_template_sessions)
+
+
+@pytest.fixture()
+def seeded_sids(seeded_sessions):
+    """Database IDs of the seeded sessions."""
+    return [sid for sid, _ in seeded_sessions]
 
 
 # ---------------------------------------------------------------------------
@@ -95,8 +143,7 @@ class TestIndex:
 # ---------------------------------------------------------------------------
 
 class TestApiListSessions:
-    def test_empty_db(self, client, isolated_db):
-        init_database()
+    def test_empty_db(self, client, initialized_db):
         resp = client.get("/api/sessions")
         data = resp.get_json()
         assert resp.status_code == 200
@@ -130,6 +177,86 @@ class TestApiListSessions:
         assert data["page"] == 1
         assert data["per_page"] == 1
 
+    def test_cursor_pagination(self, client, seeded_db):
+        first = client.get("/api/sessions?per_page=1").get_json()
+        assert first["next_cursor"] is not None
+
+        second = client.get(f"/api/sessions?per_page=1&cursor={first['next_cursor']}").get_json()
+        assert len(second["sessions"]) == 1
+        assert second["next_cursor"] is None
+        assert second["total"] is None  # cursor pages skip the COUNT by default
+
+        # Same sessions, same order as offset paging
+        by_page = client.get("/api/sessions?per_page=2").get_json()["sessions"]
+        assert [s["id"] for s in by_page] == [first["sessions"][0]["id"], second["sessions"][0]["id"]]
+
+    def test_cursor_follows_sort_order(self, client, seeded_db):
+        first = client.get("/api/sessions?per_page=1&sort=created_at&order=asc").get_json()
+        second = client.get(
+            f"/api/sessions?per_page=1&sort=created_at&order=asc&cursor={first['next_cursor']}"
+        ).get_json()
+        assert first["sessions"][0]["created_at"] <= second["sessions"][0]["created_at"]
+        assert first["sessions"][0]["id"] != second["sessions"][0]["id"]
+
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_cursor_pages_include_null_sort_values(self, client, initialized_db, order):
+        save_full_sessions([{"session_id": f"nulls-{i}"} for i in range(4)])
+        with get_connection() as conn:
+            conn.execute("UPDATE sessions SET message_count = NULL WHERE session_id IN ('nulls-0', 'nulls-2')")
+            conn.commit()
+        query = f"/api/sessions?sort=message_count&order={order}"
+        expected = [s["id"] for s in client.get(query).get_json()["sessions"]]
+
+        paged, cursor = [], None
+        while True:
+            data = client.get(query + "&per_page=1" + (f"&cursor={cursor}" if cursor else "")).get_json()
+            paged += [s["id"] for s in data["sessions"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert paged == expected
+        assert len(paged) == 4
+
+    def test_include_total_overrides_default(self, client, seeded_db):
+        assert client.get("/api/sessions?include_total=0").get_json()["total"] is None
+        first = client.get("/api/sessions?per_page=1").get_json()
+        data = client.get(f"/api/sessions?per_page=1&include_total=1&cursor={first['next_cursor']}").get_json()
+        assert data["total"] == 2
+
+    @pytest.mark.parametrize("cursor", ["99999", "not-a-cursor", "WyJjcmVhdGVkX2F0IiwxXQ"])
+    def test_invalid_cursor(self, client, seeded_db, cursor):
+        resp = client.get(f"/api/sessions?cursor={cursor}")
+        assert resp.status_code == 400
+
+    def test_cursor_for_other_sort_rejected(self, client, seeded_db):
+        first = client.get("/api/sessions?per_page=1&sort=created_at").get_json()
+        resp = client.get(f"/api/sessions?per_page=1&sort=message_count&cursor={first['next_cursor']}")
+        assert resp.status_code == 400
+
+    def test_cursor_survives_cursor_session_deleted(self, client, seeded_db):
+        first = client.get("/api/sessions?per_page=1").get_json()
+        by_page = [s["id"] for s in client.get("/api/sessions?per_page=2").get_json()["sessions"]]
+        with get_connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (first["sessions"][0]["id"],))
+            conn.commit()
+        second = client.get(f"/api/sessions?per_page=1&cursor={first['next_cursor']}").get_json()
+        assert [s["id"] for s in second["sessions"]] == by_page[1:]
+
+    def test_cursor_unaffected_by_update_to_cursor_session(self, client, initialized_db):
+        """The cursor holds the sort value it was issued with, so the row moving doesn't skip or repeat rows."""
+        save_full_sessions([{"session_id": f"upd-{i}"} for i in range(3)])
+        query = "/api/sessions?sort=updated_at&order=asc"
+        expected = [s["id"] for s in client.get(query).get_json()["sessions"]]
+        first = client.get(query + "&per_page=1").get_json()
+        with get_connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET updated_at = datetime('now', '+1 day') WHERE id = ?",
+                (first["sessions"][0]["id"],),
+            )
+            conn.commit()
+        rest = client.get(query + f"&per_page=2&cursor={first['next_cursor']}").get_json()
+        assert [s["id"] for s in rest["sessions"]] == expected[1:]
+
     def test_project_filter(self, client, seeded_db):
         resp = client.get("/api/sessions?project=project-alpha")
         data = resp.get_json()
@@ -137,6 +264,20 @@ class TestApiListSessions:
         assert data["total"] == 1
         assert "alpha" in data["sessions"][0]["project_path"]
 
+    def test_project_filter_matches_substring(self, client, seeded_db):
+        # Any part of the path, not just a prefix; both seeded paths contain "project-"
+        assert client.get("/api/sessions?project=alpha").get_json()["total"] == 1
+        assert client.get("/api/sessions?project=project-").get_json()["total"] == 2
+
+    def test_project_filter_escapes_wildcards(self, client, seeded_db):
+        assert client.get("/api/sessions?project=%25").get_json()["total"] == 0
+        assert client.get("/api/sessions?project=project_alpha").get_json()["total"] == 0
+
+    def test_project_filter_sees_new_projects(self, client, seeded_db):
+        assert client.get("/api/sessions?project=gamma").get_json()["total"] == 0
+        save_full_session(session_id="sess-ggg", project_path="/tmp/project-gamma")
+        assert client.get("/api/sessions?project=gamma").get_json()["total"] == 1
+
     def test_sort_order(self, client, seeded_db):
         resp = client.get("/api/sessions?sort=created_at&order=asc")
         data = resp.get_json()
@@ -153,15 +294,29 @@ class TestApiListSessions:
         assert data["total"] == 2
 
 
+class TestJsonProvider:
+    def test_responses_use_db_utils_json(self, client, seeded_db, monkeypatch):
+        if dashboard.DefaultJSONProvider is None:
+            pytest.skip("Flask < 2.2 has no pluggable JSON provider")
+        calls = []
+        monkeypatch.setattr(dashboard, "json_dumps", lambda obj: calls.append(obj) or json_dumps(obj))
+        data = client.get("/api/export").get_json()
+        assert calls and calls[-1]["total"] == data["total"] == 2
+
+    def test_request_bodies_parsed(self, client, seeded_sids):
+        resp = client.put(f"/api/sessions/{seeded_sids[0]}", json={"topics": ["caf\u00e9"]})
+        assert resp.status_code == 200
+        assert resp.get_json()["updated"]["topics"] == ["caf\u00e9"]
+
+
 # ---------------------------------------------------------------------------
 # TestApiGetSession
 # ---------------------------------------------------------------------------
 
 class TestApiGetSession:
-    def test_returns_full_detail(self, client, seeded_db):
+    def test_returns_full_detail(self, client, seeded_sids):
         # Get list first to find a real ID
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+        sid = seeded_sids[0]
 
         resp = client.get(f"/api/sessions/{sid}")
         data = resp.get_json()
@@ -184,9 +339,8 @@ class TestApiGetSession:
 # ---------------------------------------------------------------------------
 
 class TestApiUpdateSession:
-    def test_update_summary(self, client, seeded_db):
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+    def test_update_summary(self, client, seeded_sids):
+        sid = seeded_sids[0]
 
         resp = client.put(
             f"/api/sessions/{sid}",
@@ -197,9 +351,8 @@ class TestApiUpdateSession:
         assert "summary" in data["updated"]
         assert "brief" in data["updated"]["summary"]
 
-    def test_update_topics(self, client, seeded_db):
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+    def test_update_topics(self, client, seeded_sids):
+        sid = seeded_sids[0]
 
         resp = client.put(
             f"/api/sessions/{sid}",
@@ -214,9 +367,8 @@ class TestApiUpdateSession:
         resp = client.put("/api/sessions/99999", json={"brief": "x"})
         assert resp.status_code == 404
 
-    def test_no_data(self, client, seeded_db):
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+    def test_no_data(self, client, seeded_sids):
+        sid = seeded_sids[0]
         resp = client.put(
             f"/api/sessions/{sid}",
             content_type="application/json",
@@ -224,10 +376,9 @@ class TestApiUpdateSession:
         )
         assert resp.status_code == 400
 
-    def test_update_without_brief(self, client, seeded_db):
+    def test_update_without_brief(self, client, seeded_sids):
         """PUT with only non-brief fields should not crash (BUG-1)."""
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+        sid = seeded_sids[0]
 
         resp = client.put(
             f"/api/sessions/{sid}",
@@ -244,10 +395,9 @@ class TestApiUpdateSession:
         assert detail["brief"] is not None
         assert detail["brief"] != ""
 
-    def test_update_user_note_without_brief(self, client, seeded_db):
+    def test_update_user_note_without_brief(self, client, seeded_sids):
         """Updating user_note alone must not crash."""
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+        sid = seeded_sids[0]
 
         resp = client.put(
             f"/api/sessions/{sid}",
@@ -268,9 +418,8 @@ class TestApiUpdateSession:
 # ---------------------------------------------------------------------------
 
 class TestApiDeleteSession:
-    def test_deletes_session(self, client, seeded_db):
-        list_resp = client.get("/api/sessions")
-        sid = list_resp.get_json()["sessions"][0]["id"]
+    def test_deletes_session(self, client, seeded_sids):
+        sid = seeded_sids[0]
 
         resp = client.delete(f"/api/sessions/{sid}")
         data = resp.get_json()
@@ -289,11 +438,8 @@ class TestApiDeleteSession:
         resp = client.delete("/api/sessions/1")
         assert resp.status_code == 404
 
-    def test_children_cleaned(self, client, seeded_db):
-        list_resp = client.get("/api/sessions")
-        session = list_resp.get_json()["sessions"][0]
-        sid = session["id"]
-        session_id_text = session["session_id"]
+    def test_children_cleaned(self, client, seeded_sessions):
+        sid, session_id_text = seeded_sessions[0]
 
         # Insert a checkpoint so we can verify it gets cleaned up
         with get_connection() as conn:
@@ -305,19 +451,29 @@ class TestApiDeleteSession:
 
         client.delete(f"/api/sessions/{sid}")
 
+        # Child rows plus context_checkpoints (BUG-2), counted in one statement
         with get_connection(readonly=True) as conn:
-            for table in ("messages", "topics", "summaries", "code_snippets"):
-                count = conn.execute(
-                    f"SELECT COUNT(*) FROM {table} WHERE session_id = ?", (sid,)
-                ).fetchone()[0]
-                assert count == 0, f"{table} still has rows for deleted session"
+            counts = dict(conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM messages WHERE session_id = ?) AS messages,
+                    (SELECT COUNT(*) FROM topics WHERE session_id = ?) AS topics,
+                    (SELECT COUNT(*) FROM summaries WHERE session_id = ?) AS summaries,
+                    (SELECT COUNT(*) FROM code_snippets WHERE session_id = ?) AS code_snippets,
+                    (SELECT COUNT(*) FROM context_checkpoints WHERE session_id = ?) AS context_checkpoints
+            """, (sid, sid, sid, sid, session_id_text)).fetchone())
+        assert counts == dict.fromkeys(counts, 0), "rows left behind for deleted session"
+
+    def test_search_indexes_cleaned(self, client, seeded_sids):
+        """Cascaded child deletes still fire the FTS sync triggers."""
+        sid = seeded_sids[0]  # sess-aaa, the auth session
+        assert client.get("/api/search?q=jwt").get_json()["result_count"] == 1
+
+        client.delete(f"/api/sessions/{sid}")
 
-            # Verify context_checkpoints are also cleaned up (BUG-2)
-            cp_count = conn.execute(
-                "SELECT COUNT(*) FROM context_checkpoints WHERE session_id = ?",
-                (session_id_text,),
-            ).fetchone()[0]
-            assert cp_count == 0, "context_checkpoints still has rows for deleted session"
+        assert client.get("/api/search?q=jwt").get_json()["result_count"] == 0
+        with get_connection() as conn:
+            for fts in ("messages_fts", "summaries_fts", "topics_fts", "code_snippets_fts"):
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('integrity-check')")
 
 
 # ---------------------------------------------------------------------------
@@ -476,6 +632,46 @@ class TestApiAnalyticsTechnologies:
         assert data["data"] == []
 
 
+# ---------------------------------------------------------------------------
+# TestAnalyticsCache
+# ---------------------------------------------------------------------------
+
+class TestAnalyticsCache:
+    def test_repeat_request_served_from_cache(self, client, seeded_db, monkeypatch):
+        # The first read of a fresh copy creates its -wal file, which changes
+        # the fingerprint mid-request, so the body is cached on the second
+        client.get("/api/analytics/topics")
+        first = client.get("/api/analytics/topics")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached response should not query the database")
+
+        monkeypatch.setattr(dashboard, "get_connection", fail)
+        second = client.get("/api/analytics/topics")
+        assert second.status_code == 200
+        assert second.get_json() == first.get_json()
+
+    def test_query_string_is_part_of_key(self, client, seeded_db):
+        assert len(client.get("/api/analytics/topics?limit=1").get_json()["data"]) == 1
+        assert len(client.get("/api/analytics/topics?limit=20").get_json()["data"]) > 1
+
+    def test_delete_invalidates(self, client, seeded_db, seeded_sids):
+        before = client.get("/api/analytics/projects").get_json()["data"]
+        client.delete(f"/api/sessions/{seeded_sids[0]}")
+        after = client.get("/api/analytics/projects").get_json()["data"]
+        assert sum(d["count"] for d in after) == sum(d["count"] for d in before) - 1
+
+    def test_external_write_invalidates(self, client, seeded_db):
+        before = client.get("/api/analytics/outcomes").get_json()["data"]
+        # A write that bypasses the dashboard, like a save from another process
+        with get_connection() as conn:
+            conn.execute("UPDATE summaries SET outcome = 'abandoned'")
+            conn.commit()
+        after = client.get("/api/analytics/outcomes").get_json()["data"]
+        assert after != before
+        assert {d["outcome"] for d in after} == {"abandoned"}
+
+
 # ---------------------------------------------------------------------------
 # TestApiPrune
 # ---------------------------------------------------------------------------
@@ -564,8 +760,64 @@ class TestApiExport:
         assert len(data2["sessions"]) == 1
         assert data2["has_more"] is False
 
-    def test_export_empty_db(self, client, isolated_db):
-        init_database()
+    def test_export_cursor_pagination(self, client, seeded_db):
+        first = client.get("/api/export?per_page=1").get_json()
+        assert first["has_more"] is True
+        second = client.get(f"/api/export?per_page=1&cursor={first['next_cursor']}").get_json()
+        assert second["has_more"] is False
+        assert second["next_cursor"] is None
+        ids = {first["sessions"][0]["id"], second["sessions"][0]["id"]}
+        assert len(ids) == 2
+
+    def test_export_invalid_cursor(self, client, seeded_db):
+        assert client.get("/api/export?cursor=99999").status_code == 400
+
+    def test_export_cursor_survives_cursor_session_deleted(self, client, seeded_db, seeded_sids):
+        first = client.get("/api/export?per_page=1").get_json()
+        with get_connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (first["sessions"][0]["id"],))
+            conn.commit()
+        second = client.get(f"/api/export?per_page=1&cursor={first['next_cursor']}").get_json()
+        assert [s["id"] for s in second["sessions"]] == [sid for sid in seeded_sids if sid != first["sessions"][0]["id"]]
+
+    def test_export_ndjson_stream(self, client, seeded_db, seeded_sids, monkeypatch):
+        # One session per batch, so the stream has to page through the cursor
+        monkeypatch.setattr(dashboard, "EXPORT_STREAM_BATCH", 1)
+        resp = client.get("/api/export", headers={"Accept": "application/x-ndjson"}, buffered=False)
+        assert resp.status_code == 200
+        assert resp.mimetype == "application/x-ndjson"
+        assert resp.is_streamed
+        lines = b"".join(resp.response).decode("utf-8").splitlines()
+        sessions = [json_loads(line) for line in lines]
+        assert sorted(s["id"] for s in sessions) == sorted(seeded_sids)
+        assert all("messages" in s for s in sessions)
+
+    def test_export_ndjson_survives_cursor_session_deleted(self, client, seeded_db, seeded_sids, monkeypatch):
+        monkeypatch.setattr(dashboard, "EXPORT_STREAM_BATCH", 1)
+        resp = client.get("/api/export", headers={"Accept": "application/x-ndjson"}, buffered=False)
+        chunks = iter(resp.response)
+        first = json_loads(next(chunks))
+        # Delete the session the stream resumes after, between two batches
+        with get_connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (first["id"],))
+            conn.commit()
+        rest = [json_loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+        assert sorted([first["id"]] + [s["id"] for s in rest]) == sorted(seeded_sids)
+
+    def test_export_ndjson_after_cursor(self, client, seeded_db):
+        first = client.get("/api/export?per_page=1").get_json()
+        resp = client.get(
+            f"/api/export?cursor={first['next_cursor']}", headers={"Accept": "application/x-ndjson"},
+        )
+        lines = resp.get_data(as_text=True).splitlines()
+        assert len(lines) == 1
+        assert json_loads(lines[0])["id"] != first["sessions"][0]["id"]
+
+    def test_export_ndjson_invalid_cursor(self, client, seeded_db):
+        resp = client.get("/api/export?cursor=99999", headers={"Accept": "application/x-ndjson"})
+        assert resp.status_code == 400
+
+    def test_export_empty_db(self, client, initialized_db):
         resp = client.get("/api/export")
         data = resp.get_json()
         assert resp.status_code == 200
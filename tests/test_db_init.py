@@ -1,7 +1,12 @@
 """Tests for database initialization."""
 
+import json
+import sqlite3
+
 import db_init
+import db_save
 import db_utils
+import pytest
 
 
 class TestInitDatabase:
@@ -11,37 +16,71 @@ class TestInitDatabase:
         assert result is True
         assert isolated_db.exists()
 
-    def test_skips_if_exists(self, isolated_db):
-        db_init.init_database()
-        result = db_init.init_database()
-        assert result is False
+    @pytest.mark.parametrize("force, created", [(False, False), (True, True)])
+    def test_existing_db_recreated_only_with_force(self, initialized_db, force, created):
+        assert db_init.init_database(force=force) is created
 
-    def test_force_recreates(self, isolated_db):
-        db_init.init_database()
-        result = db_init.init_database(force=True)
-        assert result is True
-
-    def test_creates_all_tables(self, isolated_db):
-        db_init.init_database()
+    def test_creates_all_tables(self, initialized_db):
         schema = db_init.verify_schema()
         assert schema['valid'] is True
         assert len(schema['missing']) == 0
 
-    def test_verify_schema_lists_tables(self, isolated_db):
-        db_init.init_database()
+    def test_verify_schema_lists_tables(self, initialized_db):
         schema = db_init.verify_schema()
         for table in ['sessions', 'messages', 'summaries', 'topics', 'code_snippets', 'schema_version']:
             assert table in schema['existing']
         for fts in ['summaries_fts', 'messages_fts', 'topics_fts', 'code_snippets_fts']:
             assert fts in schema['existing']
 
-    def test_get_stats_empty_db(self, isolated_db):
-        db_init.init_database()
+    def test_initialized_db_fixture_matches_fresh_init(self, initialized_db):
+        """The cloned schema template is indistinguishable from init_database()."""
+        schema = db_init.verify_schema()
+        assert schema['valid'] is True
+        with db_utils.get_connection() as conn:
+            assert db_init.get_schema_version(conn) == db_init.CURRENT_SCHEMA_VERSION
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db_init.init_database() is False
+
+    def test_verify_schema_reuses_scan_until_file_changes(self, initialized_db, monkeypatch):
+        with db_utils.get_connection(readonly=True):
+            pass  # open the database so its -wal file exists before the first scan
+        assert db_init.verify_schema()['valid'] is True
+
+        def no_connection(*args, **kwargs):
+            raise AssertionError("sqlite_master re-scanned for an unchanged file")
+
+        monkeypatch.setattr(db_init, "get_connection", no_connection)
+        cached = db_init.verify_schema()
+        assert cached['valid'] is True
+        cached['existing'].clear()  # callers get their own copy
+        assert db_init.verify_schema()['existing']
+
+    def test_verify_schema_sees_schema_changes(self, initialized_db):
+        assert db_init.verify_schema()['valid'] is True
+        with db_utils.get_connection() as conn:
+            conn.execute("DROP TABLE checkpoint_counters")
+            conn.commit()
+        result = db_init.verify_schema()
+        assert result['valid'] is False
+        assert result['missing'] == ['checkpoint_counters']
+
+    def test_verify_schema_reports_missing_fts_trigger(self, initialized_db):
+        result = db_init.verify_schema()
+        assert result['missing_triggers'] == []
+        with db_utils.get_connection() as conn:
+            conn.execute("DROP TRIGGER messages_au")
+            conn.commit()
+        result = db_init.verify_schema()
+        assert result['valid'] is False
+        assert result['missing'] == []
+        assert result['missing_triggers'] == ['messages_au']
+
+    def test_get_stats_empty_db(self, initialized_db):
         stats = db_init.get_stats()
-        for table in db_utils.STATS_TABLES:
-            assert stats[table] == 0
-        # schema_version should NOT be in stats
+        # Exactly the user-facing tables; internal ones such as schema_version are left out
+        assert set(stats) == db_utils.STATS_TABLES | {'db_size_bytes'}
         assert 'schema_version' not in stats
+        assert all(stats[table] == 0 for table in db_utils.STATS_TABLES)
         assert stats['db_size_bytes'] > 0
 
     def test_get_stats_no_db_returns_empty(self, isolated_db):
@@ -57,26 +96,19 @@ class TestInitDatabase:
         assert result['error'] == 'database not found'
         assert result['existing'] == []
         assert len(result['missing']) > 0
+        assert result['missing_triggers'] == db_init.FTS_TRIGGERS
 
 
 class TestSchemaVersioning:
-    def test_fresh_db_has_version_table(self, isolated_db):
-        db_init.init_database()
+    def test_fresh_db_has_current_version(self, initialized_db):
         with db_utils.get_connection(readonly=True) as conn:
             version = db_init.get_schema_version(conn)
-        assert version == db_init.CURRENT_SCHEMA_VERSION
-
-    def test_fresh_db_has_correct_version(self, isolated_db):
-        db_init.init_database()
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT version FROM schema_version ORDER BY version DESC LIMIT 1")
-            row = cursor.fetchone()
-        assert row[0] == db_init.CURRENT_SCHEMA_VERSION
+            row = conn.execute("SELECT version FROM schema_version ORDER BY version DESC LIMIT 1").fetchone()
+        assert version == row[0] == db_init.CURRENT_SCHEMA_VERSION
 
     def test_legacy_db_returns_version_1(self, isolated_db):
         """A DB without schema_version table is implicitly version 1."""
         # Create a legacy DB (without schema_version table)
-        import sqlite3
         conn = sqlite3.connect(str(isolated_db))
         conn.execute("CREATE TABLE sessions (id INTEGER PRIMARY KEY, session_id TEXT)")
         conn.commit()
@@ -85,14 +117,10 @@ class TestSchemaVersioning:
         conn.close()
         assert version == 1
 
-    def test_legacy_db_auto_migrates(self, isolated_db):
+    def test_legacy_db_auto_migrates(self, legacy_db):
         """ensure_schema_current() migrates a legacy DB to current version."""
-        # Create a legacy-style DB with all tables but no schema_version
+        # A legacy-style DB has all tables but no schema_version
         with db_utils.get_connection() as conn:
-            # Execute schema SQL but skip the schema_version part
-            legacy_sql = db_init.SCHEMA_SQL.split("-- Schema versioning")[0]
-            conn.executescript(legacy_sql)
-            conn.commit()
             assert db_init.get_schema_version(conn) == 1
 
         db_init.ensure_schema_current()
@@ -101,36 +129,202 @@ class TestSchemaVersioning:
             version = db_init.get_schema_version(conn)
         assert version == db_init.CURRENT_SCHEMA_VERSION
 
-    def test_migrations_are_idempotent(self, isolated_db):
+    def test_migrations_are_idempotent(self, initialized_db):
         """Running ensure_schema_current() twice doesn't fail or change version."""
-        db_init.init_database()
         db_init.ensure_schema_current()
         db_init.ensure_schema_current()
         with db_utils.get_connection(readonly=True) as conn:
             version = db_init.get_schema_version(conn)
         assert version == db_init.CURRENT_SCHEMA_VERSION
 
-    def test_apply_migrations_returns_final_version(self, isolated_db):
-        # Create legacy DB
+    def test_apply_migrations_returns_final_version(self, legacy_db):
         with db_utils.get_connection() as conn:
-            legacy_sql = db_init.SCHEMA_SQL.split("-- Schema versioning")[0]
-            conn.executescript(legacy_sql)
-            conn.commit()
             final = db_init.apply_migrations(conn)
         assert final == db_init.CURRENT_SCHEMA_VERSION
 
-    def test_apply_migrations_missing_migration_raises(self, isolated_db, monkeypatch):
+    def test_apply_migrations_missing_migration_raises(self, legacy_db, monkeypatch):
         """apply_migrations() should raise RuntimeError if a migration function is missing."""
-        # Create a legacy DB at version 1
-        with db_utils.get_connection() as conn:
-            legacy_sql = db_init.SCHEMA_SQL.split("-- Schema versioning")[0]
-            conn.executescript(legacy_sql)
-            conn.commit()
-
         # Bump CURRENT_SCHEMA_VERSION beyond what MIGRATIONS covers
         monkeypatch.setattr(db_init, "CURRENT_SCHEMA_VERSION", 99)
 
         with db_utils.get_connection() as conn:
-            import pytest
             with pytest.raises(RuntimeError, match="No migration found for version"):
                 db_init.apply_migrations(conn)
+
+
+class TestTopicsJsonDenormalization:
+    def _topics_json(self, session_db_id):
+        with db_utils.get_connection(readonly=True) as conn:
+            row = conn.execute(
+                "SELECT topics_json FROM summaries WHERE session_id = ?", (session_db_id,)
+            ).fetchone()
+        return json.loads(row[0])
+
+    def test_triggers_track_topic_changes(self, initialized_db):
+        sid = db_save.save_session("denorm-1", "/tmp/proj")
+        db_save.save_topics(sid, ["early"])
+        db_save.save_summary(sid, brief="Summary saved after topics")
+        assert self._topics_json(sid) == ["early"]
+
+        db_save.save_topics(sid, ["auth", "jwt"])
+        assert self._topics_json(sid) == ["auth", "jwt"]
+
+        db_save.save_topics(sid, [])
+        assert self._topics_json(sid) == []
+
+    def test_summaries_fts_in_sync_after_topic_changes(self, initialized_db):
+        sid = db_save.save_session("denorm-2", "/tmp/proj")
+        db_save.save_summary(sid, brief="Kubernetes rollout")
+        db_save.save_topics(sid, ["k8s"])
+        with db_utils.get_connection(readonly=True) as conn:
+            hits = conn.execute(
+                "SELECT COUNT(*) FROM summaries_fts WHERE summaries_fts MATCH ?", ("kubernetes",)
+            ).fetchone()[0]
+        assert hits == 1
+
+    def test_migration_backfills_existing_rows(self, initialized_db):
+        sid = db_save.save_session("denorm-3", "/tmp/proj")
+        db_save.save_summary(sid, brief="Pre-migration summary")
+        db_save.save_topics(sid, ["legacy"])
+        with db_utils.get_connection() as conn:
+            conn.execute("UPDATE summaries SET topics_json = NULL")
+            conn.execute("UPDATE schema_version SET version = 4")
+            conn.commit()
+
+        db_init.ensure_schema_current()
+        assert self._topics_json(sid) == ["legacy"]
+
+
+class TestCheckpointIndexes:
+    def test_latest_checkpoint_lookup_uses_index_without_sort(self, initialized_db):
+        with db_utils.get_connection(readonly=True) as conn:
+            for column in ("session_id", "project_hash"):
+                plan = " ".join(
+                    row[3] for row in conn.execute(
+                        f"EXPLAIN QUERY PLAN SELECT id FROM context_checkpoints WHERE {column} = ? "
+                        "ORDER BY created_at DESC, checkpoint_number DESC LIMIT 1",
+                        ("x",),
+                    )
+                )
+                assert f"idx_checkpoints_{column}" in plan
+                assert "TEMP B-TREE" not in plan
+
+    def test_unfiltered_latest_checkpoint_lookup_has_no_sort(self, initialized_db):
+        with db_utils.get_connection(readonly=True) as conn:
+            plan = " ".join(
+                row[3] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT id FROM context_checkpoints "
+                    "ORDER BY created_at DESC, checkpoint_number DESC LIMIT 1"
+                )
+            )
+        assert "idx_checkpoints_created_at" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_migration_rebuilds_checkpoint_indexes(self, legacy_db):
+        with db_utils.get_connection() as conn:
+            conn.execute("DROP INDEX idx_checkpoints_project_hash")
+            conn.execute("CREATE INDEX idx_checkpoints_project_hash ON context_checkpoints(project_hash)")
+            conn.commit()
+            db_init.apply_migrations(conn)
+            columns = [row[2] for row in conn.execute("PRAGMA index_info(idx_checkpoints_project_hash)")]
+        assert columns == ["project_hash", "created_at", "checkpoint_number"]
+
+
+class TestSessionIndexes:
+    def test_project_counts_use_covering_index(self, initialized_db):
+        with db_utils.get_connection(readonly=True) as conn:
+            plan = " ".join(
+                row[3] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT project_path, COUNT(*) FROM sessions "
+                    "WHERE project_path IS NOT NULL AND project_path != '' GROUP BY project_path"
+                )
+            )
+        assert "COVERING INDEX idx_sessions_project_path" in plan
+        assert "TEMP B-TREE FOR GROUP BY" not in plan
+
+    def test_migration_adds_project_path_index(self, legacy_db):
+        with db_utils.get_connection() as conn:
+            conn.execute("DROP INDEX idx_sessions_project_path")
+            conn.commit()
+            db_init.apply_migrations(conn)
+            columns = [row[2] for row in conn.execute("PRAGMA index_info(idx_sessions_project_path)")]
+        assert columns == ["project_path"]
+
+
+class TestTopicIndexes:
+    def test_session_topics_read_from_covering_index_in_insertion_order(self, initialized_db):
+        sid = db_save.save_session("topics-order", "/tmp/proj")
+        db_save.save_summary(sid, brief="Topic order")
+        db_save.save_topics(sid, ["zeta", "alpha", "mid"])
+        with db_utils.get_connection(readonly=True) as conn:
+            plan = " ".join(
+                row[3] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT json_group_array(topic) FROM topics WHERE session_id = ?", (sid,)
+                )
+            )
+            topics_json = conn.execute("SELECT topics_json FROM summaries WHERE session_id = ?", (sid,)).fetchone()[0]
+        assert "COVERING INDEX idx_topics_session_id" in plan
+        assert json.loads(topics_json) == ["zeta", "alpha", "mid"]
+
+    def test_migration_rebuilds_topics_index(self, legacy_db):
+        with db_utils.get_connection() as conn:
+            conn.execute("DROP INDEX idx_topics_session_id")
+            conn.execute("CREATE INDEX idx_topics_session_id ON topics(session_id)")
+            conn.commit()
+            db_init.apply_migrations(conn)
+            columns = [row[2] for row in conn.execute("PRAGMA index_info(idx_topics_session_id)")]
+        assert columns == ["session_id", "id", "topic"]
+
+
+class TestCheckpointStorage:
+    def test_migration_drops_checkpoint_message_rows(self, legacy_db):
+        """v14 drops the per-message copy of the checkpoint blobs that v9 added."""
+        with db_utils.get_connection() as conn:
+            db_init.apply_migrations(conn)
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert "context_checkpoints" in tables
+        assert "context_checkpoint_messages" not in tables
+
+
+class TestBulkFtsSuspended:
+    def _snippet_hits(self, term):
+        with db_utils.get_connection(readonly=True) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM code_snippets_fts WHERE code_snippets_fts MATCH ?", (term,)
+            ).fetchone()[0]
+
+    def _trigger_names(self):
+        with db_utils.get_connection(readonly=True) as conn:
+            return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+
+    def test_bulk_insert_is_searchable_and_triggers_restored(self, initialized_db):
+        sid = db_save.save_session("bulk-1", "/tmp/proj")
+        triggers_before = self._trigger_names()
+        with db_init.bulk_fts_suspended(["code_snippets"], optimize=True) as conn:
+            assert "code_snippets_ai" not in {
+                row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            }
+            conn.executemany(
+                "INSERT INTO code_snippets (session_id, code, language) VALUES (?, ?, 'python')",
+                [(sid, f"def handler_{i}(): return 'bulkloaded'") for i in range(20)],
+            )
+        assert self._trigger_names() == triggers_before
+        assert self._snippet_hits("bulkloaded") == 20
+        # Restored triggers keep the index in sync for later writes
+        db_save.save_code_snippet(sid, "print('afterwards')")
+        assert self._snippet_hits("afterwards") == 1
+
+    def test_error_rolls_back_rows_and_trigger_changes(self, initialized_db):
+        sid = db_save.save_session("bulk-2", "/tmp/proj")
+        triggers_before = self._trigger_names()
+        with pytest.raises(RuntimeError):
+            with db_init.bulk_fts_suspended() as conn:
+                conn.execute("INSERT INTO code_snippets (session_id, code) VALUES (?, 'rolledback')", (sid,))
+                raise RuntimeError("boom")
+        assert self._trigger_names() == triggers_before
+        assert db_utils.get_table_count("code_snippets") == 0
+
+    def test_rebuild_rejects_unknown_table(self, initialized_db):
+        with db_utils.get_connection() as conn:
+            with pytest.raises(ValueError, match="No FTS index"):
+                db_init.rebuild_fts_index(conn, ["sessions"])
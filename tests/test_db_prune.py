@@ -1,92 +1,116 @@
 """Tests for database pruning."""
 
+import re
+
 import db_init
 import db_prune
 import db_save
 import db_utils
 
+from tests.helpers import backdate_sessions
+
+SUMMARY_FTS_COUNT_SQL = "SELECT COUNT(*) FROM summaries_fts WHERE summaries_fts MATCH ?"
+SUMMARY_FTS_EXISTS_SQL = "SELECT EXISTS(SELECT 1 FROM summaries_fts WHERE summaries_fts MATCH ?)"
+
+
+def _assert_fts_plan(conn, sql, params):
+    """Fail unless ``sql`` looks its terms up in the FTS5 index instead of scanning all of it."""
+    plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    # FTS5 reports a MATCH constraint as "M<column>" in the index string; a bare "INDEX 0:" is a full scan
+    assert re.search(r"VIRTUAL TABLE INDEX \d+:\S*M", plan), plan
+
 
 class TestPruneSessions:
-    def _create_sessions(self, isolated_db, count=5, project_path="/tmp/proj"):
-        """Helper to create N sessions with summaries and topics."""
-        db_init.init_database()
-        for i in range(count):
-            db_save.save_full_session(
-                session_id=f"session-{i}",
-                project_path=project_path,
-                summary={"brief": f"Session {i} summary"},
-                topics=[f"topic-{i}"],
-                messages=[{"role": "user", "content": f"Message {i}"}],
-                code_snippets=[{"code": f"print({i})", "language": "python"}],
-            )
+    def _create_sessions(self, count=5, project_path="/tmp/proj"):
+        """Helper to create N sessions with summaries and topics (on an initialized database).
+
+        The FTS triggers are suspended while seeding and the indexes rebuilt
+        once at the end, which is cheaper than tokenizing row by row.
+        """
+        with db_init.bulk_fts_suspended() as conn:
+            for i in range(count):
+                db_save._save_full_session(
+                    conn,
+                    session_id=f"session-{i}",
+                    project_path=project_path,
+                    summary={"brief": f"Session {i} summary"},
+                    topics=[f"topic-{i}"],
+                    messages=[{"role": "user", "content": f"Message {i}"}],
+                    code_snippets=[{"code": f"print({i})", "language": "python"}],
+                )
         return count
 
-    def test_prune_by_count_keeps_newest(self, isolated_db):
-        self._create_sessions(isolated_db, count=5)
+    def test_prune_by_count_keeps_newest(self, initialized_db, ro_conn):
+        self._create_sessions(count=5)
         result = db_prune.prune_sessions(max_sessions=3)
         assert result["pruned"] == 2
         # Verify 3 remain
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM sessions")
-            assert cursor.fetchone()[0] == 3
-
-    def test_prune_by_age(self, isolated_db):
-        db_init.init_database()
-        project_hash = db_utils.hash_project_path("/tmp/proj")
-        # Insert old session directly
-        with db_utils.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO sessions (session_id, project_path, project_hash,
-                    created_at, updated_at)
-                VALUES ('old-1', '/tmp/proj', ?, datetime('now', '-30 days'), datetime('now', '-30 days'))
-            """, (project_hash,))
-            old_id = conn.execute("SELECT id FROM sessions WHERE session_id='old-1'").fetchone()[0]
-            conn.execute("INSERT INTO summaries (session_id, brief) VALUES (?, 'Old session')", (old_id,))
-            conn.commit()
-        # Insert new session
-        db_save.save_full_session(session_id="new-1", project_path="/tmp/proj",
-                                  summary={"brief": "New session"})
+        assert ro_conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 3
+
+    def test_prune_by_age(self, initialized_db, ro_conn):
+        db_save.save_full_sessions([
+            {"session_id": "old-1", "project_path": "/tmp/proj", "summary": {"brief": "Old session"}},
+            {"session_id": "new-1", "project_path": "/tmp/proj", "summary": {"brief": "New session"}},
+        ])
+        backdate_sessions(["old-1"], "-30 days")
         result = db_prune.prune_sessions(max_age_days=7)
         assert result["pruned"] == 1
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT session_id FROM sessions")
-            remaining = [row[0] for row in cursor.fetchall()]
+        cursor = ro_conn.execute("SELECT session_id FROM sessions")
+        remaining = [row[0] for row in cursor.fetchall()]
         assert "new-1" in remaining
         assert "old-1" not in remaining
 
-    def test_dry_run_doesnt_delete(self, isolated_db):
-        self._create_sessions(isolated_db, count=5)
+    def test_dry_run_doesnt_delete(self, initialized_db, ro_conn):
+        self._create_sessions(count=5)
         result = db_prune.prune_sessions(max_sessions=2, dry_run=True)
         assert result["pruned"] == 3
         assert result["dry_run"] is True
         assert len(result["sessions"]) == 3
         # Verify nothing was actually deleted
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM sessions")
-            assert cursor.fetchone()[0] == 5
+        assert ro_conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 5
 
-    def test_cascade_cleans_children(self, isolated_db):
-        self._create_sessions(isolated_db, count=3)
+    def test_cascade_cleans_children(self, initialized_db, ro_conn):
+        self._create_sessions(count=3)
         result = db_prune.prune_sessions(max_sessions=1)
         assert result["pruned"] == 2
-        with db_utils.get_connection(readonly=True) as conn:
-            for table in ['messages', 'summaries', 'topics', 'code_snippets']:
-                cursor = conn.execute(f"SELECT COUNT(*) FROM {table}")
-                assert cursor.fetchone()[0] == 1, f"{table} should have 1 row after prune"
+        for table in ['messages', 'summaries', 'topics', 'code_snippets']:
+            count = ro_conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            assert count == 1, f"{table} should have 1 row after prune"
 
-    def test_fts_cleaned_after_prune(self, isolated_db):
+    def test_fts_cleaned_after_prune(self, initialized_db, ro_conn):
         """FTS indexes should be cleaned up after pruning (via DELETE triggers)."""
-        self._create_sessions(isolated_db, count=3)
+        self._create_sessions(count=3)
         db_prune.prune_sessions(max_sessions=1)
-        with db_utils.get_connection(readonly=True) as conn:
-            # Search for pruned content should yield no results
-            cursor = conn.execute(
-                "SELECT COUNT(*) FROM summaries_fts WHERE summaries_fts MATCH '\"Session 0\"'"
-            )
-            assert cursor.fetchone()[0] == 0
-
-    def test_empty_db(self, isolated_db):
-        db_init.init_database()
+        params = ('"Session 0"',)
+        _assert_fts_plan(ro_conn, SUMMARY_FTS_EXISTS_SQL, params)
+        # Search for pruned content should yield no results
+        assert ro_conn.execute(SUMMARY_FTS_EXISTS_SQL, params).fetchone()[0] == 0
+        # The kept session is still indexed (seeding rebuilt the index)
+        assert ro_conn.execute(SUMMARY_FTS_EXISTS_SQL, ('"Session 2"',)).fetchone()[0] == 1
+
+    def test_prune_all_clears_fts_and_keeps_triggers(self, initialized_db, ro_conn):
+        """Pruning every session takes the wholesale path; indexes stay consistent."""
+        self._create_sessions(count=3)
+        triggers_before = ro_conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+
+        result = db_prune.prune_sessions(max_sessions=0)
+        assert result["pruned"] == 3
+
+        with db_utils.get_connection() as conn:
+            for table in ['messages', 'summaries', 'topics', 'code_snippets']:
+                assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+                fts = f"{table}_fts"
+                assert conn.execute(f"SELECT COUNT(*) FROM {fts}").fetchone()[0] == 0
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('integrity-check')")
+            triggers_after = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        assert sorted(map(tuple, triggers_after)) == sorted(map(tuple, triggers_before))
+
+        # Restored triggers keep indexing new sessions
+        db_save.save_full_session(session_id="after-prune", summary={"brief": "Fresh start"})
+        _assert_fts_plan(ro_conn, SUMMARY_FTS_COUNT_SQL, ("fresh",))
+        assert ro_conn.execute(SUMMARY_FTS_COUNT_SQL, ("fresh",)).fetchone()[0] == 1
+
+    def test_empty_db(self, initialized_db):
         result = db_prune.prune_sessions(max_sessions=5)
         assert result["pruned"] == 0
 
@@ -95,32 +119,21 @@ class TestPruneSessions:
         assert result["pruned"] == 0
         assert result["reason"] == "database does not exist"
 
-    def test_no_criteria(self, isolated_db):
-        db_init.init_database()
+    def test_no_criteria(self, initialized_db):
         result = db_prune.prune_sessions()
         assert result["pruned"] == 0
         assert result["reason"] == "no criteria specified"
 
-    def test_combined_age_and_count(self, isolated_db):
+    def test_combined_age_and_count(self, initialized_db, ro_conn):
         """OR logic: sessions matching either age or count criteria are pruned."""
-        db_init.init_database()
-        project_hash = db_utils.hash_project_path("/tmp/proj")
-        # Insert 2 old sessions
-        with db_utils.get_connection() as conn:
-            for i in range(2):
-                conn.execute("""
-                    INSERT INTO sessions (session_id, project_path, project_hash,
-                        created_at, updated_at)
-                    VALUES (?, '/tmp/proj', ?, datetime('now', '-30 days'), datetime('now', '-30 days'))
-                """, (f"old-{i}", project_hash))
-            conn.commit()
-        # Insert 5 new sessions
-        for i in range(5):
-            db_save.save_session(f"new-{i}", "/tmp/proj")
+        # 2 old sessions and 5 new ones, saved in one batch
+        db_save.save_full_sessions(
+            [{"session_id": f"old-{i}", "project_path": "/tmp/proj"} for i in range(2)]
+            + [{"session_id": f"new-{i}", "project_path": "/tmp/proj"} for i in range(5)]
+        )
+        backdate_sessions(["old-0", "old-1"], "-30 days")
 
         # max_age=7 catches 2 old ones, max_sessions=3 catches 2 newest overflow -> OR = up to 4
         result = db_prune.prune_sessions(max_age_days=7, max_sessions=3)
         assert result["pruned"] == 4  # 2 old + 2 excess new
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM sessions")
-            assert cursor.fetchone()[0] == 3
+        assert ro_conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 3
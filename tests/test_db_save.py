@@ -2,27 +2,27 @@
 
 import json
 import os
+import sqlite3
 import subprocess
 import sys
 
-import db_init
 import db_save
 import db_utils
+import pytest
+
+from tests.helpers import backdate_sessions
 
 
 class TestSaveSession:
-    def test_save_new_session(self, isolated_db):
-        db_init.init_database()
+    def test_save_new_session(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         assert sid >= 1
 
-    def test_save_session_with_project(self, isolated_db):
-        db_init.init_database()
+    def test_save_session_with_project(self, initialized_db):
         sid = db_save.save_session("test-session-1", project_path="/tmp/myproject")
         assert sid >= 1
 
-    def test_update_existing_session(self, isolated_db):
-        db_init.init_database()
+    def test_update_existing_session(self, initialized_db):
         sid1 = db_save.save_session("test-session-1")
         sid2 = db_save.save_session("test-session-1", project_path="/tmp/updated")
         assert sid1 == sid2
@@ -35,8 +35,7 @@ class TestSaveSession:
 
 
 class TestSaveMessages:
-    def test_save_messages(self, isolated_db):
-        db_init.init_database()
+    def test_save_messages(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         messages = [
             {"role": "user", "content": "Hello"},
@@ -45,50 +44,42 @@ class TestSaveMessages:
         count = db_save.save_messages(sid, messages)
         assert count == 2
 
-    def test_replace_messages(self, isolated_db):
-        db_init.init_database()
+    def test_replace_messages(self, initialized_db, ro_conn):
         sid = db_save.save_session("test-session-1")
         db_save.save_messages(sid, [{"role": "user", "content": "First"}])
         db_save.save_messages(sid, [{"role": "user", "content": "Second"}], replace=True)
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (sid,))
-            assert cursor.fetchone()[0] == 1
+        assert ro_conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (sid,)).fetchone()[0] == 1
+        assert ro_conn.execute("SELECT message_count FROM sessions WHERE id = ?", (sid,)).fetchone()[0] == 1
 
-    def test_append_messages(self, isolated_db):
+    def test_append_messages(self, initialized_db, ro_conn):
         """Appending messages (replace=False) should add to existing messages and update count."""
-        db_init.init_database()
         sid = db_save.save_session("test-session-1")
         db_save.save_messages(sid, [{"role": "user", "content": "First"}])
         db_save.save_messages(sid, [{"role": "assistant", "content": "Second"}], replace=False)
-        with db_utils.get_connection(readonly=True) as conn:
-            msg_count = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (sid,)).fetchone()[0]
-            session_count = conn.execute("SELECT message_count FROM sessions WHERE id = ?", (sid,)).fetchone()[0]
+        msg_count = ro_conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (sid,)).fetchone()[0]
+        session_count = ro_conn.execute("SELECT message_count FROM sessions WHERE id = ?", (sid,)).fetchone()[0]
         assert msg_count == 2
         assert session_count == 2
 
-    def test_append_messages_sequence_continuity(self, isolated_db):
+    def test_append_messages_sequence_continuity(self, initialized_db, ro_conn):
         """Appending messages should continue sequence numbering, not restart at 0."""
-        db_init.init_database()
         sid = db_save.save_session("test-seq")
         db_save.save_messages(sid, [{"role": "user", "content": "First"}])
         db_save.save_messages(sid, [{"role": "assistant", "content": "Second"}], replace=False)
-        with db_utils.get_connection(readonly=True) as conn:
-            rows = conn.execute(
-                "SELECT sequence, content FROM messages WHERE session_id = ? ORDER BY sequence",
-                (sid,)
-            ).fetchall()
+        rows = ro_conn.execute(
+            "SELECT sequence, content FROM messages WHERE session_id = ? ORDER BY sequence",
+            (sid,)
+        ).fetchall()
         assert rows[0]["sequence"] == 0
         assert rows[1]["sequence"] == 1
 
-    def test_messages_missing_role_and_content(self, isolated_db):
+    def test_messages_missing_role_and_content(self, initialized_db, ro_conn):
         """Messages with missing role/content should use defaults."""
-        db_init.init_database()
         sid = db_save.save_session("test-session-1")
         db_save.save_messages(sid, [{"other_key": "value"}, {}])
-        with db_utils.get_connection(readonly=True) as conn:
-            rows = conn.execute(
-                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY sequence", (sid,)
-            ).fetchall()
+        rows = ro_conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY sequence", (sid,)
+        ).fetchall()
         assert len(rows) == 2
         assert rows[0]["role"] == "user"
         assert rows[0]["content"] == ""
@@ -96,14 +87,12 @@ class TestSaveMessages:
 
 
 class TestSaveSummary:
-    def test_save_summary(self, isolated_db):
-        db_init.init_database()
+    def test_save_summary(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         summary_id = db_save.save_summary(sid, brief="Test session summary")
         assert summary_id >= 1
 
-    def test_save_summary_with_details(self, isolated_db):
-        db_init.init_database()
+    def test_save_summary_with_details(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         summary_id = db_save.save_summary(
             sid,
@@ -115,41 +104,35 @@ class TestSaveSummary:
         )
         assert summary_id >= 1
 
-    def test_update_summary(self, isolated_db):
-        db_init.init_database()
+    def test_update_summary(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         id1 = db_save.save_summary(sid, brief="First")
         id2 = db_save.save_summary(sid, brief="Updated")
         assert id1 == id2
 
-    def test_update_summary_without_brief(self, isolated_db):
+    def test_update_summary_without_brief(self, initialized_db, ro_conn):
         """Updating a summary without providing brief should preserve existing brief."""
-        db_init.init_database()
         sid = db_save.save_session("test-session")
         db_save.save_summary(sid, brief="Original summary", outcome="partial")
 
         # Update only outcome — brief should be preserved
         db_save.save_summary(sid, outcome="success")
 
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute(
-                "SELECT brief, outcome FROM summaries WHERE session_id = ?", (sid,)
-            ).fetchone()
-            assert row["brief"] == "Original summary"
-            assert row["outcome"] == "success"
+        row = ro_conn.execute(
+            "SELECT brief, outcome FROM summaries WHERE session_id = ?", (sid,)
+        ).fetchone()
+        assert row["brief"] == "Original summary"
+        assert row["outcome"] == "success"
 
-    def test_insert_summary_without_brief_raises(self, isolated_db):
+    def test_insert_summary_without_brief_raises(self, initialized_db):
         """Creating a new summary without brief should raise ValueError."""
-        import pytest
-        db_init.init_database()
         sid = db_save.save_session("test-session")
 
         with pytest.raises(ValueError, match="brief is required"):
             db_save.save_summary(sid, outcome="success")
 
-    def test_save_summary_with_problems_and_user_note(self, isolated_db):
+    def test_save_summary_with_problems_and_user_note(self, initialized_db, ro_conn):
         """problems_solved and user_note should be stored correctly."""
-        db_init.init_database()
         sid = db_save.save_session("test-session-1")
         summary_id = db_save.save_summary(
             sid,
@@ -158,98 +141,81 @@ class TestSaveSummary:
             user_note="Important fix for production",
         )
         assert summary_id >= 1
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute(
-                "SELECT problems_solved, user_note FROM summaries WHERE id = ?", (summary_id,)
-            ).fetchone()
+        row = ro_conn.execute(
+            "SELECT problems_solved, user_note FROM summaries WHERE id = ?", (summary_id,)
+        ).fetchone()
         assert row["user_note"] == "Important fix for production"
-        import json
         problems = json.loads(row["problems_solved"])
         assert "Token expiration" in problems
         assert "CORS errors" in problems
 
 
 class TestSaveTopics:
-    def test_save_topics(self, isolated_db):
-        db_init.init_database()
+    def test_save_topics(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         count = db_save.save_topics(sid, ["python", "testing", "sqlite"])
         assert count == 3
 
-    def test_replace_topics(self, isolated_db):
-        db_init.init_database()
+    def test_replace_topics(self, initialized_db, ro_conn):
         sid = db_save.save_session("test-session-1")
         db_save.save_topics(sid, ["old-topic"])
         db_save.save_topics(sid, ["new-topic"], replace=True)
-        with db_utils.get_connection(readonly=True) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM topics WHERE session_id = ?", (sid,))
-            assert cursor.fetchone()[0] == 1
+        assert ro_conn.execute("SELECT COUNT(*) FROM topics WHERE session_id = ?", (sid,)).fetchone()[0] == 1
 
-    def test_empty_and_whitespace_topics_filtered(self, isolated_db):
+    def test_empty_and_whitespace_topics_filtered(self, initialized_db, ro_conn):
         """Empty strings and whitespace-only topics should be skipped."""
-        db_init.init_database()
         sid = db_save.save_session("test-session-1")
         count = db_save.save_topics(sid, ["", " ", "  ", "valid", " also-valid "])
         assert count == 2
-        with db_utils.get_connection(readonly=True) as conn:
-            rows = conn.execute(
-                "SELECT topic FROM topics WHERE session_id = ? ORDER BY topic", (sid,)
-            ).fetchall()
+        rows = ro_conn.execute(
+            "SELECT topic FROM topics WHERE session_id = ? ORDER BY topic", (sid,)
+        ).fetchall()
         topics = [r["topic"] for r in rows]
         assert "valid" in topics
         assert "also-valid" in topics
 
-    def test_append_topics(self, isolated_db):
+    def test_append_topics(self, initialized_db, ro_conn):
         """Appending topics (replace=False) should add to existing topics."""
-        db_init.init_database()
         sid = db_save.save_session("test-session-1")
         db_save.save_topics(sid, ["first"])
         db_save.save_topics(sid, ["second"], replace=False)
-        with db_utils.get_connection(readonly=True) as conn:
-            count = conn.execute("SELECT COUNT(*) FROM topics WHERE session_id = ?", (sid,)).fetchone()[0]
+        count = ro_conn.execute("SELECT COUNT(*) FROM topics WHERE session_id = ?", (sid,)).fetchone()[0]
         assert count == 2
 
 
 class TestSaveSessionMetadata:
-    def test_metadata_stored_as_json(self, isolated_db):
+    def test_metadata_stored_as_json(self, initialized_db, ro_conn):
         """Metadata dict should be serialized as JSON in the database."""
-        db_init.init_database()
         sid = db_save.save_session("meta-1", metadata={"auto_save": True, "source": "hook"})
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute("SELECT metadata FROM sessions WHERE id = ?", (sid,)).fetchone()
-        import json
+        row = ro_conn.execute("SELECT metadata FROM sessions WHERE id = ?", (sid,)).fetchone()
         meta = json.loads(row["metadata"])
         assert meta["auto_save"] is True
         assert meta["source"] == "hook"
 
 
 class TestSaveCodeSnippet:
-    def test_save_snippet(self, isolated_db):
-        db_init.init_database()
+    def test_save_snippet(self, initialized_db):
         sid = db_save.save_session("test-session-1")
         snippet_id = db_save.save_code_snippet(
             sid, code="print('hello')", language="python", description="Hello world"
         )
         assert snippet_id >= 1
 
-    def test_save_snippet_minimal(self, isolated_db):
+    def test_save_snippet_minimal(self, initialized_db, ro_conn):
         """Code snippet with only required code field should save successfully."""
-        db_init.init_database()
         sid = db_save.save_session("test-session-1")
         snippet_id = db_save.save_code_snippet(sid, code="x = 1")
         assert snippet_id >= 1
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute(
-                "SELECT language, description, file_path FROM code_snippets WHERE id = ?", (snippet_id,)
-            ).fetchone()
+        row = ro_conn.execute(
+            "SELECT language, description, file_path FROM code_snippets WHERE id = ?", (snippet_id,)
+        ).fetchone()
         assert row["language"] is None
         assert row["description"] is None
         assert row["file_path"] is None
 
 
 class TestSaveFullSession:
-    def test_save_full_session(self, isolated_db):
-        db_init.init_database()
+    def test_save_full_session(self, initialized_db):
         result = db_save.save_full_session(
             session_id="full-session-1",
             project_path="/tmp/myproject",
@@ -266,11 +232,52 @@ class TestSaveFullSession:
         assert result["topics_count"] == 2
         assert len(result["snippets"]) == 1
 
+    def test_snippet_ids_in_input_order(self, initialized_db, ro_conn):
+        snippets = [{"code": f"x = {i}", "language": "python"} for i in range(3)]
+        first = db_save.save_full_session(session_id="snip-1", code_snippets=snippets)
+        # Snippets are appended on a re-save, so the IDs must be the new rows
+        second = db_save.save_full_session(session_id="snip-1", code_snippets=snippets[:2])
+        assert len(set(first["snippets"] + second["snippets"])) == 5
+        codes = [
+            ro_conn.execute("SELECT code FROM code_snippets WHERE id = ?", (sid,)).fetchone()[0]
+            for sid in first["snippets"] + second["snippets"]
+        ]
+        assert codes == ["x = 0", "x = 1", "x = 2", "x = 0", "x = 1"]
+
+    def test_save_full_sessions_batch(self, initialized_db):
+        results = db_save.save_full_sessions([
+            {"session_id": "batch-1", "topics": ["one"]},
+            {"session_id": "batch-2", "summary": {"brief": "Second"}},
+        ])
+        assert [r["session_id"] for r in results] == sorted(r["session_id"] for r in results)
+        assert results[0]["topics_count"] == 1
+        assert "summary_id" in results[1]
+        assert db_utils.get_session_count() == 2
+
+    def test_save_full_sessions_rolls_back_whole_batch(self, initialized_db):
+        with pytest.raises(ValueError, match="brief is required"):
+            db_save.save_full_sessions([
+                {"session_id": "batch-ok", "topics": ["fine"]},
+                {"session_id": "batch-bad", "summary": {"detailed": "no brief given"}},
+            ])
+        assert db_utils.get_session_count() == 0
+
+    def test_failure_rolls_back_whole_session(self, initialized_db, ro_conn):
+        """All tables are written in one transaction; an error part-way leaves nothing behind."""
+        with pytest.raises(ValueError, match="brief is required"):
+            db_save.save_full_session(
+                session_id="atomic-1",
+                messages=[{"role": "user", "content": "hello"}],
+                summary={"detailed": "no brief given"},
+                topics=["testing"],
+            )
+        for table in ("sessions", "messages", "summaries", "topics"):
+            assert ro_conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0, table
+
 
 class TestDeduplication:
-    def test_skip_when_rich_session_exists(self, isolated_db):
+    def test_skip_when_rich_session_exists(self, initialized_db):
         """Auto-save should be skipped if a rich /remember session exists recently."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="rich-1",
             project_path="/tmp/myproject",
@@ -279,9 +286,8 @@ class TestDeduplication:
         )
         assert db_save.should_skip_auto_save("/tmp/myproject", window_minutes=5) is True
 
-    def test_proceed_when_only_auto_saves(self, isolated_db):
+    def test_proceed_when_only_auto_saves(self, initialized_db):
         """Auto-save should proceed when only auto-saves exist (no rich sessions)."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="auto-1",
             project_path="/tmp/myproject",
@@ -289,9 +295,8 @@ class TestDeduplication:
         )
         assert db_save.should_skip_auto_save("/tmp/myproject", window_minutes=5) is False
 
-    def test_proceed_when_auto_save_with_project_name(self, isolated_db):
+    def test_proceed_when_auto_save_with_project_name(self, initialized_db):
         """Auto-save with 'Auto-saved session: proj' prefix should not block."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="auto-1",
             project_path="/tmp/myproject",
@@ -299,9 +304,8 @@ class TestDeduplication:
         )
         assert db_save.should_skip_auto_save("/tmp/myproject", window_minutes=5) is False
 
-    def test_proceed_for_different_project(self, isolated_db):
+    def test_proceed_for_different_project(self, initialized_db):
         """Auto-save should proceed for a different project path."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="rich-1",
             project_path="/tmp/project-a",
@@ -313,60 +317,41 @@ class TestDeduplication:
         """Auto-save should proceed when no database exists."""
         assert db_save.should_skip_auto_save("/tmp/myproject") is False
 
-    def test_proceed_when_no_project_path(self, isolated_db):
+    def test_proceed_when_no_project_path(self, initialized_db):
         """Auto-save should proceed when no project path is provided."""
-        db_init.init_database()
         assert db_save.should_skip_auto_save("") is False
         assert db_save.should_skip_auto_save(None) is False
 
-    def test_proceed_when_session_outside_window(self, isolated_db):
+    def test_proceed_when_session_outside_window(self, initialized_db):
         """Auto-save should proceed if rich session is older than dedup window."""
-        db_init.init_database()
-        project_hash = db_utils.hash_project_path("/tmp/myproject")
-        # Insert directly with backdated timestamp to avoid sessions_updated trigger
-        with db_utils.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO sessions (session_id, project_path, project_hash,
-                    created_at, updated_at)
-                VALUES (?, ?, ?, datetime('now', '-10 minutes'), datetime('now', '-10 minutes'))
-            """, ("rich-1", "/tmp/myproject", project_hash))
-            sid = conn.execute("SELECT id FROM sessions WHERE session_id='rich-1'").fetchone()[0]
-            conn.execute("""
-                INSERT INTO summaries (session_id, brief) VALUES (?, ?)
-            """, (sid, "Old session"))
-            conn.commit()
+        db_save.save_full_session(session_id="rich-1", project_path="/tmp/myproject", summary={"brief": "Old session"})
+        backdate_sessions(["rich-1"], "-10 minutes")
         assert db_save.should_skip_auto_save("/tmp/myproject", window_minutes=5) is False
 
 
 class TestProjectPathNormalization:
-    def test_backslash_path_normalized_in_save_session(self, isolated_db):
+    def test_backslash_path_normalized_in_save_session(self, initialized_db, ro_conn):
         """Backslash paths should be stored as forward slashes."""
-        db_init.init_database()
         sid = db_save.save_session("norm-1", project_path="C:\\Users\\dev\\project")
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute("SELECT project_path FROM sessions WHERE id = ?", (sid,)).fetchone()
+        row = ro_conn.execute("SELECT project_path FROM sessions WHERE id = ?", (sid,)).fetchone()
         assert row["project_path"] == "C:/Users/dev/project"
 
-    def test_forward_slash_path_unchanged(self, isolated_db):
+    def test_forward_slash_path_unchanged(self, initialized_db, ro_conn):
         """Forward-slash paths should remain unchanged."""
-        db_init.init_database()
         sid = db_save.save_session("norm-2", project_path="/home/dev/project")
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute("SELECT project_path FROM sessions WHERE id = ?", (sid,)).fetchone()
+        row = ro_conn.execute("SELECT project_path FROM sessions WHERE id = ?", (sid,)).fetchone()
         assert row["project_path"] == "/home/dev/project"
 
-    def test_backslash_path_normalized_in_save_full_session(self, isolated_db):
+    def test_backslash_path_normalized_in_save_full_session(self, initialized_db, ro_conn):
         """save_full_session should also normalize backslash paths."""
-        db_init.init_database()
         result = db_save.save_full_session(
             session_id="norm-3",
             project_path="C:\\Projects\\context-memory",
             summary={"brief": "Test normalization"},
         )
-        with db_utils.get_connection(readonly=True) as conn:
-            row = conn.execute(
-                "SELECT project_path FROM sessions WHERE id = ?", (result["session_id"],)
-            ).fetchone()
+        row = ro_conn.execute(
+            "SELECT project_path FROM sessions WHERE id = ?", (result["session_id"],)
+        ).fetchone()
         assert row["project_path"] == "C:/Projects/context-memory"
 
 
@@ -418,7 +403,6 @@ class TestStdinJsonLoading:
         result = self._run_save(payload, isolated_db)
         assert result.returncode == 0
         # Verify the path was normalized in the database (use direct sqlite3)
-        import sqlite3
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
         row = conn.execute(
@@ -1,14 +1,13 @@
 """Tests for search functionality."""
 
-import db_init
 import db_save
 import db_search
 import db_utils
+import pytest
 
 
-def _seed_data(isolated_db):
-    """Create test data for search tests."""
-    db_init.init_database()
+def _seed_data():
+    """Create test data for search tests (on an initialized database)."""
     db_save.save_full_session(
         session_id="search-session-1",
         project_path="/tmp/webapp",
@@ -40,9 +39,9 @@ def _seed_data(isolated_db):
     )
 
 
-def _seed_data_with_snippets(isolated_db):
+def _seed_data_with_snippets():
     """Create test data including code snippets for search tests."""
-    _seed_data(isolated_db)
+    _seed_data()
     db_save.save_full_session(
         session_id="search-session-3",
         project_path="/tmp/webapp",
@@ -70,15 +69,35 @@ def _seed_data_with_snippets(isolated_db):
     )
 
 
+@pytest.fixture(scope="module")
+def _search_template(seeded_template):
+    return seeded_template(_seed_data)
+
+
+@pytest.fixture(scope="module")
+def _search_template_with_snippets(seeded_template):
+    return seeded_template(_seed_data_with_snippets)
+
+
+@pytest.fixture
+def seeded_db(load_template, _search_template):
+    """This test's database, holding the _seed_data() sessions (built once per module)."""
+    return load_template(_search_template)
+
+
+@pytest.fixture
+def seeded_db_with_snippets(load_template, _search_template_with_snippets):
+    """Like seeded_db, plus the _seed_data_with_snippets() session."""
+    return load_template(_search_template_with_snippets)
+
+
 class TestSearchTier1:
-    def test_search_returns_results(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_search_returns_results(self, seeded_db):
         results = db_search.search_tier1("authentication")
         assert len(results) >= 1
         assert results[0]["brief"] is not None
 
-    def test_search_no_results(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_search_no_results(self, seeded_db):
         results = db_search.search_tier1("xyznonexistent")
         assert len(results) == 0
 
@@ -86,15 +105,13 @@ class TestSearchTier1:
         results = db_search.search_tier1("anything")
         assert results == []
 
-    def test_search_with_limit(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_search_with_limit(self, seeded_db):
         results = db_search.search_tier1("python", limit=1)
         assert len(results) <= 1
 
 
 class TestSearchTier2:
-    def test_tier2_returns_details(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_tier2_returns_details(self, seeded_db):
         tier1 = db_search.search_tier1("authentication")
         assert len(tier1) >= 1
         ids = [r["id"] for r in tier1]
@@ -109,19 +126,16 @@ class TestSearchTier2:
 
 
 class TestFullSearch:
-    def test_full_search(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_full_search(self, seeded_db):
         results = db_search.full_search("authentication")
         assert results["result_count"] >= 1
         assert results["query"] == "authentication"
 
-    def test_full_search_detailed(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_full_search_detailed(self, seeded_db):
         results = db_search.full_search("authentication", detailed=True)
         assert results["result_count"] >= 1
 
-    def test_full_search_no_results(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_full_search_no_results(self, seeded_db):
         results = db_search.full_search("xyznonexistent")
         assert results["result_count"] == 0
 
@@ -132,14 +146,12 @@ class TestFormatResultsMarkdown:
         md = db_search.format_results_markdown(results)
         assert "No sessions stored yet" in md
 
-    def test_format_empty_results_with_db(self, isolated_db):
-        db_init.init_database()
+    def test_format_empty_results_with_db(self, initialized_db):
         results = {"query": "test", "result_count": 0, "sessions": []}
         md = db_search.format_results_markdown(results)
         assert "No matching sessions found" in md
 
-    def test_format_with_results(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_format_with_results(self, seeded_db):
         results = db_search.full_search("authentication")
         md = db_search.format_results_markdown(results)
         assert "Context Memory Results" in md
@@ -147,50 +159,44 @@ class TestFormatResultsMarkdown:
 
 
 class TestSearchMessages:
-    def test_search_messages(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_search_messages(self, seeded_db):
         results = db_search.search_messages("JWT")
         assert len(results) >= 1
 
-    def test_search_messages_no_results(self, isolated_db):
-        _seed_data(isolated_db)
+    def test_search_messages_no_results(self, seeded_db):
         results = db_search.search_messages("xyznonexistent")
         assert len(results) == 0
 
 
 class TestSearchTier1CodeSnippets:
-    def test_finds_session_via_code_snippet(self, isolated_db):
+    def test_finds_session_via_code_snippet(self, seeded_db_with_snippets):
         """Tier 1 should find sessions matching code snippet content."""
-        _seed_data_with_snippets(isolated_db)
         results = db_search.search_tier1("LoginForm")
         assert len(results) >= 1
         # Should find the session with the React component
         session_ids = [r["session_id"] for r in results]
         assert "search-session-3" in session_ids
 
-    def test_finds_session_via_snippet_description(self, isolated_db):
+    def test_finds_session_via_snippet_description(self, seeded_db_with_snippets):
         """Tier 1 should find sessions matching code snippet description."""
-        _seed_data_with_snippets(isolated_db)
         results = db_search.search_tier1("React component")
         assert len(results) >= 1
 
-    def test_finds_session_via_snippet_file_path(self, isolated_db):
+    def test_finds_session_via_snippet_file_path(self, seeded_db_with_snippets):
         """Tier 1 should find sessions matching code snippet file path terms."""
-        _seed_data_with_snippets(isolated_db)
         # FTS5 tokenizes on punctuation, so search for a path component
         results = db_search.search_tier1("components")
         assert len(results) >= 1
 
 
 class TestSearchTier1Ranking:
-    def test_topic_tag_does_not_outrank_strong_summary(self, isolated_db):
+    def test_topic_tag_does_not_outrank_strong_summary(self, initialized_db):
         """A topic-only match must not outrank a summary match.
 
         Regression test for cross-table BM25 score contamination: topic FTS scores
         lived on a different scale than summary scores, so merging and sorting by
         raw BM25 let topic-only matches outrank strong summary matches.
         """
-        db_init.init_database()
 
         # Session A: matches "authentication" in summary
         sid_a = db_save.save_session("sess-strong-summary", "/tmp/p")
@@ -212,10 +218,9 @@ class TestSearchTier1Ranking:
         assert result_ids.index("sess-strong-summary") < result_ids.index("sess-topic-only"), \
             "Summary match should rank above topic-only match"
 
-    def test_multi_source_match_ranks_higher_than_single(self, isolated_db):
+    def test_multi_source_match_ranks_higher_than_single(self, initialized_db):
         """Sessions matching in summary + topic + snippet should rank above summary-only
         matches when summary scores are similar."""
-        db_init.init_database()
 
         # Session A: matches in summary + topic + snippet
         sid_a = db_save.save_session("sess-multi-source", "/tmp/p")
@@ -239,11 +244,32 @@ class TestSearchTier1Ranking:
         assert result_ids.index("sess-multi-source") < result_ids.index("sess-summary-only"), \
             "3-source match should rank above 1-source match with similar summary score"
 
+    def test_multi_source_match_returned_once(self, initialized_db):
+        """A session matching in several sources is deduplicated to a single result."""
+        sid = db_save.save_session("sess-dedup", "/tmp/p")
+        db_save.save_summary(sid, brief="Tuned redis cache eviction")
+        db_save.save_topics(sid, ["redis"])
+        db_save.save_code_snippet(sid, code="redis.Redis()", language="python", description="redis client")
+
+        results = db_search.search_tier1("redis")
+        assert [r["session_id"] for r in results] == ["sess-dedup"]
+        assert results[0]["match_sources"] == ["summary", "topic", "snippet"]
+        assert results[0]["topics"] == ["redis"]
+
+    def test_per_source_cap_counts_sessions_not_rows(self, initialized_db):
+        """Many matching topics in one session don't use up the per-source cap."""
+        crowded = db_save.save_session("sess-crowded", "/tmp/p")
+        db_save.save_topics(crowded, [f"redis shard {i}" for i in range(2 * db_search.PER_SOURCE_MULTIPLIER + 2)])
+        other = db_save.save_session("sess-other", "/tmp/p")
+        db_save.save_topics(other, ["redis"])
+
+        results = db_search.search_tier1("redis", limit=2)
+        assert sorted(r["session_id"] for r in results) == ["sess-crowded", "sess-other"]
+
 
 class TestSearchTier1ProjectFilter:
-    def test_filters_by_project_path(self, isolated_db):
+    def test_filters_by_project_path(self, initialized_db):
         """Tier 1 should filter results to the specified project."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="proj-a-1",
             project_path="/tmp/project-a",
@@ -264,9 +290,8 @@ class TestSearchTier1ProjectFilter:
 
 
 class TestSearchTier2Flags:
-    def test_include_messages_false(self, isolated_db):
+    def test_include_messages_false(self, seeded_db):
         """Tier 2 with include_messages=False should omit messages key."""
-        _seed_data(isolated_db)
         tier1 = db_search.search_tier1("authentication")
         ids = [r["id"] for r in tier1]
         tier2 = db_search.search_tier2(ids, include_messages=False)
@@ -275,9 +300,8 @@ class TestSearchTier2Flags:
         assert "topics" in tier2[0]
         assert "code_snippets" in tier2[0]
 
-    def test_include_snippets_false(self, isolated_db):
+    def test_include_snippets_false(self, seeded_db):
         """Tier 2 with include_snippets=False should omit code_snippets key."""
-        _seed_data(isolated_db)
         tier1 = db_search.search_tier1("authentication")
         ids = [r["id"] for r in tier1]
         tier2 = db_search.search_tier2(ids, include_snippets=False)
@@ -286,9 +310,8 @@ class TestSearchTier2Flags:
         assert "messages" in tier2[0]
         assert "topics" in tier2[0]
 
-    def test_both_flags_false(self, isolated_db):
+    def test_both_flags_false(self, seeded_db):
         """Tier 2 with both flags False should still return session + summary data."""
-        _seed_data(isolated_db)
         tier1 = db_search.search_tier1("authentication")
         ids = [r["id"] for r in tier1]
         tier2 = db_search.search_tier2(ids, include_messages=False, include_snippets=False)
@@ -299,10 +322,36 @@ class TestSearchTier2Flags:
         assert "topics" in tier2[0]
 
 
+class TestSearchTier2MaxMessages:
+    def test_max_messages_keeps_first_n_per_session(self, initialized_db):
+        """max_messages should window messages per session, in sequence order."""
+        ids = []
+        for sid in ("long-a", "long-b"):
+            result = db_save.save_full_session(
+                session_id=sid,
+                summary={"brief": f"Long session {sid}"},
+                messages=[{"role": "user", "content": f"{sid} msg-{i}"} for i in range(25)],
+            )
+            ids.append(result["session_id"])
+
+        tier2 = db_search.search_tier2(ids, max_messages=3)
+        assert len(tier2) == 2
+        for session in tier2:
+            assert [m["sequence"] for m in session["messages"]] == [0, 1, 2]
+
+    def test_max_messages_none_returns_all(self, initialized_db):
+        result = db_save.save_full_session(
+            session_id="long-all",
+            summary={"brief": "Long session"},
+            messages=[{"role": "user", "content": f"msg-{i}"} for i in range(25)],
+        )
+        tier2 = db_search.search_tier2([result["session_id"]])
+        assert len(tier2[0]["messages"]) == 25
+
+
 class TestSearchTier2MalformedJson:
-    def test_malformed_key_decisions(self, isolated_db):
+    def test_malformed_key_decisions(self, initialized_db):
         """Tier 2 should handle malformed JSON in key_decisions gracefully."""
-        db_init.init_database()
         session_db_id = db_save.save_session("malformed-session", "/tmp/test")
         # Insert a summary with malformed JSON directly
         with db_utils.get_connection() as conn:
@@ -320,17 +369,15 @@ class TestSearchTier2MalformedJson:
         # Valid JSON should be parsed
         assert tier2[0]["technologies"] == ["valid"]
 
-    def test_nonexistent_session_ids(self, isolated_db):
+    def test_nonexistent_session_ids(self, initialized_db):
         """Tier 2 with IDs that don't exist should return empty list."""
-        db_init.init_database()
         result = db_search.search_tier2([9999, 8888])
         assert result == []
 
 
 class TestFormatResultsMarkdownDetailed:
-    def test_detailed_with_messages_and_snippets(self, isolated_db):
+    def test_detailed_with_messages_and_snippets(self, seeded_db_with_snippets):
         """format_results_markdown(detailed=True) should include expandable content."""
-        _seed_data_with_snippets(isolated_db)
         results = db_search.full_search("React login", detailed=True)
         md = db_search.format_results_markdown(results, detailed=True)
 
@@ -343,18 +390,16 @@ class TestFormatResultsMarkdownDetailed:
         assert "LoginForm" in md
         assert "</details>" in md
 
-    def test_detailed_with_decisions(self, isolated_db):
+    def test_detailed_with_decisions(self, seeded_db_with_snippets):
         """Detailed mode should render key decisions."""
-        _seed_data_with_snippets(isolated_db)
         results = db_search.full_search("React login", detailed=True)
         md = db_search.format_results_markdown(results, detailed=True)
 
         assert "**Decisions**:" in md
         assert "- Use controlled components" in md
 
-    def test_detailed_without_content_no_details_block(self, isolated_db):
+    def test_detailed_without_content_no_details_block(self, initialized_db):
         """Detailed mode with no detailed/messages/snippets should not add details block."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="bare-session",
             project_path="/tmp/bare",
@@ -366,9 +411,8 @@ class TestFormatResultsMarkdownDetailed:
         assert "Bare session" in md
         assert "<details>" not in md
 
-    def test_technologies_as_json_string(self, isolated_db):
+    def test_technologies_as_json_string(self, initialized_db):
         """Technologies stored as a JSON string should be parsed for display."""
-        db_init.init_database()
         session_db_id = db_save.save_session("tech-session", "/tmp/test")
         with db_utils.get_connection() as conn:
             conn.execute("""
@@ -383,9 +427,8 @@ class TestFormatResultsMarkdownDetailed:
         assert "python" in md
         assert "rust" in md
 
-    def test_date_formatting(self, isolated_db):
+    def test_date_formatting(self, seeded_db):
         """Dates with T separator should be displayed as date only."""
-        _seed_data(isolated_db)
         results = db_search.full_search("authentication")
         md = db_search.format_results_markdown(results)
 
@@ -394,9 +437,8 @@ class TestFormatResultsMarkdownDetailed:
             if line.startswith("## "):
                 assert "T" not in line.split("|")[0]
 
-    def test_project_name_from_path(self, isolated_db):
+    def test_project_name_from_path(self, seeded_db):
         """Project path should be shortened to just the directory name."""
-        _seed_data(isolated_db)
         results = db_search.full_search("authentication")
         md = db_search.format_results_markdown(results)
 
@@ -405,3 +447,28 @@ class TestFormatResultsMarkdownDetailed:
         for line in md.split("\n"):
             if line.startswith("## "):
                 assert "/tmp/webapp" not in line
+
+
+class TestSearchQueryPlans:
+    """Every search reaches content through an FTS5 index, never a base-table scan."""
+
+    # CTEs of the tier-1 query, scanned as intermediate results
+    _TIER1_CTES = {"summary_hits", "topic_hits", "snippet_hits", "hits", "m"}
+
+    @staticmethod
+    def _scans(sql, params):
+        with db_utils.get_connection(readonly=True) as conn:
+            details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        return {d.split()[1] for d in details if d.startswith("SCAN ") and "VIRTUAL TABLE" not in d}
+
+    @pytest.mark.parametrize("with_project", [False, True])
+    def test_tier1(self, initialized_db, with_project):
+        sql = db_search._TIER1_SQL_WITH_PROJECT if with_project else db_search._TIER1_SQL
+        source_params = ["auth", "hash", 10] if with_project else ["auth", 10]
+        assert self._scans(sql, source_params * 3 + [0.3, 10]) <= self._TIER1_CTES
+
+    @pytest.mark.parametrize("with_project", [False, True])
+    def test_messages(self, initialized_db, with_project):
+        sql = db_search._MESSAGES_SQL_WITH_PROJECT if with_project else db_search._MESSAGES_SQL
+        params = ["auth", "hash", 10] if with_project else ["auth", 10]
+        assert self._scans(sql, params) == set()
@@ -1,8 +1,15 @@
 """Tests for database utilities."""
 
+import os
+import sqlite3
 from unittest.mock import patch
 
+import db_init
+import db_save
 import db_utils
+import pytest
+
+from tests.helpers import force_init_in_subprocess
 
 
 class TestHashProjectPath:
@@ -38,6 +45,22 @@ class TestHashProjectPath:
             h2 = db_utils.hash_project_path("C:\\Users\\dev\\project")
         assert h1 == h2
 
+    def test_repeated_calls_are_cached(self):
+        db_utils._hash_project_path_cached.cache_clear()
+        h1 = db_utils.hash_project_path("/tmp/cached-project")
+        h2 = db_utils.hash_project_path("/tmp/cached-project")
+        assert h1 == h2
+        assert db_utils._hash_project_path_cached.cache_info().hits == 1
+
+    def test_relative_path_cache_respects_cwd(self, tmp_path, monkeypatch):
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        monkeypatch.chdir(tmp_path / "a")
+        h1 = db_utils.hash_project_path("proj")
+        monkeypatch.chdir(tmp_path / "b")
+        h2 = db_utils.hash_project_path("proj")
+        assert h1 != h2
+
     def test_trailing_slash_normalized(self):
         """Trailing slashes should be normalized away."""
         h1 = db_utils.hash_project_path("/tmp/myproject/")
@@ -46,7 +69,6 @@ class TestHashProjectPath:
 
     def test_tilde_expanded(self):
         """Tilde (~) should be expanded to home directory before hashing."""
-        import os
         home = os.path.expanduser("~")
         h1 = db_utils.hash_project_path("~/myproject")
         h2 = db_utils.hash_project_path(os.path.join(home, "myproject"))
@@ -134,6 +156,11 @@ class TestTruncateText:
         text = "a" * 500
         assert db_utils.truncate_text(text, 500) == text
 
+    def test_tiny_max_length_never_exceeds_limit(self):
+        assert db_utils.truncate_text("abcdef", 2) == "ab"
+        assert db_utils.truncate_text("abcdef", 0) == ""
+        assert db_utils.truncate_text("abcdef", -5) == ""
+
 
 class TestGetDbPath:
     def test_returns_path(self):
@@ -174,6 +201,20 @@ class TestGetConnection:
             cursor = conn.execute("SELECT COUNT(*) FROM test")
             assert cursor.fetchone()[0] == 0
 
+    def test_readonly_connection_path_with_uri_characters(self, db_dir, monkeypatch):
+        """'?', '#' and '%' in the path must not be parsed as URI syntax."""
+        db_path = db_dir / "odd?name#1%20" / "context.db"
+        monkeypatch.setattr(db_utils, "DB_DIR", db_path.parent)
+        monkeypatch.setattr(db_utils, "DB_PATH", db_path)
+        with db_utils.get_connection() as conn:
+            conn.execute("CREATE TABLE test (id INTEGER)")
+            conn.commit()
+        with db_utils.get_connection(readonly=True) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM test").fetchone()[0] == 0
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO test VALUES (1)")
+        assert sorted(p.name for p in db_dir.iterdir()) == ["odd?name#1%20"]
+
     def test_wal_mode_enabled(self, isolated_db):
         """Connection should use WAL journal mode."""
         with db_utils.get_connection() as conn:
@@ -187,6 +228,7 @@ class TestGetConnection:
             cursor = conn.execute("PRAGMA foreign_keys")
             assert cursor.fetchone()[0] == 1
 
+    @pytest.mark.durable_sync
     def test_synchronous_normal(self, isolated_db):
         """Connection should use NORMAL synchronous mode (1)."""
         with db_utils.get_connection() as conn:
@@ -194,6 +236,12 @@ class TestGetConnection:
             # NORMAL = 1
             assert cursor.fetchone()[0] == 1
 
+    def test_test_databases_skip_full_sync(self, isolated_db, ram_root):
+        """Test databases sync at most at WAL checkpoints (NORMAL on tmpfs, OFF on disk)."""
+        with db_utils.get_connection() as conn:
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        assert synchronous == (1 if ram_root is not None else 0)
+
     def test_temp_store_memory(self, isolated_db):
         """Connection should use MEMORY temp store (2)."""
         with db_utils.get_connection() as conn:
@@ -201,13 +249,107 @@ class TestGetConnection:
             # MEMORY = 2
             assert cursor.fetchone()[0] == 2
 
+    def test_busy_timeout_set(self, isolated_db):
+        """Writers should wait for locks instead of failing immediately."""
+        with db_utils.get_connection() as conn:
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    def test_wal_survives_force_reinit(self, isolated_db):
+        """Recreating the database file must switch the new file to WAL too."""
+        db_init.init_database()
+        db_init.init_database(force=True)
+        with db_utils.get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
     def test_row_factory_set(self, isolated_db):
         """Connection should use sqlite3.Row factory for dict-like access."""
-        import sqlite3
         with db_utils.get_connection() as conn:
             assert conn.row_factory is sqlite3.Row
 
 
+class TestConnectionPool:
+    def test_sequential_calls_reuse_connection(self, isolated_db):
+        with db_utils.get_connection() as first:
+            pass
+        with db_utils.get_connection() as second:
+            assert second is first
+
+    def test_readonly_and_readwrite_pooled_separately(self, isolated_db):
+        with db_utils.get_connection() as rw:
+            rw.execute("CREATE TABLE t (id INTEGER)")
+            rw.commit()
+        with db_utils.get_connection(readonly=True) as ro:
+            assert ro is not rw
+
+    def test_nested_call_gets_own_connection(self, isolated_db):
+        with db_utils.get_connection() as outer:
+            with db_utils.get_connection() as inner:
+                assert inner is not outer
+
+    def test_uncommitted_work_rolled_back_on_exit(self, isolated_db):
+        with db_utils.get_connection() as conn:
+            conn.execute("CREATE TABLE t (id INTEGER)")
+            conn.commit()
+            conn.execute("INSERT INTO t VALUES (1)")
+        with db_utils.get_connection() as conn:
+            assert not conn.in_transaction
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+    def test_pooled_connection_sees_other_writers(self, isolated_db):
+        with db_utils.get_connection() as conn:
+            conn.execute("CREATE TABLE t (id INTEGER)")
+            conn.commit()
+            conn.execute("SELECT * FROM t").fetchall()
+        other = sqlite3.connect(str(isolated_db))
+        other.execute("INSERT INTO t VALUES (1)")
+        other.commit()
+        other.close()
+        with db_utils.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+    def test_error_closes_connection(self, isolated_db):
+        with pytest.raises(RuntimeError):
+            with db_utils.get_connection() as failed:
+                raise RuntimeError("boom")
+        with pytest.raises(sqlite3.ProgrammingError):
+            failed.execute("SELECT 1")
+        with db_utils.get_connection() as conn:
+            assert conn is not failed
+
+    def test_reset_discards_pooled_connections(self, isolated_db):
+        with db_utils.get_connection() as old:
+            pass
+        db_utils.reset_connection_state()
+        with db_utils.get_connection() as new:
+            assert new is not old
+
+    def test_database_replaced_by_other_process(self, isolated_db):
+        """A pooled connection is not reused once another process recreates the file."""
+        db_save.save_full_session(session_id="before", summary={"brief": "Old file"})
+        with db_utils.get_connection() as old:
+            pass
+
+        force_init_in_subprocess(isolated_db)
+        db_save.save_full_session(session_id="after", summary={"brief": "New file"})
+
+        with db_utils.get_connection() as conn:
+            assert conn is not old
+            assert [row[0] for row in conn.execute("SELECT session_id FROM sessions")] == ["after"]
+
+    def test_deleted_database_not_written_through_pool(self, isolated_db):
+        with db_utils.get_connection() as conn:
+            conn.execute("CREATE TABLE t (id INTEGER)")
+            conn.commit()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(f"{isolated_db}{suffix}"):
+                os.remove(f"{isolated_db}{suffix}")
+
+        with db_utils.get_connection() as conn:
+            assert isolated_db.exists()
+            with pytest.raises(sqlite3.OperationalError, match="no such table"):
+                conn.execute("INSERT INTO t VALUES (1)")
+
+
 class TestDbExists:
     def test_no_db(self, isolated_db):
         assert db_utils.db_exists() is False
@@ -217,6 +359,42 @@ class TestDbExists:
             conn.execute("SELECT 1")
         assert db_utils.db_exists() is True
 
+    def test_external_deletion_noticed(self, isolated_db):
+        """A file removed behind our back (e.g. by another process) is not reported as existing."""
+        with db_utils.get_connection() as conn:
+            conn.execute("SELECT 1")
+        assert db_utils.db_exists() is True
+        isolated_db.unlink()
+        assert db_utils.db_exists() is False
+
+
+class TestDbFileFingerprint:
+    def test_changes_on_write(self, initialized_db):
+        before = db_utils.db_file_fingerprint()
+        db_save.save_session("fp-1")
+        assert db_utils.db_file_fingerprint() != before
+
+    def test_same_size_rewrite_in_same_tick_detected(self, initialized_db):
+        """A restarted WAL rewritten to the same size, with the file times unchanged."""
+        conn = sqlite3.connect(str(initialized_db), isolation_level=None)
+        try:
+            conn.execute("PRAGMA wal_autocheckpoint=0")
+            conn.execute("INSERT INTO checkpoint_counters VALUES ('fp', 1)")
+            conn.execute("PRAGMA wal_checkpoint(RESTART)")
+            conn.execute("UPDATE checkpoint_counters SET last_checkpoint_number = 2")
+            before = db_utils.db_file_fingerprint()
+            times = {path: os.stat(path).st_mtime_ns for path in (str(initialized_db), f"{initialized_db}-wal")}
+            conn.execute("PRAGMA wal_checkpoint(RESTART)")
+            conn.execute("UPDATE checkpoint_counters SET last_checkpoint_number = 3")
+            for path, mtime in times.items():
+                os.utime(path, ns=(mtime, mtime))
+            after = db_utils.db_file_fingerprint()
+        finally:
+            conn.close()
+        # The file stats alone can't tell the two states apart
+        assert after[1:3] == before[1:3]
+        assert after != before
+
 
 class TestNormalizeProjectPath:
     def test_backslash_to_forward(self):
@@ -245,33 +423,73 @@ class TestValidTables:
         assert "code_snippets" in db_utils.VALID_TABLES
 
     def test_get_table_count_validates(self):
-        import pytest
         with pytest.raises(ValueError):
             db_utils.get_table_count("nonexistent_table")
 
-    def test_get_table_count_returns_row_count(self, isolated_db):
+    def test_get_table_count_returns_row_count(self, initialized_db):
         """get_table_count should return actual row count for a populated table."""
-        import db_init
-        import db_save
-        db_init.init_database()
         db_save.save_session("count-test-1")
         db_save.save_session("count-test-2")
         assert db_utils.get_table_count("sessions") == 2
 
-    def test_get_table_count_empty_table(self, isolated_db):
+    def test_get_table_count_empty_table(self, initialized_db):
         """get_table_count should return 0 for an empty table."""
-        import db_init
-        db_init.init_database()
         assert db_utils.get_table_count("sessions") == 0
 
     def test_get_table_count_no_db(self, isolated_db):
         """get_table_count should return 0 when no database exists."""
         assert db_utils.get_table_count("sessions") == 0
 
-    def test_get_session_count(self, isolated_db):
+    def test_get_session_count(self, initialized_db):
         """get_session_count should delegate to get_table_count('sessions')."""
-        import db_init
-        import db_save
-        db_init.init_database()
         db_save.save_session("session-count-1")
         assert db_utils.get_session_count() == 1
+
+
+class TestJsonHelpers:
+    def test_roundtrip(self):
+        payload = [{"role": "user", "content": "caf\u00e9 \u2014 ok"}]
+        assert db_utils.json_loads(db_utils.json_dumps(payload)) == payload
+
+    def test_roundtrip_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(db_utils, "orjson", None)
+        payload = {"a": [1, 2, "x"]}
+        assert db_utils.json_dumps(payload) == '{"a":[1,2,"x"]}'
+        assert db_utils.json_loads(b'{"a": [1, 2, "x"]}') == payload
+
+    def test_loads_malformed_raises_value_error(self):
+        with pytest.raises(ValueError):
+            db_utils.json_loads("not json")
+
+    def test_dumps_lone_surrogate_falls_back_to_escape(self):
+        text = db_utils.json_dumps(["\ud800"])
+        assert text == '["\\ud800"]'
+        text.encode("utf-8")  # storable in SQLite TEXT
+
+
+class TestBlobCompression:
+    def test_zlib_round_trip_without_zstandard(self, monkeypatch):
+        monkeypatch.setattr(db_utils, "zstandard", None)
+        data = b'[{"role":"user","content":"' + b"x" * 4000 + b'"}]'
+        blob, codec = db_utils.compress_blob(data)
+        assert codec == db_utils.CODEC_ZLIB
+        assert len(blob) < len(data)
+        assert db_utils.decompress_blob(blob, codec) == data
+
+    def test_zstd_round_trip(self):
+        pytest.importorskip("zstandard")
+        blob, codec = db_utils.compress_blob(b"abc" * 1000)
+        assert codec == db_utils.CODEC_ZSTD
+        assert db_utils.decompress_blob(blob, codec) == b"abc" * 1000
+
+    def test_plain_blob_passed_through(self):
+        assert db_utils.decompress_blob('[{"a": 1}]', db_utils.CODEC_NONE) == '[{"a": 1}]'
+
+    def test_undecodable_blobs_raise_value_error(self, monkeypatch):
+        with pytest.raises(ValueError):
+            db_utils.decompress_blob(b"not zlib", db_utils.CODEC_ZLIB)
+        with pytest.raises(ValueError):
+            db_utils.decompress_blob(b"", 99)
+        monkeypatch.setattr(db_utils, "zstandard", None)
+        with pytest.raises(ValueError):
+            db_utils.decompress_blob(b"\x28\xb5\x2f\xfd", db_utils.CODEC_ZSTD)
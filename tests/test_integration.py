@@ -20,8 +20,7 @@ SCRIPTS_DIR = os.path.join(
 class TestSaveSearchFlow:
     """End-to-end: save sessions then search and verify results."""
 
-    def test_save_then_search(self, isolated_db):
-        db_init.init_database()
+    def test_save_then_search(self, initialized_db):
         db_save.save_full_session(
             session_id="integration-1",
             project_path="/tmp/myproject",
@@ -38,8 +37,7 @@ class TestSaveSearchFlow:
                     "authentication" in [t.lower() for t in r.get("topics", [])]
                     for r in results)
 
-    def test_detailed_search_returns_messages(self, isolated_db):
-        db_init.init_database()
+    def test_detailed_search_returns_messages(self, initialized_db):
         db_save.save_full_session(
             session_id="integration-2",
             project_path="/tmp/myproject",
@@ -55,8 +53,7 @@ class TestSaveSearchFlow:
         assert "messages" in session
         assert len(session["messages"]) == 2
 
-    def test_project_scoped_isolation(self, isolated_db):
-        db_init.init_database()
+    def test_project_scoped_isolation(self, initialized_db):
         db_save.save_full_session(
             session_id="proj-a-1",
             project_path="/tmp/project-a",
@@ -76,8 +73,7 @@ class TestSaveSearchFlow:
         assert len(results_b) == 1
         assert results_b[0]["session_id"] == "proj-b-1"
 
-    def test_full_pipeline_to_markdown(self, isolated_db):
-        db_init.init_database()
+    def test_full_pipeline_to_markdown(self, initialized_db):
         db_save.save_full_session(
             session_id="markdown-1",
             project_path="/tmp/proj",
@@ -108,13 +104,8 @@ class TestCLIEntryPoints:
         assert result.returncode == 0
         assert "initialized" in result.stdout.lower() or "exists" in result.stdout.lower()
 
-    def test_db_save_cli(self, isolated_db):
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        # Init first
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+    def test_db_save_cli(self, initialized_db):
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         result = subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_save.py"),
              "--session-id", "cli-test-1",
@@ -127,14 +118,10 @@ class TestCLIEntryPoints:
         output = json.loads(result.stdout)
         assert "session_id" in output
 
-    def test_db_save_json_standalone(self, isolated_db):
+    def test_db_save_json_standalone(self, initialized_db):
         """--json should work without --session-id (session_id comes from JSON)."""
         import tempfile
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         payload = {
             "session_id": "json-standalone-1",
             "project_path": "/tmp/json-project",
@@ -175,13 +162,9 @@ class TestCLIEntryPoints:
         finally:
             os.unlink(json_path)
 
-    def test_db_save_auto_mode(self, isolated_db):
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        # Init and save a rich session first
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+    def test_db_save_auto_mode(self, initialized_db):
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
+        # Save a rich session first
         subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_save.py"),
              "--session-id", "rich-1",
@@ -202,13 +185,8 @@ class TestCLIEntryPoints:
         output = json.loads(result.stdout)
         assert output.get("skipped") is True
 
-    def test_db_search_cli(self, isolated_db):
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        # Init and save
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+    def test_db_search_cli(self, initialized_db):
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_save.py"),
              "--session-id", "search-1",
@@ -225,12 +203,8 @@ class TestCLIEntryPoints:
         output = json.loads(result.stdout)
         assert output["result_count"] >= 1
 
-    def test_db_prune_dry_run_cli(self, isolated_db):
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+    def test_db_prune_dry_run_cli(self, initialized_db):
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_save.py"),
              "--session-id", "prune-1", "--brief", "Session to prune"],
@@ -249,14 +223,9 @@ class TestCLIEntryPoints:
 class TestCLIEntryPointsExtended:
     """Additional CLI tests for --verify, --stats, markdown output, and actual prune."""
 
-    def test_db_init_verify_cli(self, isolated_db):
+    def test_db_init_verify_cli(self, initialized_db):
         """db_init.py --verify should report schema validity."""
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        # Init first
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         result = subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py"), "--verify"],
             capture_output=True, text=True, env=env,
@@ -273,13 +242,9 @@ class TestCLIEntryPointsExtended:
         )
         assert result.returncode != 0
 
-    def test_db_init_stats_cli(self, isolated_db):
+    def test_db_init_stats_cli(self, initialized_db):
         """db_init.py --stats should show table counts."""
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         # Save a session so there's data
         subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_save.py"),
@@ -303,13 +268,9 @@ class TestCLIEntryPointsExtended:
         )
         assert result.returncode != 0
 
-    def test_db_search_markdown_cli(self, isolated_db):
+    def test_db_search_markdown_cli(self, initialized_db):
         """db_search.py should output markdown by default."""
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         subprocess.run(
             [sys.executable, os.path.join(SCRIPTS_DIR, "db_save.py"),
              "--session-id", "md-1", "--brief", "Markdown output test",
@@ -324,13 +285,9 @@ class TestCLIEntryPointsExtended:
         assert result.returncode == 0
         assert "# Context Memory Results" in result.stdout
 
-    def test_db_prune_actual_prune_cli(self, isolated_db):
+    def test_db_prune_actual_prune_cli(self, initialized_db):
         """db_prune.py without --dry-run should actually delete sessions."""
-        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(isolated_db)}
-        subprocess.run(
-            [sys.executable, os.path.join(SCRIPTS_DIR, "db_init.py")],
-            capture_output=True, text=True, env=env,
-        )
+        env = {**os.environ, "CONTEXT_MEMORY_DB_PATH": str(initialized_db)}
         # Create 3 sessions
         for i in range(3):
             subprocess.run(
@@ -347,9 +304,8 @@ class TestCLIEntryPointsExtended:
         output = json.loads(result.stdout)
         assert output["pruned"] == 2
 
-    def test_code_snippets_end_to_end(self, isolated_db):
+    def test_code_snippets_end_to_end(self, initialized_db):
         """Save a session with code snippets and find it via search."""
-        db_init.init_database()
         db_save.save_full_session(
             session_id="snippet-e2e-1",
             project_path="/tmp/snippet-project",
@@ -382,8 +338,7 @@ class TestCLIEntryPointsExtended:
 
 
 class TestDeduplicationIntegration:
-    def test_rich_session_prevents_auto_save(self, isolated_db):
-        db_init.init_database()
+    def test_rich_session_prevents_auto_save(self, initialized_db):
         db_save.save_full_session(
             session_id="rich-1",
             project_path="/tmp/dedup-proj",
@@ -392,8 +347,7 @@ class TestDeduplicationIntegration:
         )
         assert db_save.should_skip_auto_save("/tmp/dedup-proj") is True
 
-    def test_auto_save_proceeds_with_only_auto_saves(self, isolated_db):
-        db_init.init_database()
+    def test_auto_save_proceeds_with_only_auto_saves(self, initialized_db):
         db_save.save_full_session(
             session_id="auto-1",
             project_path="/tmp/dedup-proj",
@@ -403,8 +357,7 @@ class TestDeduplicationIntegration:
 
 
 class TestPruningIntegration:
-    def test_prune_then_search_finds_only_remaining(self, isolated_db):
-        db_init.init_database()
+    def test_prune_then_search_finds_only_remaining(self, initialized_db):
         db_save.save_full_session(
             session_id="keep-1",
             project_path="/tmp/proj",
@@ -424,8 +377,7 @@ class TestPruningIntegration:
         results = db_search.search_tier1("critical")
         assert len(results) >= 1
 
-    def test_fts_cleaned_after_prune_integration(self, isolated_db):
-        db_init.init_database()
+    def test_fts_cleaned_after_prune_integration(self, initialized_db):
         # Create sessions with unique keywords
         db_save.save_full_session(
             session_id="unique-alpha",
@@ -461,8 +413,7 @@ class TestErrorHandling:
         assert results["result_count"] == 0
         assert results["sessions"] == []
 
-    def test_unicode_content(self, isolated_db):
-        db_init.init_database()
+    def test_unicode_content(self, initialized_db):
         db_save.save_full_session(
             session_id="unicode-1",
             project_path="/tmp/proj",
@@ -476,8 +427,7 @@ class TestErrorHandling:
         results = db_search.search_tier1("internationalization")
         assert len(results) >= 1
 
-    def test_long_content(self, isolated_db):
-        db_init.init_database()
+    def test_long_content(self, initialized_db):
         long_text = "x" * 10000
         db_save.save_full_session(
             session_id="long-1",
@@ -488,14 +438,8 @@ class TestErrorHandling:
         results = db_search.search_tier1("long content")
         assert len(results) >= 1
 
-    def test_legacy_db_migration_on_save(self, isolated_db):
+    def test_legacy_db_migration_on_save(self, legacy_db):
         """Saving to a legacy DB (no schema_version) triggers auto-migration."""
-        # Create legacy DB
-        with db_utils.get_connection() as conn:
-            legacy_sql = db_init.SCHEMA_SQL.split("-- Schema versioning")[0]
-            conn.executescript(legacy_sql)
-            conn.commit()
-
         # Save should trigger migration
         db_save.save_full_session(
             session_id="legacy-1",
@@ -7,16 +7,14 @@ import pytest
 pytest.importorskip("mcp", reason="mcp package not installed")
 
 import mcp_server  # noqa: E402
-from db_init import init_database  # noqa: E402
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _init_and_seed(summary_brief="Fixed auth bug", topics=None, user_note=None):
-    """Initialize DB and save a sample session, returning the result dict."""
-    init_database()
+def _seed(summary_brief="Fixed auth bug", topics=None, user_note=None):
+    """Save a sample session (on an initialized database), returning the result dict."""
     return mcp_server.context_save(
         session_id="test-session-1",
         project_path="/tmp/test-project",
@@ -30,6 +28,17 @@ def _init_and_seed(summary_brief="Fixed auth bug", topics=None, user_note=None):
     )
 
 
+@pytest.fixture(scope="module")
+def _seeded_template(seeded_template):
+    return seeded_template(_seed)
+
+
+@pytest.fixture
+def seeded_db(load_template, _seeded_template):
+    """This test's database, holding the _seed() session (built once per module)."""
+    return load_template(_seeded_template)
+
+
 # ---------------------------------------------------------------------------
 # TestContextInit
 # ---------------------------------------------------------------------------
@@ -56,25 +65,24 @@ class TestContextInit:
 # ---------------------------------------------------------------------------
 
 class TestContextSave:
-    def test_save_returns_session_id(self):
-        result = _init_and_seed()
+    def test_save_returns_session_id(self, initialized_db):
+        result = _seed()
         assert "session_id" in result
         assert isinstance(result["session_id"], int)
 
-    def test_save_includes_summary(self):
-        result = _init_and_seed()
+    def test_save_includes_summary(self, initialized_db):
+        result = _seed()
         assert "summary_id" in result
 
-    def test_save_counts_messages(self):
-        result = _init_and_seed()
+    def test_save_counts_messages(self, initialized_db):
+        result = _seed()
         assert result.get("messages_count") == 2
 
-    def test_save_counts_topics(self):
-        result = _init_and_seed()
+    def test_save_counts_topics(self, initialized_db):
+        result = _seed()
         assert result.get("topics_count") == 2
 
-    def test_save_with_code_snippets(self):
-        init_database()
+    def test_save_with_code_snippets(self, initialized_db):
         result = mcp_server.context_save(
             session_id="snippet-session",
             code_snippets=[{"code": "print('hi')", "language": "python", "description": "greeting"}],
@@ -82,8 +90,7 @@ class TestContextSave:
         assert "snippets" in result
         assert len(result["snippets"]) == 1
 
-    def test_save_with_user_note_only(self):
-        init_database()
+    def test_save_with_user_note_only(self, initialized_db):
         result = mcp_server.context_save(
             session_id="note-session",
             user_note="Remember: use JWT for auth",
@@ -96,33 +103,27 @@ class TestContextSave:
 # ---------------------------------------------------------------------------
 
 class TestContextSearch:
-    def test_search_empty_db(self):
-        init_database()
+    def test_search_empty_db(self, initialized_db):
         result = mcp_server.context_search(query="anything")
         assert result["result_count"] == 0
 
-    def test_search_finds_saved_session(self):
-        _init_and_seed()
+    def test_search_finds_saved_session(self, seeded_db):
         result = mcp_server.context_search(query="auth")
         assert result["result_count"] >= 1
 
-    def test_search_respects_limit(self):
-        _init_and_seed()
+    def test_search_respects_limit(self, seeded_db):
         result = mcp_server.context_search(query="auth", limit=1)
         assert len(result["sessions"]) <= 1
 
-    def test_search_project_filter(self):
-        _init_and_seed()
+    def test_search_project_filter(self, seeded_db):
         result = mcp_server.context_search(query="auth", project_path="/tmp/test-project")
         assert result["result_count"] >= 1
 
-    def test_search_project_filter_excludes(self):
-        _init_and_seed()
+    def test_search_project_filter_excludes(self, seeded_db):
         result = mcp_server.context_search(query="auth", project_path="/tmp/other-project")
         assert result["result_count"] == 0
 
-    def test_search_detailed(self):
-        _init_and_seed()
+    def test_search_detailed(self, seeded_db):
         result = mcp_server.context_search(query="auth", detailed=True)
         assert result["result_count"] >= 1
 
@@ -136,13 +137,45 @@ class TestContextStats:
         result = mcp_server.context_stats()
         assert result == {}
 
-    def test_stats_after_save(self):
-        _init_and_seed()
+    def test_stats_after_save(self, seeded_db):
         result = mcp_server.context_stats()
         assert result.get("sessions", 0) >= 1
         assert "db_size_bytes" in result
 
 
+# ---------------------------------------------------------------------------
+# TestResultCaches
+# ---------------------------------------------------------------------------
+
+class TestResultCaches:
+    def test_repeat_search_served_from_cache(self, seeded_db, monkeypatch):
+        first = mcp_server.context_search(query="auth")
+        monkeypatch.setattr(mcp_server, "full_search", lambda **kw: pytest.fail("cache miss"))
+        assert mcp_server.context_search(query="auth") is first
+
+    def test_save_invalidates_search_cache(self, seeded_db):
+        assert mcp_server.context_search(query="kubernetes")["result_count"] == 0
+        mcp_server.context_save(session_id="k8s-1", summary={"brief": "Kubernetes rollout"})
+        assert mcp_server.context_search(query="kubernetes")["result_count"] == 1
+
+    def test_expired_entry_refetched(self, seeded_db, monkeypatch):
+        first = mcp_server.context_search(query="auth")
+        monkeypatch.setattr(mcp_server, "SEARCH_CACHE_TTL", 0.0)
+        assert mcp_server.context_search(query="auth") is not first
+
+    def test_search_cache_bounded(self, initialized_db, monkeypatch):
+        monkeypatch.setattr(mcp_server, "SEARCH_CACHE_SIZE", 2)
+        for q in ("a", "b", "c"):
+            mcp_server.context_search(query=q)
+        assert len(mcp_server._search_cache) == 2
+
+    def test_stats_cached_until_write(self, seeded_db):
+        first = mcp_server.context_stats()
+        assert mcp_server.context_stats() is first
+        mcp_server.context_save(session_id="another", summary={"brief": "More work"})
+        assert mcp_server.context_stats()["sessions"] == first["sessions"] + 1
+
+
 # ---------------------------------------------------------------------------
 # TestMCPServerRegistration
 # ---------------------------------------------------------------------------
@@ -182,9 +215,8 @@ class TestCaptureStdout:
 
 
 class TestContextSaveWithMetadata:
-    def test_metadata_passed_through(self):
+    def test_metadata_passed_through(self, initialized_db):
         """context_save should forward metadata to save_full_session."""
-        init_database()
         result = mcp_server.context_save(
             session_id="meta-mcp-1",
             metadata={"source": "mcp", "custom": True},
@@ -201,6 +233,101 @@ class TestContextSaveWithMetadata:
         assert meta["custom"] is True
 
 
+class TestPortInUse:
+    def test_listening_port_reported_in_use(self):
+        import socket
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            assert mcp_server._port_in_use(listener.getsockname()[1]) is True
+
+    def test_free_port_reported_free(self):
+        import socket
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        assert mcp_server._port_in_use(port) is False
+
+    def test_time_wait_port_reported_free(self):
+        """A port only held in TIME_WAIT (as after stopping the dashboard) can be reused."""
+        import socket
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            port = listener.getsockname()[1]
+            client = socket.create_connection(("127.0.0.1", port))
+            served, _ = listener.accept()
+            # The side that closes first enters TIME_WAIT on the listening port
+            served.close()
+            client.close()
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            with pytest.raises(OSError):
+                probe.bind(("127.0.0.1", port))
+        assert mcp_server._port_in_use(port) is False
+
+
+class _FakePopen:
+    """Stands in for the dashboard child process."""
+
+    def __init__(self, args, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        self.pid = 4242
+        self.returncode = None
+        self.terminated = False
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.terminated = True
+        self.returncode = -15
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+class TestContextDashboard:
+    @pytest.fixture(autouse=True)
+    def _fake_process(self, monkeypatch):
+        launched = []
+        monkeypatch.setattr(mcp_server, "_dashboard_proc", None)
+        monkeypatch.setattr(mcp_server, "_port_in_use", lambda port: False)
+        monkeypatch.setattr(mcp_server.importlib.util, "find_spec", lambda name: object())
+        monkeypatch.setattr(
+            mcp_server.subprocess, "Popen", lambda args, **kw: launched.append(_FakePopen(args, **kw)) or launched[-1]
+        )
+        self.launched = launched
+
+    def test_starts_detached_subprocess(self):
+        result = mcp_server.context_dashboard(port=5222)
+        assert result["status"] == "started"
+        assert result["pid"] == 4242
+        proc = self.launched[0]
+        assert proc.args[1].endswith("dashboard.py")
+        assert proc.args[-2:] == ["--port", "5222"]
+        # stdio is the MCP transport; the child must not inherit it
+        assert proc.kwargs["stdin"] == proc.kwargs["stdout"] == mcp_server.subprocess.DEVNULL
+
+    def test_second_launch_reports_running(self):
+        mcp_server.context_dashboard(port=5222)
+        result = mcp_server.context_dashboard(port=5333)
+        assert result == {"url": "http://127.0.0.1:5222", "status": "already_running"}
+        assert len(self.launched) == 1
+
+    def test_missing_flask_reported(self, monkeypatch):
+        monkeypatch.setattr(mcp_server.importlib.util, "find_spec", lambda name: None)
+        result = mcp_server.context_dashboard(port=5222)
+        assert result["status"] == "import_error"
+        assert self.launched == []
+
+    def test_stop(self):
+        assert mcp_server.context_dashboard_stop() == {"status": "not_running"}
+        mcp_server.context_dashboard(port=5222)
+        assert mcp_server.context_dashboard_stop() == {"status": "stopped"}
+        assert self.launched[0].terminated is True
+        assert mcp_server.context_dashboard(port=5222)["status"] == "started"
+
+
 class TestMCPServerRegistration:
     """Verify the FastMCP instance is configured correctly."""
 
@@ -211,3 +338,4 @@ class TestMCPServerRegistration:
         tools = mcp_server.mcp._tool_manager._tools
         names = set(tools.keys())
         assert {"context_search", "context_save", "context_stats", "context_init"} <= names
+        assert {"context_dashboard", "context_dashboard_stop"} <= names
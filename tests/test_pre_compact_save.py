@@ -2,6 +2,7 @@
 
 import json
 import os
+import re
 import sqlite3
 import subprocess
 import sys
@@ -14,13 +15,15 @@ SCRIPTS_DIR = os.path.join(
 )
 PRE_COMPACT_SCRIPT = os.path.join(SCRIPTS_DIR, "pre_compact_save.py")
 
-from db_utils import extract_text_content  # noqa: E402
+from db_utils import decompress_blob, extract_text_content, get_table_count  # noqa: E402
 from pre_compact_save import (  # noqa: E402
     parse_transcript_full,
     read_hook_input,
     save_checkpoint,
 )
 
+from tests.helpers import force_init_in_subprocess  # noqa: E402
+
 
 # ---------------------------------------------------------------------------
 # Unit tests — extract_text_content (no max_length = no truncation)
@@ -79,26 +82,24 @@ class TestReadHookInput:
 # Unit tests — parse_transcript_full (no sampling, no truncation)
 # ---------------------------------------------------------------------------
 class TestParseTranscriptFull:
-    def test_basic_parsing(self, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_basic_parsing(self, make_jsonl):
         lines = [
             {"type": "user", "message": {"content": "hello"}},
             {"type": "assistant", "message": {"content": "world"}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
         msgs = parse_transcript_full(str(transcript))
         assert len(msgs) == 2
         assert msgs[0] == {"role": "user", "content": "hello"}
         assert msgs[1] == {"role": "assistant", "content": "world"}
 
-    def test_no_sampling_large_transcript(self, tmp_path):
+    def test_no_sampling_large_transcript(self, make_jsonl):
         """Unlike auto_save, parse_transcript_full should keep ALL messages."""
-        transcript = tmp_path / "transcript.jsonl"
         lines = []
         for i in range(100):
             role = "user" if i % 2 == 0 else "assistant"
             lines.append({"type": role, "message": {"content": f"msg-{i}"}})
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
         msgs = parse_transcript_full(str(transcript))
         assert len(msgs) == 100
         assert msgs[0]["content"] == "msg-0"
@@ -114,18 +115,26 @@ class TestParseTranscriptFull:
         assert len(msgs) == 1
         assert len(msgs[0]["content"]) == 5000
 
-    def test_skips_non_message_types(self, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_skips_non_message_types(self, make_jsonl):
         lines = [
             {"type": "system", "message": {"content": "sys prompt"}},
             {"type": "user", "message": {"content": "hello"}},
             {"type": "tool_result", "message": {"content": "result"}},
             {"type": "assistant", "message": {"content": "response"}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
         msgs = parse_transcript_full(str(transcript))
         assert len(msgs) == 2
 
+    def test_unhashable_type_skipped(self, make_jsonl):
+        lines = [
+            {"type": ["user"], "message": {"content": "odd"}},
+            {"type": {"nested": 1}, "message": {"content": "odder"}},
+            {"type": "user", "message": {"content": "hello"}},
+        ]
+        transcript = make_jsonl(lines)
+        assert parse_transcript_full(str(transcript)) == [{"role": "user", "content": "hello"}]
+
     def test_missing_file(self):
         assert parse_transcript_full("/nonexistent/path.jsonl") == []
 
@@ -143,6 +152,33 @@ class TestParseTranscriptFull:
         msgs = parse_transcript_full(str(transcript))
         assert len(msgs) == 2
 
+    def test_invalid_utf8_line_skipped(self, tmp_path):
+        transcript = tmp_path / "transcript.jsonl"
+        transcript.write_bytes(
+            json.dumps({"type": "user", "message": {"content": "first"}}).encode() + b"\n"
+            + b'{"type": "user", "message": {"content": "\xff\xfe"}}\n'
+            + json.dumps({"type": "assistant", "message": {"content": "caf\u00e9"}}, ensure_ascii=False).encode()
+            + b"\n"
+        )
+        msgs = parse_transcript_full(str(transcript))
+        assert [m["content"] for m in msgs] == ["first", "caf\u00e9"]
+
+    def test_empty_file(self, tmp_path):
+        transcript = tmp_path / "transcript.jsonl"
+        transcript.write_bytes(b"")
+        assert parse_transcript_full(str(transcript)) == []
+
+    def test_last_line_without_newline_and_blank_lines(self, tmp_path):
+        transcript = tmp_path / "transcript.jsonl"
+        transcript.write_bytes(
+            b"\n\n"
+            + json.dumps({"type": "user", "message": {"content": "first"}}).encode() + b"\r\n"
+            + b"   \n"
+            + json.dumps({"type": "assistant", "message": {"content": "last"}}).encode()
+        )
+        msgs = parse_transcript_full(str(transcript))
+        assert [m["content"] for m in msgs] == ["first", "last"]
+
     def test_list_content_blocks(self, tmp_path):
         transcript = tmp_path / "transcript.jsonl"
         lines = [
@@ -164,6 +200,11 @@ class TestParseTranscriptFull:
         assert "and more" in msgs[0]["content"]
 
 
+def _messages(n):
+    """A one-message transcript whose content differs per *n* (identical re-saves are skipped)."""
+    return [{"role": "user", "content": f"msg-{n}"}]
+
+
 # ---------------------------------------------------------------------------
 # Unit tests — save_checkpoint
 # ---------------------------------------------------------------------------
@@ -186,15 +227,14 @@ class TestSaveCheckpoint:
         assert row["checkpoint_number"] == 1
         assert row["trigger_type"] == "auto"
         assert row["message_count"] == 2
-        saved_msgs = json.loads(row["messages"])
+        saved_msgs = json.loads(decompress_blob(row["messages"], row["messages_codec"]))
         assert len(saved_msgs) == 2
         assert saved_msgs[0]["content"] == "hello"
 
     def test_checkpoint_number_increments(self, isolated_db):
-        messages = [{"role": "user", "content": "msg"}]
-        save_checkpoint("sess-1", "/tmp/project", "auto", messages)
-        save_checkpoint("sess-1", "/tmp/project", "auto", messages)
-        save_checkpoint("sess-1", "/tmp/project", "manual", messages)
+        save_checkpoint("sess-1", "/tmp/project", "auto", _messages(1))
+        save_checkpoint("sess-1", "/tmp/project", "auto", _messages(2))
+        save_checkpoint("sess-1", "/tmp/project", "manual", _messages(3))
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -206,11 +246,35 @@ class TestSaveCheckpoint:
 
         assert [r["checkpoint_number"] for r in rows] == [1, 2, 3]
 
+    def test_numbering_without_returning_support(self, isolated_db, monkeypatch):
+        """Older SQLite (no RETURNING) takes the upsert + SELECT path."""
+        monkeypatch.setattr(sqlite3, "sqlite_version_info", (3, 31, 1))
+        save_checkpoint("sess-old", "/tmp/project", "auto", _messages(1))
+        save_checkpoint("sess-old", "/tmp/project", "auto", _messages(2))
+
+        conn = sqlite3.connect(str(isolated_db))
+        rows = conn.execute(
+            "SELECT checkpoint_number FROM context_checkpoints WHERE session_id = 'sess-old' ORDER BY id"
+        ).fetchall()
+        conn.close()
+        assert [r[0] for r in rows] == [1, 2]
+
+    def test_numbering_not_reused_after_prune(self, isolated_db):
+        from db_prune import prune_checkpoints
+        for i in range(3):
+            save_checkpoint("sess-1", "/tmp/project", "auto", _messages(i))
+        prune_checkpoints(max_per_session=1)
+        cp_id = save_checkpoint("sess-1", "/tmp/project", "auto", _messages(3))
+
+        conn = sqlite3.connect(str(isolated_db))
+        num = conn.execute("SELECT checkpoint_number FROM context_checkpoints WHERE id = ?", (cp_id,)).fetchone()[0]
+        conn.close()
+        assert num == 4
+
     def test_different_sessions_independent_numbering(self, isolated_db):
-        messages = [{"role": "user", "content": "msg"}]
-        save_checkpoint("sess-A", "/tmp/a", "auto", messages)
-        save_checkpoint("sess-A", "/tmp/a", "auto", messages)
-        save_checkpoint("sess-B", "/tmp/b", "auto", messages)
+        save_checkpoint("sess-A", "/tmp/a", "auto", _messages(1))
+        save_checkpoint("sess-A", "/tmp/a", "auto", _messages(2))
+        save_checkpoint("sess-B", "/tmp/b", "auto", _messages(1))
 
         conn = sqlite3.connect(str(isolated_db))
         conn.row_factory = sqlite3.Row
@@ -240,6 +304,76 @@ class TestSaveCheckpoint:
         conn.close()
         assert row["message_count"] == 200
 
+    def test_messages_blob_compressed(self, isolated_db):
+        messages = [{"role": "user", "content": "repeat " * 500}]
+        cp_id = save_checkpoint("sess-z", "/tmp/project", "auto", messages)
+
+        conn = sqlite3.connect(str(isolated_db))
+        blob, codec = conn.execute(
+            "SELECT messages, messages_codec FROM context_checkpoints WHERE id = ?", (cp_id,)
+        ).fetchone()
+        conn.close()
+        assert codec != 0
+        assert len(blob) < len(json.dumps(messages)) // 10
+        assert json.loads(decompress_blob(blob, codec)) == messages
+
+    def test_identical_resave_skipped(self, isolated_db):
+        first = save_checkpoint("sess-dup", "/tmp/project", "auto", _messages(1))
+        again = save_checkpoint("sess-dup", "/tmp/project", "manual", _messages(1))
+        assert again == first
+
+        conn = sqlite3.connect(str(isolated_db))
+        count = conn.execute("SELECT COUNT(*) FROM context_checkpoints").fetchone()[0]
+        counter = conn.execute(
+            "SELECT last_checkpoint_number FROM checkpoint_counters WHERE session_id = 'sess-dup'"
+        ).fetchone()[0]
+        conn.close()
+        assert (count, counter) == (1, 1)
+
+    def test_changed_or_other_session_not_skipped(self, isolated_db):
+        first = save_checkpoint("sess-dup", "/tmp/project", "auto", _messages(1))
+        changed = save_checkpoint("sess-dup", "/tmp/project", "auto", _messages(2))
+        reverted = save_checkpoint("sess-dup", "/tmp/project", "auto", _messages(1))
+        other = save_checkpoint("sess-other", "/tmp/project", "auto", _messages(1))
+        assert len({first, changed, reverted, other}) == 4
+
+    def test_one_compressed_copy_stored(self, isolated_db):
+        """The compressed blob is the only copy of the messages a checkpoint writes."""
+        messages = [
+            {"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Step {i}: updated handler_{i % 37} in module_{i % 11}.py and reran the tests"}
+            for i in range(2000)
+        ]
+        save_checkpoint("sess-size", "/tmp/project", "auto", _messages(1))  # schema + first pages
+        conn = sqlite3.connect(str(isolated_db))
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.close()
+
+        save_checkpoint("sess-size", "/tmp/project", "auto", messages)
+
+        conn = sqlite3.connect(str(isolated_db))
+        blob_bytes = conn.execute("SELECT SUM(length(messages)) FROM context_checkpoints").fetchone()[0]
+        grown = (conn.execute("PRAGMA page_count").fetchone()[0] - pages_before) * page_size
+        conn.close()
+        raw_bytes = len(json.dumps(messages, separators=(",", ":")))
+        assert blob_bytes < raw_bytes // 4
+        # Everything the save added fits in the blob plus a few pages of row and index overhead
+        assert grown <= blob_bytes + 4 * page_size
+
+    @pytest.mark.parametrize("repeat", [False, True])
+    def test_checkpoint_cache_size_not_left_on_pooled_connection(self, isolated_db, repeat):
+        """The larger write-burst cache is reset before the connection goes back to the pool."""
+        from db_utils import get_connection
+        from pre_compact_save import CHECKPOINT_CACHE_SIZE_KIB
+        save_checkpoint("sess-cache", "/tmp/project", "auto", _messages(1))
+        with get_connection() as conn:
+            default = conn.execute("PRAGMA cache_size").fetchone()[0]
+        # repeat=True takes the identical-resave early return
+        save_checkpoint("sess-cache", "/tmp/project", "auto", _messages(1 if repeat else 2))
+        with get_connection() as conn:
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == default != -CHECKPOINT_CACHE_SIZE_KIB
+
     def test_project_hash_stored(self, isolated_db):
         messages = [{"role": "user", "content": "test"}]
         save_checkpoint("sess-hash", "/tmp/my-project", "auto", messages)
@@ -256,13 +390,12 @@ class TestSaveCheckpoint:
 # Integration tests — subprocess
 # ---------------------------------------------------------------------------
 class TestPreCompactScript:
-    def test_runs_with_valid_input(self, isolated_db, tmp_path):
-        transcript = tmp_path / "transcript.jsonl"
+    def test_runs_with_valid_input(self, isolated_db, tmp_path, make_jsonl):
         lines = [
             {"type": "user", "message": {"content": "Fix the bug"}},
             {"type": "assistant", "message": {"content": "Looking into it..."}},
         ]
-        transcript.write_text("\n".join(json.dumps(ln) for ln in lines), encoding="utf-8")
+        transcript = make_jsonl(lines)
 
         env = os.environ.copy()
         env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
@@ -292,7 +425,7 @@ class TestPreCompactScript:
         assert row is not None
         assert row["message_count"] == 2
         assert row["trigger_type"] == "auto"
-        msgs = json.loads(row["messages"])
+        msgs = json.loads(decompress_blob(row["messages"], row["messages_codec"]))
         assert msgs[0]["content"] == "Fix the bug"
 
     def test_manual_trigger(self, isolated_db, tmp_path):
@@ -339,6 +472,24 @@ class TestPreCompactScript:
         )
         assert result.returncode == 0
 
+    def test_nothing_to_save_skips_database_imports(self, isolated_db, tmp_path):
+        """The no-op path (empty transcript) never loads sqlite3 or the DB modules."""
+        transcript = tmp_path / "empty.jsonl"
+        transcript.write_text("", encoding="utf-8")
+        payload = json.dumps({"session_id": "s1", "transcript_path": str(transcript)})
+        code = (
+            "import io, sys; sys.path.insert(0, {scripts!r}); import pre_compact_save; "
+            "sys.stdin = io.StringIO({payload!r}); pre_compact_save.main(); "
+            "print(sorted(m for m in ('sqlite3', 'hashlib', 'db_init') if m in sys.modules))"
+        ).format(scripts=SCRIPTS_DIR, payload=payload)
+        env = os.environ.copy()
+        env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=30
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+
     def test_missing_transcript_exits_gracefully(self, isolated_db):
         env = os.environ.copy()
         env["CONTEXT_MEMORY_DB_PATH"] = str(isolated_db)
@@ -459,10 +610,63 @@ class TestContextLoadCheckpoint:
         assert result["messages"][0]["content"] == "msg-7"
         assert result["messages"][2]["content"] == "msg-9"
 
-    def test_no_checkpoints_returns_error(self, isolated_db):
-        from db_init import init_database
-        init_database()
+    def test_undecodable_blob_reports_error(self, isolated_db, monkeypatch):
+        """A zstd checkpoint read without zstandard installed returns an error, not a crash."""
+        import db_utils
+        import mcp_server
+        cp_id = save_checkpoint("sess-zstd", "/tmp/project", "auto", _messages(1))
+        conn = sqlite3.connect(str(isolated_db))
+        conn.execute("UPDATE context_checkpoints SET messages_codec = 1 WHERE id = ?", (cp_id,))
+        conn.commit()
+        conn.close()
+        monkeypatch.setattr(db_utils, "zstandard", None)
+
+        result = mcp_server.context_load_checkpoint(session_id="sess-zstd")
+        assert "zstandard" in result["error"]
+        assert result["messages"] == []
+        assert result["id"] == cp_id
+
+    def test_read_connection_reused_and_sees_new_checkpoints(self, isolated_db):
+        import mcp_server
+        save_checkpoint("sess-ro", "/tmp/project", "auto", [{"role": "user", "content": "first"}])
+        mcp_server.context_load_checkpoint(session_id="sess-ro")
+        conn = mcp_server._ro_conn
+        assert conn is not None
+
+        save_checkpoint("sess-ro", "/tmp/project", "auto", [{"role": "user", "content": "second"}])
+        result = mcp_server.context_load_checkpoint(session_id="sess-ro")
+        assert mcp_server._ro_conn is conn
+        assert result["messages"][0]["content"] == "second"
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM context_checkpoints")
+
+    def test_force_init_reopens_read_connection(self, isolated_db):
+        import mcp_server
+        save_checkpoint("sess-ro", "/tmp/project", "auto", [{"role": "user", "content": "old"}])
+        mcp_server.context_load_checkpoint(session_id="sess-ro")
+
+        mcp_server.context_init(force=True)
+        assert mcp_server._ro_conn is None
+        result = mcp_server.context_load_checkpoint(session_id="sess-ro")
+        assert result["error"] == "No checkpoints found."
+
+    def test_replaced_database_file_reopens_read_connection(self, isolated_db):
+        """Another process recreating the file under the same path is picked up."""
+        import mcp_server
+        save_checkpoint("sess-ro", "/tmp/project", "auto", [{"role": "user", "content": "old"}])
+        mcp_server.context_load_checkpoint(session_id="sess-ro")
+        conn = mcp_server._ro_conn
+
+        # This process keeps its pooled write connection and the read connection open
+        force_init_in_subprocess(isolated_db)
+        save_checkpoint("sess-ro", "/tmp/project", "auto", [{"role": "user", "content": "new"}])
 
+        result = mcp_server.context_load_checkpoint(session_id="sess-ro")
+        assert mcp_server._ro_conn is not conn
+        assert result["checkpoint_number"] == 1
+        assert result["messages"][0]["content"] == "new"
+
+    def test_no_checkpoints_returns_error(self, initialized_db):
         import mcp_server
         result = mcp_server.context_load_checkpoint(session_id="nonexistent")
         assert "error" in result
@@ -475,46 +679,53 @@ class TestContextLoadCheckpoint:
 class TestCheckpointPruning:
     def test_prune_keeps_n_newest(self, isolated_db):
         from db_prune import prune_checkpoints
-        messages = [{"role": "user", "content": "msg"}]
-        for _ in range(5):
-            save_checkpoint("sess-prune", "/tmp/project", "auto", messages)
+        for i in range(5):
+            save_checkpoint("sess-prune", "/tmp/project", "auto", _messages(i))
 
         result = prune_checkpoints(max_per_session=2, dry_run=False)
         assert result["pruned"] == 3
 
-        conn = sqlite3.connect(str(isolated_db))
-        count = conn.execute("SELECT COUNT(*) FROM context_checkpoints").fetchone()[0]
-        conn.close()
+        count = get_table_count("context_checkpoints")
         assert count == 2
 
     def test_prune_dry_run(self, isolated_db):
         from db_prune import prune_checkpoints
-        messages = [{"role": "user", "content": "msg"}]
-        for _ in range(5):
-            save_checkpoint("sess-dry", "/tmp/project", "auto", messages)
+        for i in range(5):
+            save_checkpoint("sess-dry", "/tmp/project", "auto", _messages(i))
 
         result = prune_checkpoints(max_per_session=2, dry_run=True)
         assert result["pruned"] == 3
         assert result["dry_run"] is True
         assert "checkpoints" in result
 
-        conn = sqlite3.connect(str(isolated_db))
-        count = conn.execute("SELECT COUNT(*) FROM context_checkpoints").fetchone()[0]
-        conn.close()
+        count = get_table_count("context_checkpoints")
         assert count == 5  # Nothing actually deleted
 
     def test_prune_multiple_sessions(self, isolated_db):
         from db_prune import prune_checkpoints
-        messages = [{"role": "user", "content": "msg"}]
-        for _ in range(4):
-            save_checkpoint("sess-A", "/tmp/a", "auto", messages)
-        for _ in range(3):
-            save_checkpoint("sess-B", "/tmp/b", "auto", messages)
+        for i in range(4):
+            save_checkpoint("sess-A", "/tmp/a", "auto", _messages(i))
+        for i in range(3):
+            save_checkpoint("sess-B", "/tmp/b", "auto", _messages(i))
 
         result = prune_checkpoints(max_per_session=2, dry_run=False)
         # sess-A: 4 - 2 = 2 pruned, sess-B: 3 - 2 = 1 pruned
         assert result["pruned"] == 3
 
+    def test_prune_set_based_matches_per_session_fallback(self, isolated_db, monkeypatch):
+        """The window-function query picks the same checkpoints as the pre-3.25 loop."""
+        import db_prune
+        for i in range(4):
+            save_checkpoint("sess-A", "/tmp/a", "auto", _messages(i))
+        for i in range(2):
+            save_checkpoint("sess-B", "/tmp/b", "auto", _messages(i))
+
+        fast = db_prune.prune_checkpoints(max_per_session=1, dry_run=True)
+        monkeypatch.setattr(db_prune.sqlite3, "sqlite_version_info", (3, 24, 0))
+        slow = db_prune.prune_checkpoints(max_per_session=1, dry_run=True)
+        assert fast["pruned"] == slow["pruned"] == 4
+        assert fast["checkpoints"] == slow["checkpoints"]
+
     def test_prune_no_db(self, isolated_db):
         from db_prune import prune_checkpoints
         # Don't create the DB
@@ -569,3 +780,94 @@ class TestSchemaMigration:
         )
         assert cursor.fetchone() is not None
         conn.close()
+
+    def test_v6_to_v7_seeds_checkpoint_counters(self, isolated_db):
+        """Counters start from the highest existing checkpoint number per session."""
+        import db_init
+        save_checkpoint("sess-1", "/tmp/project", "auto", _messages(1))
+        save_checkpoint("sess-1", "/tmp/project", "auto", _messages(2))
+
+        conn = sqlite3.connect(str(isolated_db))
+        conn.execute("DROP TABLE checkpoint_counters")
+        conn.execute("UPDATE schema_version SET version = 6")
+        conn.commit()
+        conn.close()
+
+        db_init.ensure_schema_current()
+        cp_id = save_checkpoint("sess-1", "/tmp/project", "auto", _messages(3))
+
+        conn = sqlite3.connect(str(isolated_db))
+        num = conn.execute("SELECT checkpoint_number FROM context_checkpoints WHERE id = ?", (cp_id,)).fetchone()[0]
+        conn.close()
+        assert num == 3
+
+    def test_v9_to_v10_adds_content_hash(self, isolated_db):
+        """Pre-v10 checkpoints have no hash, so the next identical save still writes."""
+        conn = sqlite3.connect(str(isolated_db))
+        conn.executescript(_legacy_checkpoint_schema(9))
+        conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY, applied_at DATETIME)")
+        conn.execute("INSERT INTO schema_version (version) VALUES (9)")
+        conn.execute(
+            "INSERT INTO context_checkpoints (session_id, checkpoint_number, messages, message_count) "
+            "VALUES ('sess-1', 1, ?, 1)",
+            (json.dumps(_messages(1)),),
+        )
+        conn.execute("INSERT INTO checkpoint_counters VALUES ('sess-1', 1)")
+        conn.commit()
+        conn.close()
+
+        # save_checkpoint migrates on its own connection; no ensure_schema_current() needed
+        cp_id = save_checkpoint("sess-1", "/tmp/project", "auto", _messages(1))
+
+        conn = sqlite3.connect(str(isolated_db))
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(context_checkpoints)")}
+        count = conn.execute("SELECT COUNT(*) FROM context_checkpoints").fetchone()[0]
+        conn.close()
+        assert "content_hash" in columns
+        assert cp_id != 1
+        assert count == 2
+
+    def test_schema_checked_once_per_process(self, isolated_db, monkeypatch):
+        import db_init
+        save_checkpoint("sess-1", "/tmp/project", "auto", _messages(1))
+
+        calls = []
+        real = db_init.get_schema_version
+        monkeypatch.setattr(db_init, "get_schema_version", lambda conn: calls.append(1) or real(conn))
+        save_checkpoint("sess-1", "/tmp/project", "auto", _messages(2))
+        assert calls == []
+
+    def test_v10_to_v11_keeps_plain_json_checkpoints_readable(self, isolated_db):
+        pytest.importorskip("mcp")
+        import db_init
+        import mcp_server
+        conn = sqlite3.connect(str(isolated_db))
+        conn.executescript(_legacy_checkpoint_schema(10))
+        conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY, applied_at DATETIME)")
+        conn.execute("INSERT INTO schema_version (version) VALUES (10)")
+        conn.execute(
+            "INSERT INTO context_checkpoints (session_id, checkpoint_number, messages, message_count) "
+            "VALUES ('sess-1', 1, ?, 1)",
+            (json.dumps(_messages(1)),),
+        )
+        conn.commit()
+        conn.close()
+
+        db_init.ensure_schema_current()
+        result = mcp_server.context_load_checkpoint(session_id="sess-1")
+        assert result["messages"] == _messages(1)
+        assert "messages_codec" not in result
+
+
+def _legacy_checkpoint_schema(version):
+    """Pre-versioning SCHEMA_SQL with the context_checkpoints columns added after *version* removed."""
+    import db_init
+    sql = db_init.SCHEMA_SQL.split("-- Schema versioning")[0]
+    later_columns = {10: "content_hash", 11: "messages_codec"}
+    lines = [
+        line for line in sql.split("\n")
+        if not any(line.strip().startswith(col + " ") for v, col in later_columns.items() if v > version)
+    ]
+    sql = "\n".join(lines)
+    # The last remaining checkpoint column must not keep a trailing comma
+    return re.sub(r",(\s*--[^\n]*)?\n\);", r"\1\n);", sql)